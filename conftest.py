@@ -15,3 +15,14 @@ def pytest_addoption(parser):
 def pytest_collection_modifyitems(items, config):
     if config.getoption('--slow-last'):
         items.sort(key=by_slow_marker)
+
+
+def pytest_terminal_summary(terminalreporter):
+    # measurements recorded by the benchmarks with record_property
+    measured = [(report.nodeid, name, value)
+                for report in terminalreporter.stats.get('passed', ())
+                for name, value in report.user_properties]
+    if measured:
+        terminalreporter.write_sep('-', 'measurements')
+        for nodeid, name, value in measured:
+            terminalreporter.write_line(f'{nodeid}: {name} = {value}')
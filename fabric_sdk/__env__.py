@@ -1 +1,3 @@
 FABRIC_PYTHON_SDK_NETWORK_CONFIG = 'FABRIC_PYTHON_SDK_NETWORK_CONFIG'
+FABRIC_PYTHON_SDK_CONFIG_CACHE = 'FABRIC_PYTHON_SDK_CONFIG_CACHE'
+FABRIC_PYTHON_SDK_REQUIRE_C_LOADER = 'FABRIC_PYTHON_SDK_REQUIRE_C_LOADER'
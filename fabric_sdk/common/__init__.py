@@ -1,2 +1,55 @@
-from .http_client import HttpClient, HttpProtocol, HttpDynamicBody
-from .crypto_tools import Ecies, Crypto, CertTools
+"""
+Crypto and HTTP helpers of the SDK.
+
+The submodules pull in requests, cryptography and Cryptodome, so they are
+imported on first access of one of their names (PEP 562). Reading the
+network config does not pay for them.
+"""
+from importlib import import_module
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .http_client import HttpClient, HttpProtocol, AsyncHttpProtocol, HttpDynamicBody, SessionHttpClient, \
+        HttpRetryableError
+    from .crypto_tools import Ecies, Crypto, CertTools, CertCache, EcKeyPool
+    from .key_material import KeyMaterialResolver
+    from .admission import AdmissionController, AdmissionRejected
+    from .retry import RetryingHttpClient, AsyncRetryingHttpClient, RetryPolicy, RetryBudget
+
+_LAZY_NAMES = {
+    'HttpClient': '.http_client',
+    'HttpProtocol': '.http_client',
+    'AsyncHttpProtocol': '.http_client',
+    'HttpDynamicBody': '.http_client',
+    'SessionHttpClient': '.http_client',
+    'HttpRetryableError': '.http_client',
+    'Ecies': '.crypto_tools',
+    'Crypto': '.crypto_tools',
+    'CertTools': '.crypto_tools',
+    'CertCache': '.crypto_tools',
+    'EcKeyPool': '.crypto_tools',
+    'KeyMaterialResolver': '.key_material',
+    'AdmissionController': '.admission',
+    'AdmissionRejected': '.admission',
+    'RetryingHttpClient': '.retry',
+    'AsyncRetryingHttpClient': '.retry',
+    'RetryPolicy': '.retry',
+    'RetryBudget': '.retry',
+}
+
+__all__ = list(_LAZY_NAMES)
+
+
+def __getattr__(name):
+    try:
+        module = _LAZY_NAMES[name]
+    except KeyError:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}") from None
+
+    value = getattr(import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
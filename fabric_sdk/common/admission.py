@@ -0,0 +1,368 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, Optional, Tuple
+
+
+class AdmissionRejected(RuntimeError):
+    """A request was shed by an AdmissionController, the CA was not called"""
+
+
+class _Waiter:
+    __slots__ = ('event', 'loop', 'future')
+
+    def __init__(self, loop=None):
+        self.loop = loop
+        self.event = None if loop is not None else threading.Event()
+        self.future = None
+
+    def wake(self):
+        if self.loop is None:
+            self.event.set()
+        elif self.future is not None:
+            self.loop.call_soon_threadsafe(self._set_future, self.future)
+
+    @staticmethod
+    def _set_future(future):
+        if not future.done():
+            future.set_result(None)
+
+
+class AdmissionController:
+    """
+    Paces the requests sent to one CA endpoint.
+
+    A request is admitted when a token of the bucket (``rate`` per second,
+    at most ``burst`` at once) is available and less than
+    ``max_in_flight`` requests are running. Others wait in a FIFO queue of
+    at most ``max_queue`` requests, for at most ``queue_timeout`` seconds.
+    When the queue is full or the deadline is over, the request is shed
+    with AdmissionRejected. Every limit is optional.
+
+    Sync and async callers share the same limits and queue, ``admit``
+    and ``aadmit`` hold an admission for the duration of a ``with``.
+    """
+
+    def __init__(
+        self,
+        rate: float = None,
+        burst: int = None,
+        max_in_flight: int = None,
+        max_queue: int = None,
+        queue_timeout: float = None,
+        clock: Callable[[], float] = time.monotonic
+    ) -> None:
+        """
+        :param rate: requests admitted per second, unlimited when None
+        :param burst: requests admitted at once, ``max(1, rate)`` by default
+        :param max_in_flight: requests running at the same time
+        :param max_queue: requests waiting for admission, unbounded when None
+        :param queue_timeout: default deadline of a waiting request, in
+                              seconds
+        :param clock: monotonic time in seconds
+        """
+        self.rate = rate
+        self.burst = burst if burst is not None else max(1, rate or 1)
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._clock = clock
+
+        self.admitted = 0
+        self.queued = 0
+        self.rejected = 0
+        self.in_flight = 0
+        self._tokens = self.burst
+        self._last = clock()
+        self._waiters = deque()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def from_config(config: Dict) -> Optional['AdmissionController']:
+        """Build the controller of a ``rateLimit`` section of a CA
+
+        :param config: with ``requestsPerSecond``, ``burst``,
+                       ``maxInFlight``, ``maxQueue`` and ``queueTimeout``,
+                       all optional
+        :return: AdmissionController, None for an empty section
+        """
+        if not config:
+            return None
+        return AdmissionController(
+            rate=config.get('requestsPerSecond'),
+            burst=config.get('burst'),
+            max_in_flight=config.get('maxInFlight'),
+            max_queue=config.get('maxQueue'),
+            queue_timeout=config.get('queueTimeout'))
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'admitted': self.admitted,
+                'queued': self.queued,
+                'rejected': self.rejected,
+                'in_flight': self.in_flight,
+                'waiting': len(self._waiters),
+            }
+
+    def _take(self, now):
+        """Admit now if possible
+
+        :return: 0 when admitted, None when waiting for a running request,
+                 else seconds until the next token
+        """
+        if self.max_in_flight is not None and self.in_flight >= self.max_in_flight:
+            return None
+        if self.rate is not None:
+            self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            if self._tokens < 1:
+                return (1 - self._tokens) / self.rate
+            self._tokens -= 1
+        self.in_flight += 1
+        return 0
+
+    def _wake_head(self):
+        if self._waiters:
+            self._waiters[0].wake()
+
+    def _step(self, waiter, deadline, loop=None):
+        """One admission attempt, under the lock
+
+        :return: the waiter, and 0 when admitted or the seconds to sleep
+                 (None for no limit)
+        :raises AdmissionRejected: queue full or deadline over
+        """
+        now = self._clock()
+        if waiter is None:
+            if not self._waiters and self._take(now) == 0:
+                self.admitted += 1
+                return None, 0
+            if self.max_queue is not None and len(self._waiters) >= self.max_queue:
+                self.rejected += 1
+                raise AdmissionRejected("Admission queue is full")
+            waiter = _Waiter(loop)
+            self._waiters.append(waiter)
+            self.queued += 1
+
+        wait = None
+        if self._waiters[0] is waiter:
+            wait = self._take(now)
+            if wait == 0:
+                self._waiters.popleft()
+                self.admitted += 1
+                self._wake_head()
+                return waiter, 0
+
+        if deadline is not None:
+            if now >= deadline:
+                self._abandon(waiter)
+                raise AdmissionRejected("Admission deadline exceeded")
+            wait = deadline - now if wait is None else min(wait, deadline - now)
+        return waiter, wait
+
+    def _abandon(self, waiter):
+        try:
+            self._waiters.remove(waiter)
+        except ValueError:
+            return
+        self.rejected += 1
+        self._wake_head()
+
+    def _deadline(self, timeout):
+        if timeout is None:
+            timeout = self.queue_timeout
+        return None if timeout is None else self._clock() + timeout
+
+    def acquire(self, timeout: float = None) -> None:
+        """Wait for admission, call ``release`` once the request is done
+
+        :param timeout: seconds to wait, ``queue_timeout`` by default
+        :raises AdmissionRejected: the request was shed
+        """
+        deadline = self._deadline(timeout)
+        waiter = None
+        try:
+            while True:
+                with self._lock:
+                    waiter, wait = self._step(waiter, deadline)
+                    if wait == 0:
+                        return
+                    waiter.event.clear()
+                waiter.event.wait(wait)
+        except AdmissionRejected:
+            raise
+        except BaseException:
+            if waiter is not None:
+                with self._lock:
+                    self._abandon(waiter)
+            raise
+
+    async def aacquire(self, timeout: float = None) -> None:
+        """asyncio flavour of ``acquire``, never blocks the event loop"""
+        deadline = self._deadline(timeout)
+        loop = asyncio.get_running_loop()
+        waiter = None
+        try:
+            while True:
+                with self._lock:
+                    waiter, wait = self._step(waiter, deadline, loop)
+                    if wait == 0:
+                        return
+                    waiter.future = future = loop.create_future()
+                await asyncio.wait((future,), timeout=wait)
+        except AdmissionRejected:
+            raise
+        except BaseException:
+            if waiter is not None:
+                with self._lock:
+                    self._abandon(waiter)
+            raise
+
+    def delay(self) -> Optional[float]:
+        """Seconds before a request would be admitted, without taking
+        anything
+
+        :return: 0 when a request would be admitted now, else the seconds
+                 until the next token, or None when it would wait for
+                 queued or running requests
+        """
+        with self._lock:
+            if self._waiters:
+                return None
+            if self.max_in_flight is not None and self.in_flight >= self.max_in_flight:
+                return None
+            if self.rate is None:
+                return 0
+            tokens = min(self.burst, self._tokens + (self._clock() - self._last) * self.rate)
+            return 0 if tokens >= 1 else (1 - tokens) / self.rate
+
+    def try_acquire(self) -> Optional[float]:
+        """Admit now or never, without queueing, e.g. for a scheduler that
+        postpones the requests it can't send. Call ``release`` once an
+        admitted request is done.
+
+        :return: 0 when admitted, else the seconds until the next token,
+                 or None when waiting for queued or running requests
+        """
+        with self._lock:
+            if self._waiters:
+                return None
+            wait = self._take(self._clock())
+            if wait == 0:
+                self.admitted += 1
+            return wait
+
+    def release(self) -> None:
+        """End an admitted request"""
+        with self._lock:
+            self.in_flight -= 1
+            self._wake_head()
+
+    def admit(self, timeout: float = None) -> '_Admission':
+        """``with controller.admit():`` holds an admission for the block"""
+        return _Admission(self, timeout)
+
+    def aadmit(self, timeout: float = None) -> '_Admission':
+        """``async with controller.aadmit():`` holds an admission for the block"""
+        return _Admission(self, timeout)
+
+
+class _Admission:
+    __slots__ = ('controller', 'timeout')
+
+    def __init__(self, controller, timeout):
+        self.controller = controller
+        self.timeout = timeout
+
+    def __enter__(self):
+        self.controller.acquire(self.timeout)
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.controller.release()
+
+    async def __aenter__(self):
+        await self.controller.aacquire(self.timeout)
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        self.controller.release()
+
+
+# one controller per CA url, with the rateLimit it was built from
+_controllers: Dict[str, Tuple[tuple, AdmissionController]] = {}
+_controllers_lock = threading.Lock()
+
+
+def admission_controller(url: str, config: Dict) -> Optional[AdmissionController]:
+    """The controller of a CA endpoint, shared by all its clients
+
+    A ``rateLimit`` changed by a config reload replaces the controller of
+    the CA, clients built before keep the previous one. A config without
+    ``rateLimit`` leaves the controller of the CA to the clients that have
+    one, see reset_admission_controllers.
+
+    :param url: url of the CA
+    :param config: ``rateLimit`` section of the CA
+    :return: AdmissionController, None without limits
+    """
+    if not config:
+        return None
+    with _controllers_lock:
+        limits = tuple(sorted(config.items()))
+        entry = _controllers.get(url)
+        if entry is None or entry[0] != limits:
+            entry = _controllers[url] = (limits, AdmissionController.from_config(config))
+        return entry[1]
+
+
+def reset_admission_controllers(url: str = None) -> None:
+    """Forget the shared controllers, e.g. once a reload removed the
+    ``rateLimit`` of a CA. Clients built before keep theirs.
+
+    :param url: url of the CA to forget, every CA when None
+    """
+    with _controllers_lock:
+        if url is None:
+            _controllers.clear()
+        else:
+            _controllers.pop(url, None)
+
+
+class AdmittedHttpClient:
+    """HttpProtocol sending each request once admitted by a controller"""
+
+    def __init__(self, http_client, controller: AdmissionController) -> None:
+        self.http_client = http_client
+        self.controller = controller
+
+    def _send(self, method, path, **param):
+        with self.controller.admit():
+            return getattr(self.http_client, method)(path, **param)
+
+    def post(self, path, **param):
+        return self._send('post', path, **param)
+
+    def get(self, path, **param):
+        return self._send('get', path, **param)
+
+    def delete(self, path, **param):
+        return self._send('delete', path, **param)
+
+    def update(self, path, **param):
+        return self._send('update', path, **param)
+
+    def __getattr__(self, name):
+        return getattr(self.http_client, name)
+
+
+class AsyncAdmittedHttpClient(AdmittedHttpClient):
+    """AsyncHttpProtocol sending each request once admitted by a controller"""
+
+    async def _send(self, method, path, **param):
+        async with self.controller.aadmit():
+            return await getattr(self.http_client, method)(path, **param)
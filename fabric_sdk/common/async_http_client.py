@@ -0,0 +1,155 @@
+import asyncio
+import ssl
+
+import aiohttp
+
+from .http_client import RETRYABLE_STATUS, HttpRetryableError, parse_retry_after
+from .retry import NOT_SENT_ERRORS, TRANSPORT_ERRORS
+
+DEFAULT_CONNECTION_LIMIT = 100
+
+# errors of the requests sent with aiohttp, see retry
+ASYNC_TRANSPORT_ERRORS = TRANSPORT_ERRORS + (aiohttp.ClientError,)
+ASYNC_NOT_SENT_ERRORS = NOT_SENT_ERRORS + (aiohttp.ClientConnectorError,)
+
+
+class AsyncHttpClient:
+    """aiohttp implementation of AsyncHttpProtocol.
+
+    Accepts the same request params as HttpClient (``json``, ``data``,
+    ``headers``, ``auth``, ``verify``, ``timeout``), so the ``httpOptions``
+    of the network profile can be passed through unchanged. The number of
+    requests in flight is bounded by ``max_in_flight``, so thousands of
+    pending CA calls can share one event loop without opening thousands of
+    sockets.
+    """
+
+    def __init__(
+        self,
+        max_in_flight: int = DEFAULT_CONNECTION_LIMIT,
+        limit_per_host: int = 0,
+        keep_alive: bool = True
+    ) -> None:
+        """
+        :param max_in_flight: maximum number of concurrent requests
+        :type max_in_flight: int
+
+        :param limit_per_host: maximum number of connections per CA,
+                               0 means no limit besides max_in_flight
+        :type limit_per_host: int
+
+        :param keep_alive: keep connections open between requests
+        :type keep_alive: bool
+        """
+        self.max_in_flight = max_in_flight
+        self.limit_per_host = limit_per_host
+        self.keep_alive = keep_alive
+        self._session = None
+        self._semaphore = None
+        self._loop = None
+        self._ssl_contexts = {}
+
+    def _in_flight(self) -> asyncio.Semaphore:
+        # one per event loop, it outlives the sessions so the limit holds
+        # while a closed session is replaced
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.max_in_flight)
+            self._loop = loop
+        return self._semaphore
+
+    def _client_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.max_in_flight,
+                limit_per_host=self.limit_per_host,
+                force_close=not self.keep_alive)
+            self._session = aiohttp.ClientSession(connector=connector)
+        return self._session
+
+    def _ssl(self, verify):
+        if verify is True:
+            return True
+        if verify is False:
+            return False
+
+        try:
+            return self._ssl_contexts[verify]
+        except KeyError:
+            context = ssl.create_default_context(cafile=verify)
+            self._ssl_contexts[verify] = context
+            return context
+
+    def _translate(self, param):
+        param = dict(param)
+
+        if 'verify' in param:
+            param['ssl'] = self._ssl(param.pop('verify'))
+
+        auth = param.get('auth')
+        if isinstance(auth, tuple):
+            param['auth'] = aiohttp.BasicAuth(*auth)
+
+        timeout = param.get('timeout')
+        if isinstance(timeout, (int, float)):
+            param['timeout'] = aiohttp.ClientTimeout(total=timeout)
+
+        return param
+
+    async def _request(self, method, path, **param):
+        session = self._client_session()
+        async with self._in_flight():
+            async with session.request(
+                    method, path, **self._translate(param)) as r:
+                if r.status in RETRYABLE_STATUS:
+                    raise HttpRetryableError(
+                        r.status, parse_retry_after(r.headers.get('Retry-After')))
+                return await r.json(content_type=None), r.status
+
+    async def post(self, path, **param):
+        """Send a post request to the ca service without blocking the loop
+
+        :param path: sub path after the base_url
+        :param **param: post request params
+        :return: the response body in json
+        """
+        return await self._request('POST', path, **param)
+
+    async def get(self, path, **param):
+        """Send a get request to the ca service without blocking the loop
+
+        :param path: sub path after the base_url
+        :param **param: get request params
+        :return: the response body in json
+        """
+        return await self._request('GET', path, **param)
+
+    async def delete(self, path, **param):
+        """Send a delete request to the ca service without blocking the loop
+
+        :param path: sub path after the base_url
+        :param **param: delete request params
+        :return: the response body in json
+        """
+        return await self._request('DELETE', path, **param)
+
+    async def update(self, path, **param):
+        """Send a update request to the ca service without blocking the loop
+
+        :param path: sub path after the base_url
+        :param **param: update request params
+        :return: the response body in json
+        """
+        return await self._request('PUT', path, **param)
+
+    async def close(self):
+        """Close every pooled connection"""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def __aenter__(self) -> 'AsyncHttpClient':
+        return self
+
+    async def __aexit__(self, *_) -> None:
+        await self.close()
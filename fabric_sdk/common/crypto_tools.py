@@ -15,7 +15,12 @@
 from cryptography.hazmat.primitives.serialization import Encoding
 import hashlib
 import hmac
+import re
 import sys
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain
 from typing import Protocol
 
 from Cryptodome import Random
@@ -52,6 +57,28 @@ AES_KEY_LENGTH = 32
 HMAC_KEY_LENGTH = 32
 IV_LENGTH = 16
 
+DEFAULT_KEY_POOL_SIZE = 32
+DEFAULT_BATCH_CHUNK_SIZE = 256
+DEFAULT_WRAP_CHUNK_SIZE = 16
+DEFAULT_CERT_CACHE_SIZE = 1024
+
+_PEM_CERTIFICATE = re.compile(
+    rb'-----BEGIN CERTIFICATE-----.+?-----END CERTIFICATE-----', re.DOTALL)
+DEFAULT_STREAM_CHUNK_SIZE = 64 * 1024
+
+
+def _iter_chunks(source, chunk_size):
+    read = getattr(source, 'read', None)
+    if read is None:
+        yield from source
+        return
+
+    while True:
+        chunk = read(chunk_size)
+        if not chunk:
+            return
+        yield chunk
+
 
 class Key(Protocol):
     """An abstract base class for Key.
@@ -241,11 +268,86 @@ class Ecies:
             raise e
         return True
 
+    def sign_many(self, private_key, messages, max_workers=None, executor=None,
+                  chunk_size=DEFAULT_BATCH_CHUNK_SIZE):
+        """ECDSA sign many messages with the same key.
+
+        Messages are signed in chunks on a thread pool, OpenSSL releases
+        the GIL while signing. The low-S normalization is applied to the
+        whole batch at once.
+
+        :param private_key: private key
+        :param messages: iterable of messages to sign
+        :param max_workers: threads used when no executor is given
+        :param executor: thread executor to reuse between batches
+        :param chunk_size: messages signed per task
+        :return: list of signatures, in the order of messages
+        """
+        algorithm = ec.ECDSA(self.sign_hash_algorithm)
+
+        def sign_chunk(chunk):
+            return [private_key.sign(message, algorithm) for message in chunk]
+
+        signatures = self._map_chunks(
+            sign_chunk, list(messages), max_workers, executor, chunk_size)
+        return self._prevent_malleability_many(signatures)
+
+    def verify_many(self, items, max_workers=None, executor=None,
+                    chunk_size=DEFAULT_BATCH_CHUNK_SIZE):
+        """ECDSA verify many signatures.
+
+        :param items: iterable of (public_key, message, signature)
+        :param max_workers: threads used when no executor is given
+        :param executor: thread executor to reuse between batches
+        :param chunk_size: signatures verified per task
+        :return: list of verify results, in the order of items
+        """
+        algorithm = ec.ECDSA(self.sign_hash_algorithm)
+        half_order = self.half_order
+
+        def verify_chunk(chunk):
+            result = []
+            for public_key, message, signature in chunk:
+                if decode_dss_signature(signature)[1] > half_order:
+                    result.append(False)
+                    continue
+                try:
+                    public_key.verify(signature, message, algorithm)
+                    result.append(True)
+                except InvalidSignature:
+                    result.append(False)
+            return result
+
+        return self._map_chunks(
+            verify_chunk, list(items), max_workers, executor, chunk_size)
+
+    @staticmethod
+    def _map_chunks(func, items, max_workers, executor, chunk_size):
+        if len(items) <= chunk_size:
+            return func(items)
+
+        chunks = [items[i:i + chunk_size]
+                  for i in range(0, len(items), chunk_size)]
+        if executor is not None:
+            return list(chain.from_iterable(executor.map(func, chunks)))
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return list(chain.from_iterable(executor.map(func, chunks)))
+
     def _prevent_malleability(self, sig):
         r, s = decode_dss_signature(sig)
         if s > self.half_order:
-            s = self.order - s
-        return encode_dss_signature(r, s)
+            return encode_dss_signature(r, self.order - s)
+        return sig
+
+    def _prevent_malleability_many(self, sigs):
+        # the signatures come from OpenSSL, so s is read in place from the
+        # DER (SEQUENCE, INTEGER r, INTEGER s, short form lengths on P-256
+        # and P-384) and only the high-S half of the batch is re-encoded
+        half_order = self.half_order
+        return [self._prevent_malleability(sig)
+                if int.from_bytes(sig[6 + sig[3]:], 'big') > half_order else sig
+                for sig in sigs]
 
     def _check_malleability(self, sig):
         r, s = decode_dss_signature(sig)
@@ -258,7 +360,43 @@ class Ecies:
 
         :return: A private key object which include public key object.
         """
-        return ec.generate_private_key(self.curve, default_backend())
+        return ec.generate_private_key(self.curve(), default_backend())
+
+    def _derive_keys(self, z):
+        hkdf_output = Hkdf(salt=None, input_key_material=z, hash=self._hash) \
+            .expand(length=AES_KEY_LENGTH + HMAC_KEY_LENGTH)
+        aes_key = hkdf_output[:AES_KEY_LENGTH]
+        hmac_key = hkdf_output[AES_KEY_LENGTH:AES_KEY_LENGTH +
+                               HMAC_KEY_LENGTH]
+        return aes_key, hmac_key
+
+    def _cipher_lengths(self, private_key):
+        key_len = private_key.curve.key_size
+        if key_len != self.curve.key_size:
+            raise ValueError(
+                "Invalid key. Input security level {} does not "
+                "match the current security level {}".format(
+                    key_len,
+                    self.curve.key_size))
+
+        d_len = key_len >> 3
+        rb_len = ((key_len + 7) // 8) * 2 + 1
+        return rb_len, d_len
+
+    def _ephemeral_keys(self, public_key):
+        ephemeral_private_key = self.generate_private_key()
+        rb = ephemeral_private_key.public_key().public_bytes(
+            serialization.Encoding.X962,
+            serialization.PublicFormat.UncompressedPoint
+        )
+        z = ephemeral_private_key.exchange(ec.ECDH(), public_key)
+        return (rb,) + self._derive_keys(z)
+
+    def _recovered_keys(self, private_key, rb):
+        ephemeral_public_key = EllipticCurvePublicKey \
+            .from_encoded_point(self.curve(), bytes(rb))
+        z = private_key.exchange(ec.ECDH(), ephemeral_public_key)
+        return self._derive_keys(z)
 
     def decrypt(self, private_key, cipher_text):
         """ECIES decrypt cipher text.
@@ -274,16 +412,7 @@ class Ecies:
         :param cipher_text: cipher text
         :return: plain text
         """
-        key_len = private_key.curve.key_size
-        if key_len != self.curve.key_size:
-            raise ValueError(
-                "Invalid key. Input security level {} does not "
-                "match the current security level {}".format(
-                    key_len,
-                    self.curve.key_size))
-
-        d_len = key_len >> 3
-        rb_len = ((key_len + 7) // 8) * 2 + 1
+        rb_len, d_len = self._cipher_lengths(private_key)
         ct_len = len(cipher_text)
         if ct_len <= rb_len + d_len:
             raise ValueError(
@@ -292,27 +421,21 @@ class Ecies:
                                                            rb_len + d_len)
             )
 
-        rb = cipher_text[:rb_len]
-        em = cipher_text[rb_len:ct_len - d_len]
-        d = cipher_text[ct_len - d_len:ct_len]
+        cipher_view = memoryview(cipher_text)
+        rb = cipher_view[:rb_len]
+        em = cipher_view[rb_len:ct_len - d_len]
+        d = cipher_view[ct_len - d_len:ct_len]
 
-        ephemeral_public_key = EllipticCurvePublicKey \
-            .from_encoded_point(self.curve(), rb)
-        z = private_key.exchange(ec.ECDH(), ephemeral_public_key)
-        hkdf_output = Hkdf(salt=None, input_key_material=z, hash=self._hash) \
-            .expand(length=AES_KEY_LENGTH + HMAC_KEY_LENGTH)
-        aes_key = hkdf_output[:AES_KEY_LENGTH]
-        hmac_key = hkdf_output[AES_KEY_LENGTH:AES_KEY_LENGTH +
-                               HMAC_KEY_LENGTH]
+        aes_key, hmac_key = self._recovered_keys(private_key, rb)
 
         mac = hmac.new(hmac_key, em, self._hash)
         recovered_d = mac.digest()
-        if not constant_time.bytes_eq(recovered_d, d):
+        if not constant_time.bytes_eq(recovered_d, bytes(d)):
             raise ValueError("Hmac verify failed.")
 
-        iv = em[:IV_LENGTH]
+        iv = bytes(em[:IV_LENGTH])
         aes_cipher = AES.new(key=aes_key, mode=AES.MODE_CFB, iv=iv)
-        return aes_cipher.decrypt(em[IV_LENGTH:len(em)])
+        return aes_cipher.decrypt(em[IV_LENGTH:])
 
     def encrypt(self, public_key, plain_text):
         """ECIES encrypt plain text.
@@ -330,25 +453,191 @@ class Ecies:
         :param plain_text: plain text
         :return: cipher text
         """
-        ephemeral_private_key = self.generate_private_key()
-        rb = ephemeral_private_key.public_key().public_bytes(
-            serialization.Encoding.X962,
-            serialization.PublicFormat.UncompressedPoint
-        )
-
-        z = ephemeral_private_key.exchange(ec.ECDH(), public_key)
-        hkdf_output = Hkdf(salt=None, input_key_material=z, hash=self._hash) \
-            .expand(length=AES_KEY_LENGTH + HMAC_KEY_LENGTH)
-        aes_key = hkdf_output[:AES_KEY_LENGTH]
-        hmac_key = hkdf_output[AES_KEY_LENGTH:AES_KEY_LENGTH +
-                               HMAC_KEY_LENGTH]
+        rb, aes_key, hmac_key = self._ephemeral_keys(public_key)
 
         aes_cipher = AES.new(aes_key, AES.MODE_CFB)
-        em = aes_cipher.iv + aes_cipher.encrypt(plain_text)
-        mac = hmac.new(hmac_key, em, self._hash)
+        iv = aes_cipher.iv
+        ct = aes_cipher.encrypt(plain_text)
+        mac = hmac.new(hmac_key, iv, self._hash)
+        mac.update(ct)
         d = mac.digest()
 
-        return rb + em + d
+        return b''.join((rb, iv, ct, d))
+
+    def encrypt_stream(self, public_key, source, chunk_size=DEFAULT_STREAM_CHUNK_SIZE):
+        """ECIES encrypt a stream of plain text.
+
+        Same output as ``encrypt``, produced chunk by chunk: AES-CFB and the
+        HMAC are updated incrementally, so memory use does not depend on the
+        size of the plain text.
+
+        :param public_key: public key
+        :param source: file-like object opened in binary mode, or iterable
+                       of bytes-like chunks
+        :param chunk_size: bytes read at a time from file-like sources
+        :return: iterator over the cipher text chunks
+        """
+        rb, aes_key, hmac_key = self._ephemeral_keys(public_key)
+
+        aes_cipher = AES.new(aes_key, AES.MODE_CFB)
+        mac = hmac.new(hmac_key, aes_cipher.iv, self._hash)
+        yield rb
+        yield aes_cipher.iv
+
+        for chunk in _iter_chunks(source, chunk_size):
+            ct = aes_cipher.encrypt(chunk)
+            mac.update(ct)
+            yield ct
+
+        yield mac.digest()
+
+    def decrypt_stream(self, private_key, source, chunk_size=DEFAULT_STREAM_CHUNK_SIZE,
+                       verify_first=False):
+        """ECIES decrypt a stream of cipher text.
+
+        Plain text chunks are produced before the trailing HMAC can be
+        checked. A ValueError raised when the stream is exhausted means
+        every chunk already produced must be discarded. Pass
+        ``verify_first`` with a seekable source to check the HMAC in a first
+        pass and only then decrypt, still with constant memory.
+
+        :param private_key: private key
+        :param source: file-like object opened in binary mode, or iterable
+                       of bytes-like chunks
+        :param chunk_size: bytes read at a time from file-like sources
+        :param verify_first: read a seekable source twice, verifying
+                             before decrypting
+        :return: iterator over the plain text chunks
+        """
+        rb_len, d_len = self._cipher_lengths(private_key)
+
+        if verify_first:
+            start = source.tell()
+            for _ in self._stream_body(private_key, source, chunk_size,
+                                       rb_len, d_len, decrypt=False):
+                pass
+            source.seek(start)
+
+        yield from self._stream_body(private_key, source, chunk_size,
+                                     rb_len, d_len, decrypt=True)
+
+    def _stream_body(self, private_key, source, chunk_size, rb_len, d_len, decrypt):
+        header_len = rb_len + IV_LENGTH
+        chunks = _iter_chunks(source, chunk_size)
+        buf = bytearray()
+
+        for chunk in chunks:
+            buf += chunk
+            if len(buf) >= header_len + d_len:
+                break
+        if len(buf) < header_len + d_len:
+            raise ValueError(
+                "Illegal cipherText length: cipher text length {} "
+                "must be > rb length plus d_len {}".format(len(buf),
+                                                           rb_len + d_len))
+
+        aes_key, hmac_key = self._recovered_keys(private_key, buf[:rb_len])
+        iv = bytes(buf[rb_len:header_len])
+        del buf[:header_len]
+
+        mac = hmac.new(hmac_key, iv, self._hash)
+        aes_cipher = AES.new(key=aes_key, mode=AES.MODE_CFB, iv=iv)
+
+        def drain():
+            n = len(buf) - d_len
+            if n <= 0:
+                return None
+            with memoryview(buf) as view:
+                with view[:n] as body:
+                    mac.update(body)
+                    pt = aes_cipher.decrypt(body) if decrypt else None
+            del buf[:n]
+            return pt
+
+        pt = drain()
+        if pt:
+            yield pt
+        for chunk in chunks:
+            buf += chunk
+            pt = drain()
+            if pt:
+                yield pt
+
+        if not constant_time.bytes_eq(mac.digest(), bytes(buf)):
+            raise ValueError("Hmac verify failed.")
+
+    def encrypt_multi(self, public_keys, plain_text, max_workers=None, executor=None):
+        """ECIES encrypt plain text for many recipients.
+
+        The plain text is encrypted once with aes-256-cfb and hmac under a
+        random content key, then only the content key is encrypted for
+        each recipient with ``encrypt`` (ecdh + hkdf).
+
+        :param public_keys: iterable of recipient public keys
+        :param plain_text: plain text
+        :param max_workers: threads used to wrap the content key
+        :param executor: thread executor to reuse between calls
+        :return: list of wrapped keys in the order of public_keys, and
+                 the shared encrypted payload
+        """
+        content_key = Random.get_random_bytes(AES_KEY_LENGTH + HMAC_KEY_LENGTH)
+        payload = self._seal(content_key, plain_text)
+        return self.wrap_keys(public_keys, content_key, max_workers, executor), payload
+
+    def wrap_keys(self, public_keys, content_key, max_workers=None, executor=None,
+                  chunk_size=DEFAULT_WRAP_CHUNK_SIZE):
+        """ECIES encrypt a content key for each recipient, in parallel.
+
+        :param public_keys: iterable of recipient public keys
+        :param content_key: key to share
+        :param max_workers: threads used when no executor is given
+        :param executor: thread executor to reuse between calls
+        :param chunk_size: keys wrapped per task
+        :return: list of wrapped keys, in the order of public_keys
+        """
+        def wrap_chunk(chunk):
+            return [self.encrypt(public_key, content_key) for public_key in chunk]
+
+        return self._map_chunks(
+            wrap_chunk, list(public_keys), max_workers, executor, chunk_size)
+
+    def decrypt_multi(self, private_key, wrapped_key, payload):
+        """Decrypt a payload produced by ``encrypt_multi``.
+
+        :param private_key: private key of the recipient
+        :param wrapped_key: content key wrapped for this recipient
+        :param payload: shared encrypted payload
+        :return: plain text
+        """
+        return self._open(self.decrypt(private_key, wrapped_key), payload)
+
+    def _seal(self, content_key, plain_text):
+        aes_cipher = AES.new(content_key[:AES_KEY_LENGTH], AES.MODE_CFB)
+        iv = aes_cipher.iv
+        ct = aes_cipher.encrypt(plain_text)
+        mac = hmac.new(content_key[AES_KEY_LENGTH:], iv, self._hash)
+        mac.update(ct)
+        return b''.join((iv, ct, mac.digest()))
+
+    def _open(self, content_key, payload):
+        d_len = self._hash().digest_size
+        if len(payload) < IV_LENGTH + d_len:
+            raise ValueError(
+                "Illegal payload length: payload length {} "
+                "must be >= iv length plus d_len {}".format(len(payload),
+                                                            IV_LENGTH + d_len))
+
+        payload_view = memoryview(payload)
+        em = payload_view[:len(payload) - d_len]
+        d = payload_view[len(payload) - d_len:]
+
+        mac = hmac.new(content_key[AES_KEY_LENGTH:], em, self._hash)
+        if not constant_time.bytes_eq(mac.digest(), bytes(d)):
+            raise ValueError("Hmac verify failed.")
+
+        aes_cipher = AES.new(key=content_key[:AES_KEY_LENGTH], mode=AES.MODE_CFB,
+                             iv=bytes(em[:IV_LENGTH]))
+        return aes_cipher.decrypt(em[IV_LENGTH:])
 
     def generate_csr(self, private_key, subject_name, extensions=None):
         """Generate certificate signing request.
@@ -371,11 +660,232 @@ class Ecies:
             private_key, self.sign_hash_algorithm, default_backend())
 
 
+class EcKeyPool:
+    """Buffer of fresh EC private keys filled by a background thread.
+
+    Takes key generation off the latency path of enroll/reenroll. Keys
+    only ever live in memory and every key is handed out at most once.
+    When the pool runs dry keys are generated inline, so callers never
+    wait for the refill thread.
+    """
+
+    def __init__(self, crypto: Ecies = None, size=DEFAULT_KEY_POOL_SIZE, low_watermark=None):
+        """ Init the pool and start filling it.
+
+        :param crypto: Ecies instance whose curve (P-256 or P-384) is used
+        :param size: number of keys kept ready
+        :param low_watermark: refill once this many keys or less are left,
+                              a quarter of size by default
+        :return: an instance of EcKeyPool
+        """
+        self._crypto = Ecies() if crypto is None else crypto
+        self.size = size
+        self.low_watermark = size // 4 if low_watermark is None else low_watermark
+        self.hits = 0
+        self.misses = 0
+        self._keys = deque()
+        self._stats_lock = threading.Lock()
+        self._refill = threading.Event()
+        self._closed = False
+        self._thread = threading.Thread(
+            target=self._fill, name='ec-key-pool', daemon=True)
+        self._refill.set()
+        self._thread.start()
+
+    @property
+    def curve(self):
+        """Get the curve of the pooled keys
+
+        :return: curve class
+        """
+        return self._crypto.curve
+
+    def __len__(self):
+        return len(self._keys)
+
+    def _fill(self):
+        while True:
+            self._refill.wait()
+            self._refill.clear()
+            while len(self._keys) < self.size:
+                if self._closed:
+                    return
+                self._keys.append(self._crypto.generate_private_key())
+            if self._closed:
+                return
+
+    def generate_private_key(self):
+        """Take a key out of the pool.
+
+        :return: A private key object which include public key object.
+        """
+        try:
+            key = self._keys.popleft()
+            hit = True
+        except IndexError:
+            key = self._crypto.generate_private_key()
+            hit = False
+
+        with self._stats_lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+        if len(self._keys) <= self.low_watermark and not self._closed:
+            self._refill.set()
+        return key
+
+    def close(self):
+        """Stop the refill thread and drop every unused key"""
+        self._closed = True
+        self._refill.set()
+        self._thread.join()
+        self._keys.clear()
+
+    def __enter__(self) -> 'EcKeyPool':
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
+
+
+class CertInfo:
+    """A parsed X.509 certificate and the fields the SDK reads from it."""
+
+    __slots__ = ('certificate', 'subject', 'public_key',
+                 'aki', 'ski', 'serial', 'not_valid_after')
+
+    def __init__(self, certificate: x509.Certificate) -> None:
+        """
+        :param certificate: parsed certificate
+        :type certificate: x509.Certificate
+        """
+        self.certificate = certificate
+        self.subject = certificate.subject
+        self.public_key = certificate.public_key()
+        self.serial = certificate.serial_number
+        self.not_valid_after = getattr(
+            certificate, 'not_valid_after_utc', None) or certificate.not_valid_after
+
+        try:
+            self.aki = certificate.extensions.get_extension_for_class(
+                x509.AuthorityKeyIdentifier).value.key_identifier
+        except x509.ExtensionNotFound:
+            self.aki = None
+
+        try:
+            self.ski = certificate.extensions.get_extension_for_class(
+                x509.SubjectKeyIdentifier).value.digest
+        except x509.ExtensionNotFound:
+            self.ski = None
+
+
+class CertCache:
+    """Bounded, thread-safe LRU cache of parsed PEM certificates.
+
+    Entries are keyed by the SHA-256 digest of the PEM bytes, so the same
+    member certificate is parsed only once however often it comes back.
+    """
+
+    def __init__(self, maxsize=DEFAULT_CERT_CACHE_SIZE):
+        """
+        :param maxsize: maximum number of certificates kept
+        """
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, pem) -> CertInfo:
+        """Get the parsed certificate, parsing it on a miss
+
+        :param pem: PEM-encoded certificate
+        :type pem: Union[bytes, str]
+        :return: CertInfo
+        """
+        if isinstance(pem, str):
+            pem = pem.encode()
+        key = hashlib.sha256(pem).digest()
+
+        with self._lock:
+            try:
+                info = self._entries[key]
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return info
+            except KeyError:
+                self.misses += 1
+
+        info = CertInfo(x509.load_pem_x509_certificate(pem, default_backend()))
+
+        with self._lock:
+            self._entries[key] = info
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return info
+
+    def clear(self):
+        """Drop every cached certificate and reset the counters"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+
 class CertTools:
+    cache = CertCache()
+
     @staticmethod
     def decode_csr(csr):
-        return csr.public_bytes(Encoding.PEM).decode('utf-8'),
+        return csr.public_bytes(Encoding.PEM).decode('utf-8')
+
+    @staticmethod
+    def load(pem) -> CertInfo:
+        return CertTools.cache.get(pem)
+
+    @staticmethod
+    def load_bundle(pem) -> tuple:
+        """Parse every certificate of a PEM bundle, e.g. a CA chain
+
+        Each certificate goes through the cache, so one shared by several
+        bundles or members is parsed once.
+
+        :raises ValueError: the bundle has no certificate
+        """
+        if isinstance(pem, str):
+            pem = pem.encode()
+        bundle = tuple(CertTools.load(block.group())
+                       for block in _PEM_CERTIFICATE.finditer(pem))
+        if not bundle:
+            raise ValueError("No certificate found in the PEM bundle")
+        return bundle
+
+    @staticmethod
+    def get_subject(pem):
+        return CertTools.load(pem).subject
+
+    @staticmethod
+    def get_public_key(pem):
+        return CertTools.load(pem).public_key
+
+    @staticmethod
+    def get_aki(pem):
+        return CertTools.load(pem).aki
+
+    @staticmethod
+    def get_ski(pem):
+        return CertTools.load(pem).ski
+
+    @staticmethod
+    def get_serial(pem):
+        return CertTools.load(pem).serial
 
     @staticmethod
-    def get_subject(csr):
-        return x509.load_pem_x509_certificate(csr, default_backend()).subject
+    def get_expiry(pem):
+        return CertTools.load(pem).not_valid_after
@@ -1,5 +1,51 @@
-from typing import Protocol
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from threading import Lock
+from typing import Optional, Protocol
+from urllib.parse import urlsplit
 import requests
+from requests.adapters import HTTPAdapter
+
+DEFAULT_POOL_CONNECTIONS = 10
+DEFAULT_POOL_MAXSIZE = 10
+
+# statuses of an overloaded or restarting CA, or of a proxy in front of it
+RETRYABLE_STATUS = frozenset((429, 502, 503, 504))
+
+
+class HttpRetryableError(requests.HTTPError):
+    """The CA answered with one of RETRYABLE_STATUS, the request may be
+    sent again, after ``retry_after`` seconds when the CA asked for it"""
+
+    def __init__(self, status: int, retry_after: float = None, response=None) -> None:
+        super().__init__(f"CA answered with status {status}", response=response)
+        self.status = status
+        self.retry_after = retry_after
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds to wait from a Retry-After header, in seconds or as a date"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        date = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if date.tzinfo is None:
+        date = date.replace(tzinfo=timezone.utc)
+    return max(0.0, (date - datetime.now(timezone.utc)).total_seconds())
+
+
+def _json(r):
+    if r.status_code in RETRYABLE_STATUS:
+        raise HttpRetryableError(
+            r.status_code, parse_retry_after(r.headers.get('Retry-After')), r)
+    return r.json(), r.status_code
 
 
 class HttpProtocol(Protocol):
@@ -9,6 +55,7 @@ class HttpProtocol(Protocol):
         :param path: sub path after the base_url
         :param **param: post request params
         :return: the response body in json
+        :raises HttpRetryableError: the CA answered with a transient status
         """
         pass
 
@@ -18,6 +65,7 @@ class HttpProtocol(Protocol):
         :param path: sub path after the base_url
         :param **param: get request params
         :return: the response body in json
+        :raises HttpRetryableError: the CA answered with a transient status
         """
         pass
 
@@ -27,6 +75,7 @@ class HttpProtocol(Protocol):
         :param path: sub path after the base_url
         :param **param: delete request params
         :return: the response body in json
+        :raises HttpRetryableError: the CA answered with a transient status
         """
         pass
 
@@ -36,12 +85,13 @@ class HttpProtocol(Protocol):
         :param path: sub path after the base_url
         :param **param: update request params
         :return: the response body in json
+        :raises HttpRetryableError: the CA answered with a transient status
         """
         pass
 
     @staticmethod
     def build_http_data(
-        self, data: dict,
+        data: dict,
         predicate=lambda key, value: not value in [None, '']
     ):
         result = {}
@@ -52,6 +102,48 @@ class HttpProtocol(Protocol):
         return result
 
 
+class AsyncHttpProtocol(Protocol):
+    async def post(path, **param):
+        """Send a post request to the ca service without blocking the loop
+
+        :param path: sub path after the base_url
+        :param **param: post request params
+        :return: the response body in json
+        :raises HttpRetryableError: the CA answered with a transient status
+        """
+        pass
+
+    async def get(path, **param):
+        """Send a get request to the ca service without blocking the loop
+
+        :param path: sub path after the base_url
+        :param **param: get request params
+        :return: the response body in json
+        :raises HttpRetryableError: the CA answered with a transient status
+        """
+        pass
+
+    async def delete(path, **param):
+        """Send a delete request to the ca service without blocking the loop
+
+        :param path: sub path after the base_url
+        :param **param: delete request params
+        :return: the response body in json
+        :raises HttpRetryableError: the CA answered with a transient status
+        """
+        pass
+
+    async def update(path, **param):
+        """Send a update request to the ca service without blocking the loop
+
+        :param path: sub path after the base_url
+        :param **param: update request params
+        :return: the response body in json
+        :raises HttpRetryableError: the CA answered with a transient status
+        """
+        pass
+
+
 class HttpClient:
 
     @staticmethod
@@ -63,7 +155,7 @@ class HttpClient:
         :return: the response body in json
         """
         r = requests.post(url=path, **param)
-        return r.json(), r.status_code
+        return _json(r)
 
     @staticmethod
     def get(path, **param):
@@ -74,7 +166,7 @@ class HttpClient:
         :return: the response body in json
         """
         r = requests.get(url=path, **param)
-        return r.json(), r.status_code
+        return _json(r)
 
     @staticmethod
     def delete(path, **param):
@@ -85,7 +177,7 @@ class HttpClient:
         :return: the response body in json
         """
         r = requests.delete(url=path, **param)
-        return r.json(), r.status_code
+        return _json(r)
 
     @staticmethod
     def update(path, **param):
@@ -96,7 +188,152 @@ class HttpClient:
         :return: the response body in json
         """
         r = requests.put(url=path, **param)
-        return r.json(), r.status_code
+        return _json(r)
+
+
+class SessionHttpClient:
+    """Pooled, keep-alive implementation of HttpProtocol.
+
+    Each CA origin (scheme, host and port of ``MSPConfig.url``) gets its own
+    ``requests.Session`` with a dedicated connection pool, so consecutive
+    requests reuse open TCP connections and the TLS session negotiated on
+    them instead of paying a new handshake per call.
+    """
+
+    def __init__(
+        self,
+        pool_connections: int = DEFAULT_POOL_CONNECTIONS,
+        pool_maxsize: int = DEFAULT_POOL_MAXSIZE,
+        pool_block: bool = False,
+        keep_alive: bool = True
+    ) -> None:
+        """
+        :param pool_connections: number of pools cached per session
+        :type pool_connections: int
+
+        :param pool_maxsize: maximum number of connections kept open
+                             per CA
+        :type pool_maxsize: int
+
+        :param pool_block: block when the pool is exhausted instead of
+                           opening throw-away connections
+        :type pool_block: bool
+
+        :param keep_alive: keep connections open between requests
+        :type keep_alive: bool
+        """
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.pool_block = pool_block
+        self.keep_alive = keep_alive
+        self._sessions = {}
+        self._lock = Lock()
+
+    @staticmethod
+    def _origin(url):
+        parts = urlsplit(url)
+        return f'{parts.scheme}://{parts.netloc}'
+
+    def _session(self, url) -> requests.Session:
+        origin = self._origin(url)
+        try:
+            return self._sessions[origin]
+        except KeyError:
+            pass
+
+        with self._lock:
+            try:
+                return self._sessions[origin]
+            except KeyError:
+                session = requests.Session()
+                session.mount(origin, HTTPAdapter(
+                    pool_connections=self.pool_connections,
+                    pool_maxsize=self.pool_maxsize,
+                    pool_block=self.pool_block))
+                if not self.keep_alive:
+                    session.headers['Connection'] = 'close'
+                self._sessions[origin] = session
+                return session
+
+    def warm_up(self, url, connections=1, **param):
+        """Open connections to a CA ahead of the first real request
+
+        Failures are ignored, warm up is best effort only.
+
+        :param url: base url of the ca service
+        :param connections: number of connections to open
+        :param **param: request params, e.g. ``verify``
+        :return: number of connections successfully opened
+        """
+        session = self._session(url)
+        connections = min(connections, self.pool_maxsize)
+
+        def touch(_):
+            try:
+                session.head(url, **param).close()
+                return True
+            except requests.RequestException:
+                return False
+
+        if connections <= 1:
+            return int(touch(0))
+
+        with ThreadPoolExecutor(max_workers=connections) as executor:
+            return sum(executor.map(touch, range(connections)))
+
+    def post(self, path, **param):
+        """Send a post request to the ca service
+
+        :param path: sub path after the base_url
+        :param **param: post request params
+        :return: the response body in json
+        """
+        r = self._session(path).post(url=path, **param)
+        return _json(r)
+
+    def get(self, path, **param):
+        """Send a get request to the ca service
+
+        :param path: sub path after the base_url
+        :param **param: get request params
+        :return: the response body in json
+        """
+        r = self._session(path).get(url=path, **param)
+        return _json(r)
+
+    def delete(self, path, **param):
+        """Send a delete request to the ca service
+
+        :param path: sub path after the base_url
+        :param **param: delete request params
+        :return: the response body in json
+        """
+        r = self._session(path).delete(url=path, **param)
+        return _json(r)
+
+    def update(self, path, **param):
+        """Send a update request to the ca service
+
+        :param path: sub path after the base_url
+        :param **param: update request params
+        :return: the response body in json
+        """
+        r = self._session(path).put(url=path, **param)
+        return _json(r)
+
+    def close(self):
+        """Close every pooled connection"""
+        with self._lock:
+            sessions, self._sessions = self._sessions, {}
+
+        for session in sessions.values():
+            session.close()
+
+    def __enter__(self) -> 'SessionHttpClient':
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
 
 
 class HttpDynamicBody:
@@ -0,0 +1,218 @@
+import hashlib
+import mmap
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Tuple, Union
+
+DEFAULT_MATERIAL_CACHE_SIZE = 256
+MMAP_THRESHOLD = 64 * 1024
+
+PRIVATE_KEY = 'private_key'
+CERTIFICATE = 'certificate'
+CERTIFICATES = 'certificates'
+
+MaterialRef = Union[Dict[str, str], str, None]
+
+
+def _parse_private_key(pem, password):
+    from cryptography.hazmat.backends import default_backend
+    from cryptography.hazmat.primitives.serialization import load_pem_private_key
+    return load_pem_private_key(pem, password, default_backend())
+
+
+def _parse_certificate(pem, _):
+    from .crypto_tools import CertTools
+    return CertTools.load(pem).certificate
+
+
+def _parse_certificates(pem, _):
+    from .crypto_tools import CertTools
+    return tuple(info.certificate for info in CertTools.load_bundle(pem))
+
+
+_PARSERS = {
+    PRIVATE_KEY: _parse_private_key,
+    CERTIFICATE: _parse_certificate,
+    CERTIFICATES: _parse_certificates,
+}
+
+
+class _MappedFile:
+    """Contents of a file, mapped in memory when it is large"""
+
+    def __init__(self, path, size):
+        self._file = open(path, 'rb')
+        self._map = None
+        self._data = None
+        if size >= MMAP_THRESHOLD:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            self._data = self._file.read()
+
+    def digest(self) -> bytes:
+        return hashlib.sha256(self._data if self._map is None else self._map).digest()
+
+    def read(self) -> bytes:
+        return self._data if self._map is None else self._map[:]
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class KeyMaterialResolver:
+    """
+    Lazy loader of the crypto material referenced by the network config,
+    e.g. ``adminPrivateKey``, ``signedCert`` and ``tlsCACerts``.
+
+    A reference is a ``{'path': ...}`` or ``{'pem': ...}`` dict, paths may
+    use ``${VAR}`` and list several comma-separated files. Nothing is read
+    before the first access. Files are digested again only when their
+    mtime or size changes, and parsed objects are kept by content digest,
+    so CAs pointing at identical bundles share the same certificates.
+    Large files are digested through mmap and only copied to be parsed.
+    """
+
+    def __init__(self, maxsize=DEFAULT_MATERIAL_CACHE_SIZE):
+        """
+        :param maxsize: maximum number of parsed objects kept
+        """
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._files: Dict[str, Tuple[Tuple[int, int], bytes]] = {}
+        self._parsed = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._parsed)
+
+    @staticmethod
+    def paths(ref: MaterialRef, base_dir: str = None) -> Tuple[str, ...]:
+        """Files referenced by a config entry, with ${VAR} expanded
+
+        :param ref: config entry
+        :param base_dir: directory relative paths are resolved against,
+                         the directory of the config file that holds the
+                         entry, the working directory when None
+        :return: paths, empty for inline PEM or no reference
+        """
+        if isinstance(ref, dict):
+            ref = ref.get('path')
+        if not ref:
+            return ()
+        paths = (os.path.expanduser(os.path.expandvars(path.strip()))
+                 for path in ref.split(',') if path.strip())
+        if base_dir is None:
+            return tuple(paths)
+        return tuple(os.path.join(base_dir, path) for path in paths)
+
+    def private_key(self, ref: MaterialRef, password: bytes = None, base_dir: str = None):
+        """Get the private key of a config entry
+
+        :param ref: config entry, e.g. ``OrgConfig.admin_pk``
+        :param password: password of an encrypted key
+        :param base_dir: directory relative paths are resolved against
+        :return: the private key, None without reference
+        :raises ValueError: the entry lists more than one file
+        """
+        return self._resolve(PRIVATE_KEY, ref, password, base_dir)
+
+    def certificate(self, ref: MaterialRef, base_dir: str = None):
+        """Get the certificate of a config entry
+
+        :param ref: config entry, e.g. ``OrgConfig.signed_cert``
+        :param base_dir: directory relative paths are resolved against
+        :return: x509.Certificate, None without reference
+        :raises ValueError: the entry lists more than one file
+        """
+        return self._resolve(CERTIFICATE, ref, base_dir=base_dir)
+
+    def certificates(self, ref: MaterialRef, base_dir: str = None) -> tuple:
+        """Get every certificate of a bundle config entry
+
+        :param ref: config entry, e.g. ``MSPConfig.tls_ca_certs``
+        :param base_dir: directory relative paths are resolved against
+        :return: tuple of x509.Certificate, in file order
+        """
+        if isinstance(ref, dict) and ref.get('pem'):
+            return self._resolve(CERTIFICATES, ref)
+        bundle = ()
+        for path in self.paths(ref, base_dir):
+            bundle += self._resolve(CERTIFICATES, {'path': path})
+        return bundle
+
+    def clear(self):
+        """Drop every cached file and object and reset the counters"""
+        with self._lock:
+            self._files.clear()
+            self._parsed.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def _resolve(self, kind, ref, password=None, base_dir=None):
+        if isinstance(ref, dict) and ref.get('pem'):
+            pem = ref['pem']
+            if isinstance(pem, str):
+                pem = pem.encode()
+            return self._parsed_value(
+                kind, hashlib.sha256(pem).digest(), password, lambda: pem)
+
+        paths = self.paths(ref, base_dir)
+        if not paths:
+            return None
+        if len(paths) > 1:
+            raise ValueError(
+                "{0} entry lists {1} files, expected one: {2}".format(
+                    kind, len(paths), ', '.join(paths)))
+        path, = paths
+
+        stat = os.stat(path)
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            known = self._files.get(path)
+        if known is not None and known[0] == stamp:
+            return self._parsed_value(
+                kind, known[1], password, lambda: self._read(path, stat.st_size))
+
+        with _MappedFile(path, stat.st_size) as content:
+            digest = content.digest()
+            with self._lock:
+                self._files[path] = (stamp, digest)
+            return self._parsed_value(kind, digest, password, content.read)
+
+    @staticmethod
+    def _read(path, size):
+        with _MappedFile(path, size) as content:
+            return content.read()
+
+    def _parsed_value(self, kind, digest, password, read):
+        key = (kind, digest, password)
+        with self._lock:
+            try:
+                value = self._parsed[key]
+                self._parsed.move_to_end(key)
+                self.hits += 1
+                return value
+            except KeyError:
+                self.misses += 1
+
+        value = _PARSERS[kind](read(), password)
+
+        with self._lock:
+            self._parsed[key] = value
+            self._parsed.move_to_end(key)
+            while len(self._parsed) > self.maxsize:
+                self._parsed.popitem(last=False)
+        return value
+
+
+resolver = KeyMaterialResolver()
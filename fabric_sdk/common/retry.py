@@ -0,0 +1,351 @@
+import asyncio
+import random
+import threading
+import time
+from typing import Callable, Dict, Iterable
+
+from requests import ConnectTimeout, RequestException
+from urllib3.exceptions import NewConnectionError
+
+from .admission import AdmissionController, AdmittedHttpClient, AsyncAdmittedHttpClient
+from .http_client import RETRYABLE_STATUS, HttpRetryableError
+
+# the aiohttp errors are added by async_http_client, so that sync clients
+# never import aiohttp
+TRANSPORT_ERRORS = (RequestException, OSError, TimeoutError)
+NOT_SENT_ERRORS = (ConnectTimeout, ConnectionRefusedError)
+
+DEFAULT_MAX_ATTEMPTS = 4
+DEFAULT_BASE_DELAY = 0.1
+DEFAULT_MAX_DELAY = 5.0
+DEFAULT_MAX_RETRY_AFTER = 30.0
+DEFAULT_BUDGET_RATIO = 0.1
+DEFAULT_BUDGET_MIN_PER_SECOND = 1.0
+DEFAULT_BUDGET_MAX_BALANCE = 10.0
+
+# statuses sent before the request is processed, safe even for revoke
+NOT_PROCESSED_STATUS = frozenset((429, 503))
+
+
+def was_not_sent(error: Exception, not_sent_errors: tuple = NOT_SENT_ERRORS) -> bool:
+    """The connection to the CA was never made, so the request had no effect
+
+    :param error: the error of the request
+    :param not_sent_errors: errors raised before connecting, ASYNC_NOT_SENT_ERRORS
+                            of async_http_client for aiohttp requests
+    """
+    if isinstance(error, not_sent_errors):
+        return True
+    # requests wraps refused connections in a ConnectionError of a MaxRetryError
+    reason = getattr(error.args[0], 'reason', None) if error.args else None
+    return isinstance(reason, NewConnectionError)
+
+
+def operation_of(path: str) -> str:
+    """Name of the fabric-ca operation of a request, e.g. ``enroll``"""
+    return path.rstrip('/').rsplit('/', 1)[-1]
+
+
+class RetryPolicy:
+    """When and how often a CA operation is retried"""
+
+    def __init__(
+        self,
+        max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+        base_delay: float = DEFAULT_BASE_DELAY,
+        max_delay: float = DEFAULT_MAX_DELAY,
+        statuses: Iterable[int] = RETRYABLE_STATUS,
+        unsent_only: bool = False
+    ) -> None:
+        """
+        :param max_attempts: attempts including the first one
+        :param base_delay: backoff of the first retry, doubled at each retry
+        :param max_delay: longest backoff
+        :param statuses: transient statuses retried
+        :param unsent_only: retry transport errors only when the request
+                            was never sent, for operations that must not run
+                            twice
+        """
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.statuses = frozenset(statuses)
+        self.unsent_only = unsent_only
+
+    def retries(self, error: Exception, not_sent_errors: tuple = NOT_SENT_ERRORS) -> bool:
+        if isinstance(error, HttpRetryableError):
+            return error.status in self.statuses
+        return not self.unsent_only or was_not_sent(error, not_sent_errors)
+
+    def backoff(self, attempt: int, rng: random.Random) -> float:
+        """Full jitter backoff before the retry following ``attempt``"""
+        return rng.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+
+NEVER = RetryPolicy(max_attempts=1)
+
+# enroll and reenroll can run twice without harm, gencrl is read-only.
+# A register or a revoke that reached the CA is never sent again: a
+# second register would fail as already registered, hiding the secret
+# the first one returned. Both are retried only when never sent or
+# refused before processing.
+DEFAULT_POLICIES = {
+    'enroll': RetryPolicy(),
+    'reenroll': RetryPolicy(),
+    'register': RetryPolicy(statuses=NOT_PROCESSED_STATUS, unsent_only=True),
+    'gencrl': RetryPolicy(),
+    'revoke': RetryPolicy(statuses=NOT_PROCESSED_STATUS, unsent_only=True),
+}
+DEFAULT_POLICY = RetryPolicy(statuses=NOT_PROCESSED_STATUS, unsent_only=True)
+
+
+class RetryBudget:
+    """
+    Bounds the retries to a ratio of the requests.
+
+    Each request deposits ``ratio`` of a retry, each retry withdraws one,
+    and ``min_per_second`` retries are always allowed so that a client with
+    little traffic can still retry. When the CA is overloaded every
+    request fails, the budget is quickly spent and the load sent to the CA
+    grows by at most ``ratio``.
+    """
+
+    def __init__(
+        self,
+        ratio: float = DEFAULT_BUDGET_RATIO,
+        min_per_second: float = DEFAULT_BUDGET_MIN_PER_SECOND,
+        max_balance: float = DEFAULT_BUDGET_MAX_BALANCE,
+        clock: Callable[[], float] = time.monotonic
+    ) -> None:
+        """
+        :param ratio: retries allowed per request
+        :param min_per_second: retries allowed per second without requests
+        :param max_balance: retries that can be saved up
+        :param clock: monotonic time in seconds
+        """
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.max_balance = max_balance
+        self._clock = clock
+        self._balance = max_balance
+        self._last = clock()
+        self._lock = threading.Lock()
+
+    @property
+    def balance(self) -> float:
+        return self._balance
+
+    def deposit(self) -> None:
+        """Record a request"""
+        with self._lock:
+            self._balance = min(self.max_balance, self._balance + self.ratio)
+
+    def withdraw(self) -> bool:
+        """Take a retry
+
+        :return: False when the budget is spent
+        """
+        with self._lock:
+            now = self._clock()
+            self._balance = min(
+                self.max_balance, self._balance + (now - self._last) * self.min_per_second)
+            self._last = now
+            if self._balance < 1:
+                return False
+            self._balance -= 1
+            return True
+
+
+class RetryStats:
+    """Retries and latency of one operation, latency includes the retries"""
+
+    __slots__ = ('requests', 'retries', 'failures', 'exhausted', 'latency_total', 'latency_max')
+
+    def __init__(self) -> None:
+        self.requests = 0
+        self.retries = 0
+        self.failures = 0
+        self.exhausted = 0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            'requests': self.requests,
+            'retries': self.retries,
+            'failures': self.failures,
+            'budget_exhausted': self.exhausted,
+            'latency_mean': self.latency_total / self.requests if self.requests else None,
+            'latency_max': self.latency_max,
+        }
+
+
+class RetryingHttpClient:
+    """
+    HttpProtocol retrying the transient failures of another one.
+
+    The policy of a request is chosen by its operation, the last segment
+    of its path. Retries wait a full jitter exponential backoff, or the
+    ``Retry-After`` of the CA when it is longer, and give up when the CA
+    asks to wait more than ``max_retry_after``. Every retry is taken from
+    the budget, shared by all the operations, so retries cannot amplify an
+    overload. Once out of retries the last error is raised.
+
+    Given to a CAClient with a ``rateLimit``, each attempt goes through the
+    admission of the CA, see ``with_admission``: no admission is held
+    while backing off, and a shed attempt is not retried.
+    """
+
+    _admitted_http_client = AdmittedHttpClient
+    transport_errors = TRANSPORT_ERRORS
+    not_sent_errors = NOT_SENT_ERRORS
+
+    def __init__(
+        self,
+        http_client,
+        policies: Dict[str, RetryPolicy] = None,
+        default_policy: RetryPolicy = DEFAULT_POLICY,
+        budget: RetryBudget = None,
+        max_retry_after: float = DEFAULT_MAX_RETRY_AFTER,
+        sleep: Callable[[float], None] = None,
+        clock: Callable[[], float] = time.monotonic,
+        rng: random.Random = None
+    ) -> None:
+        """
+        :param http_client: the HttpProtocol sending the requests
+        :param policies: policy by operation, DEFAULT_POLICIES by default
+        :param default_policy: policy of the other operations
+        :param budget: retry budget, a RetryBudget with default limits
+                       by default
+        :param max_retry_after: longest Retry-After honored, in seconds
+        :param sleep: waits between attempts
+        :param clock: monotonic time in seconds, for the latency
+        :param rng: source of the jitter
+        """
+        self.http_client = http_client
+        self.policies = DEFAULT_POLICIES if policies is None else policies
+        self.default_policy = default_policy
+        self.budget = RetryBudget() if budget is None else budget
+        self.max_retry_after = max_retry_after
+        self._sleep = time.sleep if sleep is None else sleep
+        self._clock = clock
+        self._random = rng or random.Random()
+        self._stats: Dict[str, RetryStats] = {}
+        self._lock = threading.Lock()
+
+    def stats(self) -> Dict[str, dict]:
+        """Retries and latency by operation"""
+        with self._lock:
+            return {operation: stats.as_dict() for operation, stats in self._stats.items()}
+
+    def with_admission(self, controller: AdmissionController) -> 'RetryingHttpClient':
+        """This client with each attempt admitted by ``controller``
+
+        The copy shares the policies, the budget and the stats.
+        """
+        # not copy.copy, which __getattr__ would send to http_client
+        admitted = object.__new__(self.__class__)
+        admitted.__dict__.update(self.__dict__)
+        admitted.http_client = self._admitted_http_client(self.http_client, controller)
+        return admitted
+
+    def _begin(self, path):
+        operation = operation_of(path)
+        self.budget.deposit()
+        with self._lock:
+            try:
+                stats = self._stats[operation]
+            except KeyError:
+                stats = self._stats[operation] = RetryStats()
+        return self.policies.get(operation, self.default_policy), stats
+
+    def _delay(self, policy, stats, attempt, error):
+        """Wait before the next attempt, None to give up"""
+        if attempt + 1 >= policy.max_attempts or not policy.retries(error, self.not_sent_errors):
+            return None
+
+        retry_after = getattr(error, 'retry_after', None)
+        if retry_after is not None and retry_after > self.max_retry_after:
+            return None
+
+        if not self.budget.withdraw():
+            with self._lock:
+                stats.exhausted += 1
+            return None
+
+        with self._lock:
+            stats.retries += 1
+        delay = policy.backoff(attempt, self._random)
+        return delay if retry_after is None else max(delay, retry_after)
+
+    def _end(self, stats, started, failed):
+        latency = self._clock() - started
+        with self._lock:
+            stats.requests += 1
+            stats.failures += failed
+            stats.latency_total += latency
+            stats.latency_max = max(stats.latency_max, latency)
+
+    def _send(self, method, path, **param):
+        policy, stats = self._begin(path)
+        started = self._clock()
+        attempt = 0
+        while True:
+            try:
+                result = getattr(self.http_client, method)(path, **param)
+            except self.transport_errors as e:
+                delay = self._delay(policy, stats, attempt, e)
+                if delay is None:
+                    self._end(stats, started, failed=True)
+                    raise
+                self._sleep(delay)
+                attempt += 1
+                continue
+            self._end(stats, started, failed=False)
+            return result
+
+    def post(self, path, **param):
+        return self._send('post', path, **param)
+
+    def get(self, path, **param):
+        return self._send('get', path, **param)
+
+    def delete(self, path, **param):
+        return self._send('delete', path, **param)
+
+    def update(self, path, **param):
+        return self._send('update', path, **param)
+
+    def __getattr__(self, name):
+        return getattr(self.http_client, name)
+
+
+class AsyncRetryingHttpClient(RetryingHttpClient):
+    """AsyncHttpProtocol retrying the transient failures of another one,
+    see RetryingHttpClient"""
+
+    _admitted_http_client = AsyncAdmittedHttpClient
+
+    def __init__(self, http_client, *args, sleep: Callable = None, **kwargs) -> None:
+        from .async_http_client import ASYNC_NOT_SENT_ERRORS, ASYNC_TRANSPORT_ERRORS
+        super().__init__(http_client, *args, sleep=sleep or asyncio.sleep, **kwargs)
+        self.transport_errors = ASYNC_TRANSPORT_ERRORS
+        self.not_sent_errors = ASYNC_NOT_SENT_ERRORS
+
+    async def _send(self, method, path, **param):
+        policy, stats = self._begin(path)
+        started = self._clock()
+        attempt = 0
+        while True:
+            try:
+                result = await getattr(self.http_client, method)(path, **param)
+            except self.transport_errors as e:
+                delay = self._delay(policy, stats, attempt, e)
+                if delay is None:
+                    self._end(stats, started, failed=True)
+                    raise
+                await self._sleep(delay)
+                attempt += 1
+                continue
+            self._end(stats, started, failed=False)
+            return result
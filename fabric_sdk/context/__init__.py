@@ -1 +1,4 @@
-from .load_yaml import Context, ContextClient
+from .context import ChannelConfig, PeerRole
+from .load_yaml import Context, ContextClient, LiveContextClient, registry, watch
+from .registry import ContextRegistry, LiveContext
+from .watcher import ConfigWatcher
@@ -1,4 +1,9 @@
-from typing import List, Dict
+import os
+from enum import IntFlag
+from typing import Iterable, List, Dict, Optional, Set, Tuple
+
+from fabric_sdk.common.key_material import resolver as key_material
+from fabric_sdk.domain.immutable import Immutable
 
 
 def dict_get(_dict):
@@ -10,34 +15,60 @@ def dict_get(_dict):
     return f
 
 
-class OrgConfig:
+class OrgConfig(Immutable):
+    __slots__ = ('msp_id', 'admin_pk', 'signed_cert', 'peers', 'ca_list', 'config_dir')
+
     def __init__(
         self,
         msp_id: str,
         admin_pk: Dict[str, str],
         signed_cert: Dict[str, str],
-        peers: List[str] = [],
-        ca_list: List[str] = []
+        peers: Iterable[str] = (),
+        ca_list: Iterable[str] = (),
+        config_dir: str = None
     ) -> None:
-        self.msp_id = msp_id
-        self.admin_pk = admin_pk
-        self.signed_cert = signed_cert
-        self.peers = peers
-        self.ca_list = ca_list
+        _set = object.__setattr__
+        _set(self, 'msp_id', msp_id)
+        _set(self, 'admin_pk', admin_pk)
+        _set(self, 'signed_cert', signed_cert)
+        _set(self, 'peers', tuple(peers))
+        _set(self, 'ca_list', tuple(ca_list))
+        _set(self, 'config_dir', config_dir)
+
+    msp_id: str
+    admin_pk: Dict[str, str]
+    signed_cert: Dict[str, str]
+    peers: Tuple[str, ...]
+    ca_list: Tuple[str, ...]
+    # directory of the config file, relative key paths start there
+    config_dir: Optional[str]
+
+    @property
+    def admin_private_key(self):
+        """The adminPrivateKey, loaded and parsed on first access"""
+        return key_material.private_key(self.admin_pk, base_dir=self.config_dir)
+
+    @property
+    def admin_cert(self):
+        """The signedCert as a x509.Certificate, loaded on first access"""
+        return key_material.certificate(self.signed_cert, base_dir=self.config_dir)
 
     @staticmethod
-    def load(config):
+    def load(config, config_dir=None):
         config_get = dict_get(config)
         return OrgConfig(
             msp_id=config_get('mspid', lambda: None),
             admin_pk=config_get('adminPrivateKey', lambda: {}),
             signed_cert=config_get('signedCert', lambda: {}),
-            peers=config_get('peers', lambda: []),
-            ca_list=config_get('certificateAuthorities', lambda: [])
+            peers=config_get('peers', lambda: ()),
+            ca_list=config_get('certificateAuthorities', lambda: ()),
+            config_dir=config_dir
         )
 
 
-class MSPConfig:
+class MSPConfig(Immutable):
+    __slots__ = ('name', 'url', 'http_options', 'tls_ca_certs', 'registrar', 'rate_limit', 'config_dir')
+
     def __init__(
         self,
         name: str,
@@ -45,33 +76,60 @@ class MSPConfig:
         http_options: Dict[str, str],
         tls_ca_certs: Dict[str, str],
         registrar: Dict[str, str],
+        rate_limit: Dict[str, float] = None,
+        config_dir: str = None
     ) -> None:
-        self.name = name
-        self.url = url
-        self.http_options = http_options
-        self.tls_ca_certs = tls_ca_certs
-        self.registrar = registrar
+        _set = object.__setattr__
+        _set(self, 'name', name)
+        _set(self, 'url', url)
+        _set(self, 'http_options', http_options)
+        _set(self, 'tls_ca_certs', tls_ca_certs)
+        _set(self, 'registrar', registrar)
+        _set(self, 'rate_limit', rate_limit or {})
+        _set(self, 'config_dir', config_dir)
+
+    name: str
+    url: str
+    http_options: Dict[str, str]
+    tls_ca_certs: Dict[str, str]
+    registrar: Dict[str, str]
+    rate_limit: Dict[str, float]
+    config_dir: Optional[str]
+
+    @property
+    def tls_ca_bundle(self) -> tuple:
+        """The tlsCACerts certificates, loaded on first access"""
+        return key_material.certificates(self.tls_ca_certs, base_dir=self.config_dir)
 
     @staticmethod
-    def load(config, default_name):
+    def load(config, default_name, config_dir=None):
         config_get = dict_get(config)
         return MSPConfig(
             name=config_get('caName', lambda: default_name),
             url=config_get('url', lambda: 'https://localhost:7054'),
             http_options=config_get('httpOptions', lambda: {}),
             tls_ca_certs=config_get('tlsCACerts', lambda: {}),
-            registrar=config_get('registrar', lambda: {})
+            registrar=config_get('registrar', lambda: {}),
+            rate_limit=config_get('rateLimit', lambda: {}),
+            config_dir=config_dir
         )
 
 
-class ClientConfig:
+class ClientConfig(Immutable):
+    __slots__ = ('organization', 'connection', 'credential_store')
+
     def __init__(self,
                  organization: str,
                  connection: Dict[str, str],
                  credential_store: Dict[str, str],) -> None:
-        self.organization = organization
-        self.connection = connection
-        self.credential_store = credential_store
+        _set = object.__setattr__
+        _set(self, 'organization', organization)
+        _set(self, 'connection', connection)
+        _set(self, 'credential_store', credential_store)
+
+    organization: str
+    connection: Dict[str, str]
+    credential_store: Dict[str, str]
 
     @staticmethod
     def load(config):
@@ -83,27 +141,282 @@ class ClientConfig:
         )
 
 
+class PeerRole(IntFlag):
+    """Roles of a peer in a channel, as in the ``channels`` section"""
+
+    ENDORSING_PEER = 1
+    CHAINCODE_QUERY = 2
+    LEDGER_QUERY = 4
+    EVENT_SOURCE = 8
+
+
+_ROLE_KEYS = (
+    ('endorsingPeer', PeerRole.ENDORSING_PEER),
+    ('chaincodeQuery', PeerRole.CHAINCODE_QUERY),
+    ('ledgerQuery', PeerRole.LEDGER_QUERY),
+    ('eventSource', PeerRole.EVENT_SOURCE),
+)
+
+# plain int, ~ of an IntFlag only flips its known bits
+_ALL_ROLES = int(PeerRole.ENDORSING_PEER | PeerRole.CHAINCODE_QUERY | PeerRole.LEDGER_QUERY | PeerRole.EVENT_SOURCE)
+
+
+class ChannelConfig(Immutable):
+    """
+    Peers and orderers of a channel. The roles of each peer are kept as
+    one PeerRole bitmask, and the peers having each role are indexed, for
+    the whole channel and per organization, when the channel is built.
+    """
+
+    __slots__ = ('name', 'orderers', 'roles', '_by_role', '_by_org_role')
+
+    def __init__(
+        self,
+        name: str,
+        orderers: Iterable[str],
+        roles: Dict[str, int],
+        org_of_peer: Dict[str, str] = None
+    ) -> None:
+        """
+        :param name: name of the channel
+        :type name: str
+
+        :param orderers: orderers of the channel
+        :type orderers: Iterable[str]
+
+        :param roles: PeerRole bitmask of each peer of the channel
+        :type roles: Dict[str, int]
+
+        :param org_of_peer: organization of each peer, to index the
+                            peers by organization
+        :type org_of_peer: Dict[str, str]
+        """
+        org_of_peer = org_of_peer or {}
+        by_role = {role: [] for role in PeerRole}
+        by_org_role = {}
+        for peer, mask in roles.items():
+            org = org_of_peer.get(peer)
+            for role in PeerRole:
+                if mask & role:
+                    by_role[role].append(peer)
+                    if org is not None:
+                        by_org_role.setdefault((org, role), []).append(peer)
+
+        _set = object.__setattr__
+        _set(self, 'name', name)
+        _set(self, 'orderers', tuple(orderers))
+        _set(self, 'roles', dict(roles))
+        _set(self, '_by_role', {role: tuple(peers) for role, peers in by_role.items()})
+        _set(self, '_by_org_role', {key: tuple(peers) for key, peers in by_org_role.items()})
+
+    name: str
+    orderers: Tuple[str, ...]
+    roles: Dict[str, int]
+
+    @property
+    def peers(self) -> Tuple[str, ...]:
+        return tuple(self.roles)
+
+    def peers_with(self, role: PeerRole, org: str = None) -> Tuple[str, ...]:
+        """Get the peers having a role, in config order
+
+        A single role is answered from the index, a combination of roles
+        (e.g. ``ENDORSING_PEER | EVENT_SOURCE``) filters the peers of its
+        first role.
+
+        :param role: PeerRole, or several of them or-ed
+        :param org: only the peers of this organization
+        :return: names of the peers
+        :raises ValueError: no role, or bits that are not a PeerRole
+        """
+        if role in self._by_role:
+            if org is None:
+                return self._by_role[role]
+            return self._by_org_role.get((org, role), ())
+
+        if not role or int(role) & ~_ALL_ROLES:
+            raise ValueError(f"Invalid peer role {role!r}")
+        first = PeerRole(role & -role)
+        return tuple(peer for peer in self.peers_with(first, org)
+                     if self.roles[peer] & role == role)
+
+    def any_peer(self, role: PeerRole, org: str = None) -> Optional[str]:
+        """Get one peer having a role
+
+        :param role: PeerRole
+        :param org: only the peers of this organization
+        :return: name of the peer, None if no peer has the role
+        """
+        peers = self.peers_with(role, org)
+        return peers[0] if peers else None
+
+    @staticmethod
+    def load(config, name, org_of_peer=None):
+        config_get = dict_get(config or {})
+        roles = {}
+        for peer, peer_config in (config_get('peers', lambda: None) or {}).items():
+            peer_get = dict_get(peer_config or {})
+            mask = 0
+            for key, role in _ROLE_KEYS:
+                if peer_get(key, lambda: True):
+                    mask |= role
+            roles[peer] = mask
+        return ChannelConfig(
+            name=name,
+            orderers=config_get('orderers', lambda: None) or (),
+            roles=roles,
+            org_of_peer=org_of_peer
+        )
+
+
 class Network:
     def __init__(self, network_name: str) -> None:
         self.org_name = network_name
         self._dict_org = {}
         self._dict_ca = {}
         self.client = []
+        self._sources = {}
+
+        self._client_by_org: Dict[str, ClientConfig] = {}
+        self._org_by_msp_id: Dict[str, OrgConfig] = {}
+        self._ca_by_url: Dict[str, MSPConfig] = {}
+        self._peers_by_org: Dict[str, Tuple[str, ...]] = {}
+        self._org_by_peer: Dict[str, str] = {}
+
+        self._channel_configs: Dict[str, dict] = {}
+        self._dict_channel: Dict[str, ChannelConfig] = {}
+
+    def _add_org(self, name, org: OrgConfig, source):
+        self._dict_org[name] = org
+        self._sources[('org', name)] = source
+        self._index_org(name, org)
+
+    def _add_ca(self, name, ca: MSPConfig, source):
+        self._dict_ca[name] = ca
+        self._sources[('ca', name)] = source
+        self._ca_by_url.setdefault(ca.url, ca)
+
+    def _add_channel(self, name, source):
+        self._channel_configs[name] = source
+        self._sources[('channel', name)] = source
+        self._dict_channel = {}
+
+    def _add_client(self, client: ClientConfig, source):
+        self.client.append(client)
+        self._sources.setdefault(('client', client.organization), source)
+        self._client_by_org.setdefault(client.organization, client)
+
+    def _index_org(self, name, org: OrgConfig):
+        if org.msp_id is not None:
+            self._org_by_msp_id.setdefault(org.msp_id, org)
+        self._peers_by_org[name] = tuple(org.peers)
+        for peer in org.peers:
+            self._org_by_peer.setdefault(peer, name)
+        self._dict_channel = {}
+
+    def channel(self, name) -> ChannelConfig:
+        """Get a channel, built and indexed on first access
+
+        Channels are built once every organization is known, the cache is
+        dropped when an organization or a channel is added.
+
+        :raises KeyError: no channel with that name
+        """
+        try:
+            return self._dict_channel[name]
+        except KeyError:
+            channel = ChannelConfig.load(
+                self._channel_configs[name], name, self._org_by_peer)
+            self._dict_channel[name] = channel
+            return channel
+
+    def _reindex(self):
+        self._client_by_org = {}
+        for client in self.client:
+            self._client_by_org.setdefault(client.organization, client)
+
+        self._org_by_msp_id = {}
+        self._peers_by_org = {}
+        self._org_by_peer = {}
+        self._dict_channel = {}
+        for name, org in self._dict_org.items():
+            self._index_org(name, org)
+
+        self._ca_by_url = {}
+        for ca in self._dict_ca.values():
+            self._ca_by_url.setdefault(ca.url, ca)
+
+    def __getstate__(self):
+        # the raw configs are not kept in snapshots, a network loaded from
+        # one is rebuilt entirely by its first reload
+        state = self.__dict__.copy()
+        state['_sources'] = None
+        return state
+
+    def _reuse_unchanged(self, old: 'Network'):
+        """Keep the entries of ``old`` whose source config did not change"""
+        old_sources = old._sources or {}
+        for name, org in self._dict_org.items():
+            if name in old._dict_org and self._sources[('org', name)] == old_sources.get(('org', name)):
+                self._dict_org[name] = old._dict_org[name]
+
+        for name, ca in self._dict_ca.items():
+            if name in old._dict_ca and self._sources[('ca', name)] == old_sources.get(('ca', name)):
+                self._dict_ca[name] = old._dict_ca[name]
+
+        old_clients = {client.organization: client for client in old.client}
+        for i, client in enumerate(self.client):
+            key = ('client', client.organization)
+            if client.organization in old_clients and self._sources[key] == old_sources.get(key):
+                self.client[i] = old_clients[client.organization]
+
+        self._reindex()
+
+
+class ContextClient(Immutable):
+    """Immutable view of the config of one client, safe to share"""
+
+    __slots__ = ('client', 'orgs', 'ca_list', '_ca_by_name')
 
-
-class ContextClient:
     def __init__(self, client, orgs, ca_list) -> None:
-        self.client: ClientConfig = client
-        self.orgs: OrgConfig = orgs
-        self.ca_list: List[MSPConfig] = ca_list
+        object.__setattr__(self, 'client', client)
+        object.__setattr__(self, 'orgs', orgs)
+        object.__setattr__(self, 'ca_list', tuple(ca_list))
+        object.__setattr__(self, '_ca_by_name', {})
+        for ca in self.ca_list:
+            self._ca_by_name.setdefault(ca.name, ca)
+
+    client: ClientConfig
+    orgs: OrgConfig
+    ca_list: Tuple[MSPConfig, ...]
+
+    def get_ca(self, name) -> MSPConfig:
+        """Get a CA of the client's organization by its name
+
+        :param name: caName of the CA
+        :return: MSPConfig
+        :raises KeyError: no CA of the organization has that name
+        """
+        return self._ca_by_name[name]
+
 
 # TODO: Doc Exception
 
 
 class ConfigManager:
     def __init__(self) -> None:
+        # (path, raw config) of every file, None when loaded from a snapshot
         self.description_list = []
         self._networks = {}
+        self.load_report = None
+        # path -> snapshot Fingerprint of the file each config was read from
+        self.fingerprints = {}
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['description_list'] = None
+        state['load_report'] = None
+        return state
 
     def _select_network(self, name=None) -> Network:
         if name is None:
@@ -123,17 +436,86 @@ class ConfigManager:
 
     def _select_client(self, network: Network, name=None) -> ClientConfig:
         if name is None:
-            print(network.client)
             if len(network.client) == 1:
                 return network.client[0]
             else:
                 raise Exception()
         else:
             try:
-                return [client for client in network.client if client.organization == name][0]
+                return network._client_by_org[name]
             except KeyError:
                 raise Exception()
 
+    def get_client(self, organization, network_name=None) -> ClientConfig:
+        """Get the client config of an organization
+
+        :param organization: organization of the client
+        :param network_name: name of the network, the default one if None
+        :return: ClientConfig
+        :raises KeyError: no client for that organization
+        """
+        return self._select_network(network_name)._client_by_org[organization]
+
+    def get_org(self, name, network_name=None) -> OrgConfig:
+        """Get an organization by its name
+
+        :param name: name of the organization
+        :param network_name: name of the network, the default one if None
+        :return: OrgConfig
+        :raises KeyError: no organization with that name
+        """
+        return self._select_network(network_name)._dict_org[name]
+
+    def get_org_by_msp_id(self, msp_id, network_name=None) -> OrgConfig:
+        """Get an organization by its MSP ID
+
+        :param msp_id: mspid of the organization
+        :param network_name: name of the network, the default one if None
+        :return: OrgConfig
+        :raises KeyError: no organization with that MSP ID
+        """
+        return self._select_network(network_name)._org_by_msp_id[msp_id]
+
+    def get_ca(self, name, network_name=None) -> MSPConfig:
+        """Get a CA by its name in the certificateAuthorities section
+
+        :param name: name of the CA
+        :param network_name: name of the network, the default one if None
+        :return: MSPConfig
+        :raises KeyError: no CA with that name
+        """
+        return self._select_network(network_name)._dict_ca[name]
+
+    def get_ca_by_url(self, url, network_name=None) -> MSPConfig:
+        """Get a CA by its url
+
+        :param url: url of the CA
+        :param network_name: name of the network, the default one if None
+        :return: MSPConfig
+        :raises KeyError: no CA with that url
+        """
+        return self._select_network(network_name)._ca_by_url[url]
+
+    def get_peers(self, organization, network_name=None) -> Tuple[str, ...]:
+        """Get the peers of an organization
+
+        :param organization: name of the organization
+        :param network_name: name of the network, the default one if None
+        :return: names of the peers
+        :raises KeyError: no organization with that name
+        """
+        return self._select_network(network_name)._peers_by_org[organization]
+
+    def get_channel(self, name, network_name=None) -> ChannelConfig:
+        """Get a channel with its peers indexed by role
+
+        :param name: name of the channel
+        :param network_name: name of the network, the default one if None
+        :return: ChannelConfig
+        :raises KeyError: no channel with that name
+        """
+        return self._select_network(network_name).channel(name)
+
     def client_compile(self, client_name=None, network_name=None) -> ContextClient:
         network = self._select_network(network_name)
         client = self._select_client(network, name=client_name)
@@ -153,25 +535,82 @@ class ConfigManager:
 
         return ContextClient(client, org, ca_list)
 
-    def add_new_config(self, path, config):
-        self.description_list.append((path, config))
-
+    @staticmethod
+    def _network_name(config):
         try:
-            name = config['name']
+            return config['name']
         except KeyError:
-            name = 'default'
+            return 'default'
 
+    def add_new_config(self, path, config):
+        self.description_list.append((path, config))
+
+        name = self._network_name(config)
         try:
             network = self._networks[name]
         except KeyError:
             self._networks[name] = Network(name)
             network = self._networks[name]
 
-        self.__find_org_config(config, network)
-        self.__find_ca_config(config, network)
+        self.__merge_config(path, config, network)
+
+    def update_config(self, path, config=None) -> Set[str]:
+        """Replace the config loaded from a file and recompile only the
+        networks it contributes to
+
+        Other files are not parsed again, the affected networks are rebuilt
+        from the configs already loaded, keeping the entries that did not
+        change. Each rebuilt network replaces the old one in a single
+        assignment, so readers see either the old or the new version.
+
+        A manager loaded from a snapshot has no raw configs, they are
+        given back first with ``description_list``.
+
+        :param path: path of the changed file
+        :param config: new parsed content, None when the file was removed
+        :return: names of the networks that were recompiled
+        :raises ValueError: the raw configs are missing
+        """
+        if self.description_list is None:
+            raise ValueError("The raw configs of a snapshot must be loaded before an update")
+        affected = {self._network_name(old_config)
+                    for old_path, old_config in self.description_list if old_path == path}
+
+        description_list = [(p, c) for p, c in self.description_list if p != path]
+        if config is not None:
+            description_list.append((path, config))
+            description_list.sort(key=lambda description: description[0])
+            affected.add(self._network_name(config))
+        self.description_list = description_list
+
+        for name in affected:
+            network = Network(name)
+            configs = [(p, c) for p, c in description_list if self._network_name(c) == name]
+            for config_path, network_config in configs:
+                self.__merge_config(config_path, network_config, network)
+
+            if not configs:
+                self._networks.pop(name, None)
+                continue
+
+            try:
+                network._reuse_unchanged(self._networks[name])
+            except KeyError:
+                pass
+            self._networks[name] = network
+
+        return affected
+
+    def __merge_config(self, path, config, network: Network):
+        # relative paths to key material start at the config file, as the
+        # files of the config directory do
+        config_dir = os.path.dirname(os.path.abspath(path))
+        self.__find_org_config(config, network, config_dir)
+        self.__find_ca_config(config, network, config_dir)
         self.__find_client_config(config, network)
+        self.__find_channel_config(config, network)
 
-    def __find_org_config(self, config, network: Network):
+    def __find_org_config(self, config, network: Network, config_dir):
         try:
             data = config['organizations']
         except KeyError:
@@ -181,9 +620,9 @@ class ConfigManager:
             try:
                 _ = network._dict_org[org_name]
             except KeyError:
-                network._dict_org[org_name] = OrgConfig.load(config)
+                network._add_org(org_name, OrgConfig.load(org_config, config_dir), org_config)
 
-    def __find_ca_config(self, config, network: Network):
+    def __find_ca_config(self, config, network: Network, config_dir):
         try:
             data = config['certificateAuthorities']
         except KeyError:
@@ -193,8 +632,8 @@ class ConfigManager:
             try:
                 _ = network._dict_ca[ca_name]
             except KeyError:
-                network._dict_ca[ca_name] = MSPConfig.load(
-                    ca_config, default_name=ca_name)
+                network._add_ca(ca_name, MSPConfig.load(
+                    ca_config, default_name=ca_name, config_dir=config_dir), ca_config)
 
     def __find_client_config(self, config, network: Network):
         try:
@@ -202,4 +641,14 @@ class ConfigManager:
         except KeyError:
             return
 
-        network.client.append(ClientConfig.load(data))
+        network._add_client(ClientConfig.load(data), data)
+
+    def __find_channel_config(self, config, network: Network):
+        try:
+            data = config['channels']
+        except KeyError:
+            return
+
+        for channel_name, channel_config in (data or {}).items():
+            if channel_name not in network._channel_configs:
+                network._add_channel(channel_name, channel_config)
@@ -3,25 +3,251 @@ try:
     from yaml import CLoader as Loader, CDumper as Dumper
 except ImportError:
     from yaml import Loader, Dumper
-from fabric_sdk.__env__ import FABRIC_PYTHON_SDK_NETWORK_CONFIG
-import os
+from fabric_sdk.__env__ import FABRIC_PYTHON_SDK_NETWORK_CONFIG, FABRIC_PYTHON_SDK_CONFIG_CACHE, \
+    FABRIC_PYTHON_SDK_REQUIRE_C_LOADER
 from .context import ContextClient, ConfigManager
+from .registry import ContextRegistry, LiveContext
+from .watcher import ConfigWatcher, DEFAULT_POLL_INTERVAL
+from .snapshot import Fingerprint, fingerprint, load_snapshot, save_snapshot, snapshot_path
 
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Tuple
 import os
+import time
 
+LOADER_NAME = Loader.__name__
+
+
+class LoadReport:
+    """How the files of a config directory were loaded"""
+
+    def __init__(
+        self,
+        loader: str,
+        timings: Dict[str, float],
+        elapsed: float,
+        from_snapshot: bool = False
+    ) -> None:
+        """
+        :param loader: name of the yaml loader, CLoader or Loader
+        :type loader: str
+
+        :param timings: seconds spent reading and parsing each file
+        :type timings: Dict[str, float]
+
+        :param elapsed: seconds spent loading the whole directory
+        :type elapsed: float
+
+        :param from_snapshot: the compiled snapshot was used, no file
+                              was parsed
+        :type from_snapshot: bool
+        """
+        self.loader = loader
+        self.timings = timings
+        self.elapsed = elapsed
+        self.from_snapshot = from_snapshot
+
+
+def require_c_loader(strict=None):
+    """Fail when strict and the libyaml C loader is not available
+
+    :param strict: defaults to the FABRIC_PYTHON_SDK_REQUIRE_C_LOADER
+                   environment variable
+    :raises ImportError: the pure-Python loader would be used
+    """
+    if strict is None:
+        strict = os.getenv(FABRIC_PYTHON_SDK_REQUIRE_C_LOADER) not in (None, '', '0', 'false', 'False')
+
+    if strict and LOADER_NAME != 'CLoader':
+        raise ImportError(
+            "yaml CLoader is not available, install PyYAML with libyaml "
+            "or unset {0}".format(FABRIC_PYTHON_SDK_REQUIRE_C_LOADER))
+
+
+def config_files(config_path):
+    dir_list = sorted(os.listdir(config_path))
+    return [f'{config_path}/{file}' for file in dir_list if file.endswith('.yaml')]
+
+
+def load_config_file(path) -> dict:
+    with open(path, 'rb') as config_file:
+        return load(config_file.read(), Loader=Loader)
+
+
+def _parse_config_file(path):
+    start = time.perf_counter()
+    stat = os.stat(path)
+    with open(path, 'rb') as config_file:
+        content = config_file.read()
+    config = load(content, Loader=Loader)
+    return fingerprint(path, content, stat), config, time.perf_counter() - start
+
+
+def load_config_files(
+    paths: List[str],
+    max_workers: int = None,
+    processes: bool = None,
+    strict: bool = None
+) -> Tuple[List[Tuple[Fingerprint, dict]], LoadReport]:
+    """Read and parse config files in parallel
+
+    Each file is read in one call and parsed by a worker thread. libyaml
+    keeps the GIL while parsing, so a caller loading a large directory may
+    opt in to worker processes; the library never starts processes on its
+    own, they can't be used from every platform, daemon or frozen app.
+
+    :param paths: config files, results keep this order
+    :param max_workers: size of the worker pool
+    :param processes: use processes instead of threads, threads when None
+    :param strict: fail when the C loader is not available, see
+                   require_c_loader
+    :return: fingerprint and parsed content of each file, and the report
+    :raises ImportError: strict and the C loader is not available
+    """
+    require_c_loader(strict)
+    start = time.perf_counter()
+
+    if len(paths) <= 1:
+        results = [_parse_config_file(path) for path in paths]
+    elif processes:
+        # multiprocessing is only imported when the caller asks for it
+        from concurrent.futures import ProcessPoolExecutor
+        workers = max_workers or os.cpu_count() or 1
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(
+                _parse_config_file, paths,
+                chunksize=max(1, len(paths) // (workers * 4))))
+    else:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            results = list(executor.map(_parse_config_file, paths))
+
+    report = LoadReport(
+        LOADER_NAME,
+        {file_fingerprint[0]: elapsed for file_fingerprint, _, elapsed in results},
+        time.perf_counter() - start)
+    return [(file_fingerprint, config) for file_fingerprint, config, _ in results], report
+
+
+def load_config_manager(config_path, processes: bool = None, strict: bool = None) -> ConfigManager:
+    """Build the ConfigManager of a config directory
+
+    How the files were loaded is kept in ``manager.load_report``. When
+    FABRIC_PYTHON_SDK_CONFIG_CACHE names a directory, the compiled
+    manager is kept there and reused until a config file changes. The
+    snapshots are pickles: that directory must only be writable by the
+    user running the SDK, see load_snapshot.
+
+    :param config_path: directory with the .yaml network config files
+    :param processes: parse the files in worker processes, see
+                      load_config_files
+    :param strict: fail when the C loader is not available, see
+                   require_c_loader
+    :return: ConfigManager with every file loaded
+    :raises ImportError: strict and the C loader is not available
+    """
+    require_c_loader(strict)
+    files = config_files(config_path)
+    cache_dir = os.getenv(FABRIC_PYTHON_SDK_CONFIG_CACHE)
+
+    if cache_dir:
+        start = time.perf_counter()
+        cache_path = snapshot_path(cache_dir, config_path)
+        manager = load_snapshot(cache_path, files)
+        if manager is not None:
+            manager.load_report = LoadReport(
+                LOADER_NAME, {}, time.perf_counter() - start, from_snapshot=True)
+            return manager
+
+    loaded, report = load_config_files(files, processes=processes, strict=strict)
 
-def Context(client_name=None, network_name=None) -> ContextClient:
-    config_path = os.getenv(FABRIC_PYTHON_SDK_NETWORK_CONFIG)
     manager = ConfigManager()
+    for (path, *_), config in loaded:
+        manager.add_new_config(path, config)
+    fingerprints = [file_fingerprint for file_fingerprint, _ in loaded]
+    manager.fingerprints = {file_fingerprint[0]: file_fingerprint for file_fingerprint in fingerprints}
+
+    if cache_dir:
+        save_snapshot(cache_path, fingerprints, manager)
+
+    manager.load_report = report
+    return manager
+
+
+registry = ContextRegistry(load_config_manager)
+
+
+def Context(client_name=None, network_name=None, strict: bool = None) -> ContextClient:
+    """Compiled context of a client of FABRIC_PYTHON_SDK_NETWORK_CONFIG
+
+    :param strict: fail when the C loader is not available, see
+                   require_c_loader
+    :raises ImportError: strict and the C loader is not available
+    """
+    require_c_loader(strict)
+    config_path = os.getenv(FABRIC_PYTHON_SDK_NETWORK_CONFIG)
+    return registry.context(config_path, client_name, network_name)
+
+
+def LiveContextClient(client_name=None, network_name=None, strict: bool = None) -> LiveContext:
+    """Context of a client following the reloads, see Context"""
+    require_c_loader(strict)
+    config_path = os.getenv(FABRIC_PYTHON_SDK_NETWORK_CONFIG)
+    return registry.live(config_path, client_name, network_name)
+
+
+def watch(config_path=None, interval=DEFAULT_POLL_INTERVAL) -> ConfigWatcher:
+    """Hot reload a config directory into the process-wide registry
+
+    Only the files that changed are parsed again, see
+    ContextRegistry.reload.
+
+    :param config_path: directory to watch, FABRIC_PYTHON_SDK_NETWORK_CONFIG
+                        by default
+    :param interval: seconds between two polls
+    :return: the started ConfigWatcher, stop it to stop reloading
+    """
+    if config_path is None:
+        config_path = os.getenv(FABRIC_PYTHON_SDK_NETWORK_CONFIG)
+
+    return ConfigWatcher(
+        config_path, lambda: config_files(config_path),
+        lambda paths: reload_config_files(config_path, paths), interval).start()
+
+
+def reload_config_files(config_path, paths: List[str]):
+    """Parse changed config files into the process-wide registry
+
+    When FABRIC_PYTHON_SDK_CONFIG_CACHE names a directory, the snapshot
+    of the config directory is rewritten from the reloaded manager, so the
+    next process starts from the new configuration without parsing it.
+
+    :param config_path: config directory the files belong to
+    :param paths: files added, modified or removed
+    """
+    manager = registry.loaded(config_path)
+    if manager is not None and manager.description_list is None:
+        # loaded from a snapshot, the unchanged files are parsed once
+        unchanged = [path for path in manager.fingerprints if path not in paths]
+        restored, _ = load_config_files(unchanged, processes=False)
+        manager.description_list = sorted(
+            ((path, config) for (path, *_), config in restored), key=lambda description: description[0])
+
+    existing = [path for path in paths if os.path.exists(path)]
+    loaded, _ = load_config_files(existing, processes=False)
+    configs = {path: None for path in paths}
+    configs.update({path: config for (path, *_), config in loaded})
+    registry.reload(config_path, configs)
+
+    manager = registry.loaded(config_path)
+    if manager is None:
+        return
+
+    for path in paths:
+        manager.fingerprints.pop(path, None)
+    manager.fingerprints.update({file_fingerprint[0]: file_fingerprint for file_fingerprint, _ in loaded})
 
-    dir_list = os.listdir(config_path)
-    dir_list = [file for file in dir_list if file.endswith('.yaml')]
-    for file in dir_list:
-        path = f'{config_path}/{file}'
-        with open(path, 'r') as config_file:
-            config = config_file.read()
-            config = load(config, Loader=Loader)
-            manager.add_new_config(path, config)
-            config_file.close()
-
-    return manager.client_compile(client_name, network_name)
+    cache_dir = os.getenv(FABRIC_PYTHON_SDK_CONFIG_CACHE)
+    if cache_dir:
+        save_snapshot(snapshot_path(cache_dir, config_path),
+                      [file_fingerprint for _, file_fingerprint in sorted(manager.fingerprints.items())],
+                      manager)
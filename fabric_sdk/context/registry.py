@@ -0,0 +1,148 @@
+import threading
+from typing import Callable, Dict, Optional, Set, Tuple
+
+from .context import ConfigManager, ContextClient
+
+
+class LiveContext:
+    """
+    Handle on the ContextClient of one client that follows config reloads.
+    ``current`` always returns a complete ContextClient, either the one
+    before or the one after a reload, never a mix of both.
+    """
+
+    __slots__ = ('_registry', '_key')
+
+    def __init__(self, registry: 'ContextRegistry', config_path, client_name=None, network_name=None) -> None:
+        self._registry = registry
+        self._key = (config_path, client_name, network_name)
+
+    @property
+    def current(self) -> ContextClient:
+        return self._registry.context(*self._key)
+
+
+class ContextRegistry:
+    """
+    Process-wide cache of parsed network configurations.
+
+    Every config directory is parsed once and every
+    ``(client_name, network_name)`` pair is compiled once. The same
+    immutable ContextClient is then handed to every caller, from any thread,
+    until the registry is invalidated.
+    """
+
+    def __init__(self, loader: Callable[[str], ConfigManager]) -> None:
+        """
+        :param loader: builds the ConfigManager of a config directory
+        :type loader: Callable[[str], ConfigManager]
+        """
+        self._loader = loader
+        self._managers: Dict[str, ConfigManager] = {}
+        self._contexts: Dict[Tuple[str, Optional[str], Optional[str]], ContextClient] = {}
+        self._lock = threading.RLock()
+
+    def manager(self, config_path) -> ConfigManager:
+        """Get the ConfigManager of a config directory, parsing it once
+
+        :param config_path: directory with the .yaml network config files
+        :return: shared ConfigManager
+        """
+        try:
+            return self._managers[config_path]
+        except KeyError:
+            pass
+
+        with self._lock:
+            try:
+                return self._managers[config_path]
+            except KeyError:
+                manager = self._loader(config_path)
+                self._managers[config_path] = manager
+                return manager
+
+    def loaded(self, config_path) -> Optional[ConfigManager]:
+        """Get the ConfigManager of a config directory if it was parsed
+
+        :param config_path: directory with the .yaml network config files
+        :return: shared ConfigManager, None when not parsed yet
+        """
+        return self._managers.get(config_path)
+
+    def context(self, config_path, client_name=None, network_name=None) -> ContextClient:
+        """Get the compiled context of a client, compiling it once
+
+        :param config_path: directory with the .yaml network config files
+        :param client_name: organization of the client
+        :param network_name: name of the network
+        :return: shared, immutable ContextClient
+        """
+        key = (config_path, client_name, network_name)
+        try:
+            return self._contexts[key]
+        except KeyError:
+            pass
+
+        with self._lock:
+            try:
+                return self._contexts[key]
+            except KeyError:
+                context = self.manager(config_path).client_compile(
+                    client_name, network_name)
+                self._contexts[key] = context
+                return context
+
+    def live(self, config_path, client_name=None, network_name=None) -> LiveContext:
+        """Get a handle that always returns the latest compiled context
+
+        :param config_path: directory with the .yaml network config files
+        :param client_name: organization of the client
+        :param network_name: name of the network
+        :return: LiveContext
+        """
+        return LiveContext(self, config_path, client_name, network_name)
+
+    def reload(self, config_path, configs: Dict[str, Optional[dict]]) -> Set[str]:
+        """Apply changed config files to a loaded configuration
+
+        Only the given files are applied and only the networks they
+        contribute to are recompiled. Compiled contexts are replaced one by
+        one with complete new versions.
+
+        :param config_path: config directory the files belong to
+        :param configs: parsed content of each changed file, None for
+                        removed files
+        :return: names of the networks that were recompiled
+        """
+        with self._lock:
+            try:
+                manager = self._managers[config_path]
+            except KeyError:
+                return set()
+
+            affected = set()
+            for path, config in configs.items():
+                affected |= manager.update_config(path, config)
+
+            for key in [key for key in self._contexts if key[0] == config_path]:
+                try:
+                    self._contexts[key] = manager.client_compile(*key[1:])
+                except Exception:
+                    del self._contexts[key]
+
+            return affected
+
+    def invalidate(self, config_path=None):
+        """Forget parsed configurations, they are parsed again on next use
+
+        :param config_path: config directory to forget, every one if None
+        """
+        with self._lock:
+            if config_path is None:
+                self._managers.clear()
+                self._contexts.clear()
+                return
+
+            self._managers.pop(config_path, None)
+            for key in [key for key in self._contexts if key[0] == config_path]:
+                del self._contexts[key]
@@ -0,0 +1,137 @@
+import hashlib
+import os
+import pickle
+import tempfile
+from stat import S_IWGRP, S_IWOTH
+from typing import List, Optional, Tuple
+
+from .context import ConfigManager
+
+SNAPSHOT_VERSION = 8
+
+Fingerprint = Tuple[str, int, int, bytes]
+
+
+def fingerprint(path, content: bytes, stat: os.stat_result) -> Fingerprint:
+    """Identify the version of a config file a snapshot was built from
+
+    :param path: path of the config file
+    :param content: bytes read from the file
+    :param stat: stat of the file taken before reading it
+    :return: path, mtime, size and SHA-256 of the content
+    """
+    return path, stat.st_mtime_ns, stat.st_size, hashlib.sha256(content).digest()
+
+
+def snapshot_path(cache_dir, config_path) -> str:
+    """Get the snapshot file of a config directory
+
+    :param cache_dir: directory holding the snapshots
+    :param config_path: config directory the snapshot is built from
+    :return: path of the snapshot file
+    """
+    key = hashlib.sha256(os.path.abspath(config_path).encode()).hexdigest()
+    return os.path.join(cache_dir, f'config-{key[:32]}.snapshot')
+
+
+def _refresh(fingerprints: List[Fingerprint], files: List[str]) -> Optional[List[Fingerprint]]:
+    """Check the fingerprints against the files
+
+    :return: None when a file changed, else the fingerprints with the
+             stat of the files touched without being changed
+    """
+    if [path for path, *_ in fingerprints] != files:
+        return None
+
+    refreshed = []
+    for file_fingerprint in fingerprints:
+        path, mtime_ns, size, digest = file_fingerprint
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+
+        if stat.st_mtime_ns == mtime_ns and stat.st_size == size:
+            refreshed.append(file_fingerprint)
+            continue
+
+        # touched but maybe not changed, the content decides
+        with open(path, 'rb') as config_file:
+            content = config_file.read()
+        file_fingerprint = fingerprint(path, content, stat)
+        if file_fingerprint[3] != digest:
+            return None
+        refreshed.append(file_fingerprint)
+
+    return refreshed
+
+
+def _trusted(stat: os.stat_result) -> bool:
+    """Only the current user may have written the file"""
+    if stat.st_mode & (S_IWGRP | S_IWOTH):
+        return False
+    return not hasattr(os, 'getuid') or stat.st_uid == os.getuid()
+
+
+def load_snapshot(path, files: List[str]) -> Optional[ConfigManager]:
+    """Load a compiled ConfigManager if it is still up to date
+
+    Snapshots are pickles, loading one runs code chosen by whoever wrote
+    it: the cache directory must only be writable by the user running the
+    SDK. A snapshot writable by the group or others, or owned by another
+    user, is ignored.
+
+    :param path: snapshot file
+    :param files: config files the manager must be built from, in load
+                  order
+    :return: the ConfigManager or None when missing, untrusted or stale
+    """
+    try:
+        with open(path, 'rb') as snapshot_file:
+            if not _trusted(os.fstat(snapshot_file.fileno())):
+                return None
+            version, fingerprints, manager = pickle.load(snapshot_file)
+    except (OSError, EOFError, ValueError, pickle.UnpicklingError, AttributeError, ImportError):
+        return None
+
+    if version != SNAPSHOT_VERSION:
+        return None
+
+    refreshed = _refresh(fingerprints, files)
+    if refreshed is None:
+        return None
+    if refreshed != fingerprints:
+        manager.fingerprints = {file_fingerprint[0]: file_fingerprint for file_fingerprint in refreshed}
+        # the next load then skips hashing the touched files again
+        try:
+            save_snapshot(path, refreshed, manager)
+        except OSError:
+            pass
+
+    return manager
+
+
+def save_snapshot(path, fingerprints: List[Fingerprint], manager: ConfigManager):
+    """Save a compiled ConfigManager with the fingerprints of its sources
+
+    The snapshot is written to a temporary file first and moved in place,
+    so concurrent readers never see a partial snapshot. Only the compiled
+    objects are kept, not the raw configs they were built from. The
+    directory is created readable by the current user only.
+
+    :param path: snapshot file
+    :param fingerprints: fingerprints of the config files, in load order
+    :param manager: the compiled ConfigManager
+    """
+    directory = os.path.dirname(path)
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as snapshot_file:
+            pickle.dump((SNAPSHOT_VERSION, fingerprints, manager),
+                        snapshot_file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
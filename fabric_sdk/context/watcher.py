@@ -0,0 +1,122 @@
+import os
+import threading
+from typing import Callable, Dict, List, Tuple
+
+try:
+    from inotify_simple import INotify, flags
+except ImportError:
+    INotify = None
+
+DEFAULT_POLL_INTERVAL = 1.0
+
+
+class ConfigWatcher:
+    """
+    Watch a config directory and report the files that changed.
+
+    Uses inotify (through the optional ``inotify_simple`` package) to wake
+    up as soon as something happens in the directory, and falls back to
+    polling every ``interval`` seconds. Either way changes are confirmed by
+    comparing the mtime and size of every file, so ``on_change`` only
+    receives files that were really added, modified or removed.
+    """
+
+    def __init__(
+        self,
+        config_path: str,
+        list_files: Callable[[], List[str]],
+        on_change: Callable[[List[str]], None],
+        interval: float = DEFAULT_POLL_INTERVAL,
+        use_inotify: bool = True
+    ) -> None:
+        """
+        :param config_path: directory to watch
+        :type config_path: str
+
+        :param list_files: lists the config files of the directory
+        :type list_files: Callable[[], List[str]]
+
+        :param on_change: called with the paths that changed
+        :type on_change: Callable[[List[str]], None]
+
+        :param interval: seconds between two polls
+        :type interval: float
+
+        :param use_inotify: use inotify when it is available
+        :type use_inotify: bool
+        """
+        self.config_path = config_path
+        self.interval = interval
+        self.use_inotify = use_inotify and INotify is not None
+        self.last_error = None
+        self._list_files = list_files
+        self._on_change = on_change
+        self._state = self._scan()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _scan(self) -> Dict[str, Tuple[int, int]]:
+        state = {}
+        for path in self._list_files():
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            state[path] = (stat.st_mtime_ns, stat.st_size)
+        return state
+
+    def poll_once(self) -> List[str]:
+        """Check the directory once and report what changed since last time
+
+        :return: paths added, modified or removed
+        """
+        state = self._scan()
+        changed = [path for path in state.keys() | self._state.keys()
+                   if state.get(path) != self._state.get(path)]
+        self._state = state
+
+        if changed:
+            changed.sort()
+            try:
+                self._on_change(changed)
+                self.last_error = None
+            except Exception as e:
+                self.last_error = e
+        return changed
+
+    def _run(self):
+        if not self.use_inotify:
+            while not self._stop.wait(self.interval):
+                self.poll_once()
+            return
+
+        with INotify() as inotify:
+            inotify.add_watch(self.config_path, flags.CREATE | flags.DELETE |
+                              flags.MODIFY | flags.CLOSE_WRITE | flags.MOVED_TO |
+                              flags.MOVED_FROM)
+            while not self._stop.is_set():
+                inotify.read(timeout=int(self.interval * 1000))
+                if not self._stop.is_set():
+                    self.poll_once()
+
+    def start(self) -> 'ConfigWatcher':
+        """Start watching in a daemon thread"""
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._run, name='config-watcher', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop watching"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self) -> 'ConfigWatcher':
+        return self.start()
+
+    def __exit__(self, *_) -> None:
+        self.stop()
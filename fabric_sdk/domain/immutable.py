@@ -0,0 +1,64 @@
+from typing import Tuple
+
+
+def _rebuild(cls, state):
+    obj = cls.__new__(cls)
+    for name, value in state.items():
+        object.__setattr__(obj, name, value)
+    return obj
+
+
+class Immutable:
+    """
+    Base of the slotted, read-only objects of the SDK. Subclasses declare
+    their fields in ``__slots__`` and set them once in ``__init__`` through
+    ``object.__setattr__``. Without a per-instance ``__dict__`` they are
+    compact, and they can be shared between threads without copies.
+
+    Immutability is shallow: the fields can't be reassigned, but a field
+    holding a dict, such as the ``http_options`` or ``rate_limit`` of a
+    config, is the dict parsed from the config and must be treated as
+    read-only by its users. Use ``replace`` to change it.
+    """
+
+    __slots__ = ()
+
+    @classmethod
+    def _fields(cls) -> Tuple[str, ...]:
+        try:
+            return cls.__dict__['_field_names']
+        except KeyError:
+            names = []
+            for klass in reversed(cls.__mro__):
+                for name in klass.__dict__.get('__slots__', ()):
+                    if name not in names and name != '__weakref__':
+                        names.append(name)
+            cls._field_names = tuple(names)
+            return cls._field_names
+
+    def _state(self):
+        return {name: getattr(self, name) for name in self._fields()}
+
+    def _replace(self, **changes):
+        state = self._state()
+        state.update(changes)
+        return _rebuild(type(self), state)
+
+    def replace(self, **changes):
+        """Copy this object with some fields changed, the others are shared
+
+        :param **changes: new value of the fields to change
+        :return: an object of the same class
+        """
+        return self._replace(**changes)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(
+            f"'{type(self).__name__}' is immutable, can't set {name}")
+
+    def __delattr__(self, name):
+        raise AttributeError(
+            f"'{type(self).__name__}' is immutable, can't delete {name}")
+
+    def __reduce__(self):
+        return _rebuild, (type(self), self._state())
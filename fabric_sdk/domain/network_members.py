@@ -1,15 +1,45 @@
 from enum import Enum
+from threading import Lock
 from typing import Optional
 
+from .immutable import Immutable
 
-class NetworkMember:
+MAX_SHARED_CA_CHAINS = 256
+
+_ca_chains = {}
+_ca_chains_lock = Lock()
+
+
+def _shared_ca_chain(ca_cert_chain):
+    """Return the interned copy of a CA chain
+
+    Every member enrolled by the same CA gets the same chain, keeping one
+    copy of it for all of them.
+    """
+    if not isinstance(ca_cert_chain, (bytes, str)):
+        return ca_cert_chain
+    with _ca_chains_lock:
+        shared = _ca_chains.get(ca_cert_chain)
+        if shared is None:
+            if len(_ca_chains) >= MAX_SHARED_CA_CHAINS:
+                _ca_chains.pop(next(iter(_ca_chains)))
+            _ca_chains[ca_cert_chain] = shared = ca_cert_chain
+        return shared
+
+
+class NetworkMember(Immutable):
     """
     All member in Hyperledger Fabric Network(HFN) must have an id and some role.
     That member can specify their password or secret, or set it when they will enroll.   
     That member is affiliated with any organization, if not specified then it will be 
     the same as the organization of the registering member. 
+
+    Members are immutable, use ``replace`` to get a copy with some fields
+    changed.
     """
 
+    __slots__ = ('enrollment_id', 'enrollment_secret', 'role', 'affiliation')
+
     def __init__(self, enrollment_id: str, role: str, affiliation: str = None,  enrollment_secret: str = None) -> None:
         """
         :param enrollment_id: The registered ID to use for enrollment
@@ -27,10 +57,21 @@ class NetworkMember:
         :type affiliation: str
         """
 
-        self.enrollment_id = enrollment_id
-        self.enrollment_secret = enrollment_secret
-        self.role = role
-        self.affiliation = affiliation
+        _set = object.__setattr__
+        _set(self, 'enrollment_id', enrollment_id)
+        _set(self, 'enrollment_secret', enrollment_secret)
+        _set(self, 'role', role)
+        _set(self, 'affiliation', affiliation)
+
+    def replace(self, **changes) -> 'NetworkMember':
+        """Copy this member with some fields changed, the others are shared
+
+        :param **changes: new value of the fields to change
+        :return: a member of the same class
+        """
+        if 'ca_cert_chain' in changes:
+            changes['ca_cert_chain'] = _shared_ca_chain(changes['ca_cert_chain'])
+        return super().replace(**changes)
 
 
 class EnrolledMember(NetworkMember):
@@ -40,6 +81,8 @@ class EnrolledMember(NetworkMember):
     all the functions of the network  
     """
 
+    __slots__ = ('enrollment_cert', 'ca_cert_chain', 'private_key')
+
     def __init__(
         self,
         enrollment_id: str,
@@ -67,26 +110,39 @@ class EnrolledMember(NetworkMember):
 
         :param enrollment_cert: PEM-encoded X509 certificate (Default value = None)
         :type enrollment_cert: bytes
+
+        :param ca_cert_chain: PEM-encoded chain of the CA, shared with the
+             other members enrolled by the same CA
+        :type ca_cert_chain: bytes
         """
 
-        super().__init__(enrollment_id, enrollment_secret, role, affiliation)
+        super().__init__(enrollment_id=enrollment_id, role=role,
+                         affiliation=affiliation,
+                         enrollment_secret=enrollment_secret)
 
-        self.enrollment_cert = enrollment_cert
-        self.ca_cert_chain = ca_cert_chain
-        self.private_key = private_key
+        _set = object.__setattr__
+        _set(self, 'enrollment_cert', enrollment_cert)
+        _set(self, 'ca_cert_chain', _shared_ca_chain(ca_cert_chain))
+        _set(self, 'private_key', private_key)
 
     def reenroll(
         self,
-        enrollmentCert: str,
-        caCertChain: str,
+        enrollment_cert: str,
+        ca_cert_chain: str,
         private_key: str = None
     ) -> 'EnrolledMember':
+        """Copy this member with the certificate of a reenrollment
 
-        return EnrolledMember(
-            enrollmentCert=enrollmentCert,
-            caCertChain=caCertChain,
-            private_key=private_key,
-            ** self.__dict__
+        :param enrollment_cert: the new PEM-encoded X509 certificate
+        :param ca_cert_chain: PEM-encoded chain of the CA
+        :param private_key: key of the new certificate, the current one
+                            is kept when it is not given
+        :return: EnrolledMember
+        """
+        return self.replace(
+            enrollment_cert=enrollment_cert,
+            ca_cert_chain=ca_cert_chain,
+            private_key=self.private_key if private_key is None else private_key
         )
 
 
@@ -97,6 +153,8 @@ class UnenrolledMember(NetworkMember):
     the CA, but he can't uses the rest of the network functions    
     """
 
+    __slots__ = ('csr',)
+
     def __init__(
         self,
         enrollment_id: str,
@@ -127,22 +185,33 @@ class UnenrolledMember(NetworkMember):
         :type csr: str
         """
 
-        super().__init__(enrollment_id, enrollment_secret, role, affiliation)
+        super().__init__(enrollment_id=enrollment_id, role=role,
+                         affiliation=affiliation,
+                         enrollment_secret=enrollment_secret)
 
-        self.csr = csr
+        object.__setattr__(self, 'csr', csr)
 
     def enroll(
         self,
-        enrollmentCert: str,
-        caCertChain: str,
+        enrollment_cert: str,
+        ca_cert_chain: str,
         private_key: str = None
     ) -> EnrolledMember:
+        """The EnrolledMember this member becomes with its certificate
 
+        :param enrollment_cert: PEM-encoded X509 certificate
+        :param ca_cert_chain: PEM-encoded chain of the CA
+        :param private_key: key of the certificate
+        :return: EnrolledMember
+        """
         return EnrolledMember(
-            enrollmentCert=enrollmentCert,
-            caCertChain=caCertChain,
-            private_key=private_key,
-            ** self.__dict__
+            enrollment_id=self.enrollment_id,
+            enrollment_secret=self.enrollment_secret,
+            role=self.role,
+            affiliation=self.affiliation,
+            enrollment_cert=enrollment_cert,
+            ca_cert_chain=ca_cert_chain,
+            private_key=private_key
         )
 
 
@@ -153,31 +222,56 @@ class UnregisteredMember(NetworkMember):
     to apply to the CA for a certificate.   
     """
 
+    __slots__ = ()
+
     def registry(self, secret) -> UnenrolledMember:
+        """The UnenrolledMember this member becomes once registered
+
+        :param secret: enrollment secret given by the CA
+        :return: UnenrolledMember
+        """
         return UnenrolledMember(
-            secret=secret,
-            **self.__dict__
+            enrollment_id=self.enrollment_id,
+            enrollment_secret=secret,
+            role=self.role,
+            affiliation=self.affiliation
         )
 
 
 class User(UnregisteredMember):
+    __slots__ = ()
+
     def __init__(self, enrollment_id: str, enrollment_secret: str, affiliation: str) -> None:
-        super().__init__(enrollment_id, enrollment_secret, 'client', affiliation)
+        super().__init__(enrollment_id=enrollment_id, role='client',
+                         affiliation=affiliation,
+                         enrollment_secret=enrollment_secret)
 
 
 class Admin(UnregisteredMember):
+    __slots__ = ()
+
     def __init__(self, enrollment_id: str, enrollment_secret: str, affiliation: str) -> None:
-        super().__init__(enrollment_id, enrollment_secret, 'admin', affiliation)
+        super().__init__(enrollment_id=enrollment_id, role='admin',
+                         affiliation=affiliation,
+                         enrollment_secret=enrollment_secret)
 
 
 class Organization(UnregisteredMember):
+    __slots__ = ()
+
     def __init__(self, name, enrollment_id: str, enrollment_secret: str) -> None:
-        super().__init__(enrollment_id, enrollment_secret, 'org', name)
+        super().__init__(enrollment_id=enrollment_id, role='org',
+                         affiliation=name,
+                         enrollment_secret=enrollment_secret)
 
 
 class Peer(UnregisteredMember):
+    __slots__ = ()
+
     def __init__(self, enrollment_id: str, enrollment_secret: str, affiliation: str) -> None:
-        super().__init__(enrollment_id, enrollment_secret, 'peer', affiliation)
+        super().__init__(enrollment_id=enrollment_id, role='peer',
+                         affiliation=affiliation,
+                         enrollment_secret=enrollment_secret)
 
 
 class RevokeReason(Enum):
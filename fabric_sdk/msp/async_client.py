@@ -0,0 +1,274 @@
+import asyncio
+import base64
+from concurrent.futures import Executor
+from datetime import datetime
+from functools import partial
+from typing import Any, Iterable, List, Optional, Tuple, Union
+
+from fabric_sdk.common import AsyncHttpProtocol, Crypto
+from fabric_sdk.common.admission import AsyncAdmittedHttpClient
+from fabric_sdk.common.crypto_tools import EcKeyPool
+from fabric_sdk.context import ContextClient
+from fabric_sdk.context.context import MSPConfig
+from fabric_sdk.domain.network_members import EnrolledMember, RevokeRequest, UnenrolledMember, UnregisteredMember
+from .client import BaseCAClient, DEFAULT_REVOKE_WORKERS
+from .identity import SigningIdentity
+
+
+class AsyncCAClient(BaseCAClient):
+    """asyncio flavour of CAClient.
+
+    HTTP round-trips go through an AsyncHttpProtocol, so they never block the
+    event loop. Key generation, CSR signing and auth token signing run in
+    ``executor`` (the loop's default executor when None).
+    """
+
+    _admitted_http_client = AsyncAdmittedHttpClient
+
+    def __init__(
+        self,
+        context: ContextClient,
+        ca_name: Union[str, MSPConfig] = None,
+        http_client: AsyncHttpProtocol = None,
+        crypto_algorithm: Crypto = None,
+        executor: Executor = None,
+        key_pool: EcKeyPool = None
+    ) -> None:
+        """Init new async ca's client by context and maybe a ca's name
+
+        :param context: context with network config
+        :type context: ContextClient
+
+        :param ca_name: name of specific ca. Context can has
+                        more that one ca, or the MSPConfig of one of
+                        them
+        :type ca_name: Union[str, MSPConfig]
+
+        :param http_client: Async http client to communicate with server,
+                            AsyncHttpClient when None
+        :type http_client: AsyncHttpProtocol
+
+        :param executor: executor for the CPU-bound steps
+        :type executor: Executor
+
+        :param key_pool: pool of pre-generated keys used by enroll and
+                         reenroll instead of generating them inline
+        :type key_pool: EcKeyPool
+        """
+
+        if http_client is None:
+            from fabric_sdk.common.async_http_client import AsyncHttpClient
+            http_client = AsyncHttpClient()
+
+        super().__init__(context, ca_name, http_client,
+                         crypto_algorithm, key_pool)
+        self._executor = executor
+
+    async def _off_loop(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, partial(func, *args))
+
+    async def register(
+        self,
+        outsider_member: UnregisteredMember,
+        network_member: Union[EnrolledMember, SigningIdentity],
+        maxEnrollments: int,
+        attrs: dict,
+    ) -> UnenrolledMember:
+        """Register a user in order to receive a secret.
+           Transform a UnregisteredMember to UnenrolledMember
+
+        :param outsider_member: Member that will attempt to join the network
+        :type outsider_member: UnregisteredMember
+
+        :param network_member: CA-certified member of the network, or its
+                               SigningIdentity when registering many members
+        :type network_member: Union[EnrolledMember, SigningIdentity]
+
+        :param maxEnrollments: The maximum number of times the user is
+                               permitted to enroll
+        :type maxEnrollments: int
+
+        :param attrs: Array of key/value attributes to assign to the user
+        :type attrs: dict
+
+        :return UnenrolledMember with secret to use when this member enrolls
+        :raises ClientError: errors in aiohttp
+        :raises ValueError: Failed response, json parse error, args missing
+        """
+
+        req = self._register_request(outsider_member, maxEnrollments, attrs)
+
+        signed = await self._off_loop(self._signed, req, network_member)
+
+        res, st = await self.http_client.post(
+            path=self._path("register"),
+            **signed,
+            ** self._ca_config.http_options)
+
+        return self._registered(outsider_member, res)
+
+    async def enroll(
+        self,
+        network_member: UnenrolledMember,
+        profile: str = '',
+        attr_reqs: list = None
+    ) -> EnrolledMember:
+        """Enroll a registered user in order to receive a signed X509
+         certificate
+
+        :param network_member: The network's member registered in CA, buy not enroll yet
+        :type network_member: UnenrolledMember
+
+        :param profile: The profile name.  Specify the 'tls' profile for a
+             TLS certificate; otherwise, an enrollment certificate is issued. (Default value = '')
+        :type profile: str
+
+        :param attr_reqs: An array of AttributeRequest
+        :type attr_reqs: list
+
+        :return: EnrollmentMember
+        :raises ClientError: errors in aiohttp
+        :raises ValueError: Failed response, json parse error, args missing
+        """
+
+        req, private_key = await self._off_loop(
+            self._enroll_request, network_member, profile, attr_reqs)
+
+        res, st = await self.http_client.post(
+            path=self._path('enroll'),
+            json=req,
+            auth=(network_member.enrollment_id,
+                  network_member.enrollment_secret),
+            ** self._ca_config.http_options
+        )
+
+        return self._enrolled(network_member, res, private_key)
+
+    async def reenroll(self, current_member: EnrolledMember, attr_reqs: Optional[List[Any]] = None) -> EnrolledMember:
+        """Re-enroll the member in cases such as the existing enrollment
+         certificate is about to expire, or it has been compromised
+
+        :param current_member: The identity of the current user that
+             holds the existing enrollment certificate
+        :type current_member: EnrolledMember
+        :param attr_reqs: Optional. An array of AttributeRequest that
+             indicate attributes to be included in the certificate
+        :type attr_reqs: list
+
+        :return: EnrolledMember
+        :raises ClientError: errors in aiohttp
+        :raises ValueError: Failed response, json parse error, args missing
+        """
+
+        req, private_key = await self._off_loop(
+            self._reenroll_request, current_member, attr_reqs)
+
+        signed = await self._off_loop(self._signed, req, current_member)
+
+        res, st = await self.http_client.post(
+            path=self._path('reenroll'),
+            **signed,
+            ** self._ca_config.http_options
+        )
+
+        return self._reenrolled(current_member, res, private_key)
+
+    async def revoke(self, request: RevokeRequest, enroll_member: Union[EnrolledMember, SigningIdentity]) -> Tuple[Any, Any]:
+        """Revoke an existing certificate (enrollment certificate or
+           transaction certificate), or revoke all certificates issued to an
+           enrollment id.
+
+        :param request: Specific request to revoke any cert or member
+        :type request: RevokeRequest
+
+        :param enroll_member: The enroll member that requested to revoke,
+                              or its SigningIdentity
+        :type enroll_member: Union[EnrolledMember, SigningIdentity]
+
+        :return: The revocation results
+        :raises ClientError: errors in aiohttp
+        :raises ValueError: Failed response, json parse error, args missing
+        """
+
+        req = self._revoke_request(request)
+
+        signed = await self._off_loop(self._signed, req, enroll_member)
+
+        res, st = await self.http_client.post(
+            path=self._path('revoke'),
+            **signed,
+            ** self._ca_config.http_options
+        )
+
+        return self._revoked(res)
+
+    async def revoke_many(
+        self,
+        requests: Iterable[RevokeRequest],
+        enroll_member: Union[EnrolledMember, SigningIdentity],
+        max_concurrency: int = DEFAULT_REVOKE_WORKERS
+    ) -> Tuple[List[Any], Any, List[Tuple[RevokeRequest, Exception]]]:
+        """Revoke many certificates or enrollment ids, generating the CRL once
+
+        Same as CAClient.revoke_many, with ``max_concurrency`` requests in
+        flight on the running event loop.
+        """
+        requests = list(requests)
+        if not isinstance(enroll_member, SigningIdentity):
+            enroll_member = self.signing_identity(enroll_member)
+
+        revoked_certs = []
+        failed = []
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def revoke(request, sent):
+            async with semaphore:
+                try:
+                    certs, crl = await self.revoke(sent, enroll_member)
+                except Exception as e:
+                    failed.append((request, e))
+                    return None
+            revoked_certs.extend(certs or ())
+            return crl
+
+        await asyncio.gather(*(
+            revoke(request, self._without_crl(request)) for request in requests[:-1]))
+
+        crl = None
+        if requests:
+            crl = await revoke(requests[-1], self._with_crl(requests[-1]))
+        if not crl:
+            crl = base64.b64encode(await self.generate_crl(enroll_member)).decode()
+
+        return revoked_certs, crl, failed
+
+    async def generate_crl(
+        self,
+        registrar: Union[EnrolledMember, SigningIdentity],
+        revoked_before: datetime = None,
+        revoked_after: datetime = None,
+        expire_before: datetime = None,
+        expire_after: datetime = None
+    ) -> bytes:
+        """Generate a CRL with the certificates revoked by the CA
+
+        Same arguments as CAClient.generate_crl.
+
+        :return: PEM-encoded CRL
+        :raises ClientError: errors in aiohttp
+        :raises ValueError: Failed response, json parse error, args missing
+        """
+
+        req = self._gencrl_request(
+            revoked_before, revoked_after, expire_before, expire_after)
+
+        signed = await self._off_loop(self._signed, req, registrar)
+
+        res, st = await self.http_client.post(
+            path=self._path('gencrl'),
+            **signed,
+            ** self._ca_config.http_options
+        )
+
+        return self._crl_generated(res)
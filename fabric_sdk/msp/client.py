@@ -1,82 +1,298 @@
-from typing import Any, List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Iterable, List, Optional, Tuple, Union
 from fabric_sdk.context import ContextClient
+from fabric_sdk.context.context import MSPConfig
 from fabric_sdk.common import HttpClient, HttpProtocol, Ecies, Crypto
-from fabric_sdk.common.crypto_tools import CertTools
+from fabric_sdk.common.admission import AdmittedHttpClient, admission_controller
+from fabric_sdk.common.crypto_tools import CertTools, EcKeyPool
+from fabric_sdk.common.retry import RetryingHttpClient
 import base64
-import json
+from datetime import datetime, timezone
 
-from fabric_sdk.domain.network_members import EnrolledMember, RevokeRequest, UnenrolledMember, UnregisteredMember
+from fabric_sdk.domain.network_members import EnrolledMember, RevokeReason, RevokeRequest, UnenrolledMember, UnregisteredMember
+from .identity import SigningIdentity
 
+DEFAULT_REVOKE_WORKERS = 8
+
+
+class BaseCAClient:
+    """Request building and response handling shared by the sync and the
+    async CA clients. Subclasses only decide how requests are sent.
+    """
+
+    _admitted_http_client = AdmittedHttpClient
 
-class CAClient:
     def __init__(
         self,
         context: ContextClient,
-        ca_name: str = None,
-        http_client: HttpProtocol = HttpClient,
-        crypto_algorithm: Crypto = None
+        ca_name: Union[str, MSPConfig] = None,
+        http_client=None,
+        crypto_algorithm: Crypto = None,
+        key_pool: EcKeyPool = None
     ) -> None:
-        """Init new ca's client by context and maybe a ca's name
-
-        :param context: context with network config
-        :type context: ContextClient
-
-        :param ca_name: name of specific ca. Context can has
-                        more that one ca
-        :type ca_name: str
-
-        :param http_client: Http client to communicate with server
-        :type http_client: HttpProtocol
-        """
-
         self.http_client = http_client
         self._crypto_primitives = Ecies() if crypto_algorithm is None else crypto_algorithm
 
+        # only suites exposing their curve, as Ecies does, can be checked
+        curve = getattr(self._crypto_primitives, 'curve', None)
+        if key_pool is not None and curve is not None and key_pool.curve != curve:
+            raise ValueError(
+                "Key pool curve does not match the client's security level")
+        self._key_pool = key_pool
+
         try:
             if ca_name is None:
-                self.__ca_config = context.ca_list[0]
+                self._ca_config = context.ca_list[0]
+            elif isinstance(ca_name, MSPConfig):
+                self._ca_config = ca_name
             else:
-                self.__ca_config = [
-                    ca for ca in context.ca_list if ca.name == ca_name][0].url
-        except IndexError:
+                self._ca_config = context.get_ca(ca_name)
+        except (IndexError, KeyError):
             raise Exception()
 
-    def __path(self, path):
-        return self.__ca_config.url + path
+        # the ``rateLimit`` of the CA paces every client of the process,
+        # each attempt of a retrying client is admitted on its own
+        self.admission = admission_controller(self._ca_config.url, self._ca_config.rate_limit)
+        if self.admission is not None:
+            if isinstance(http_client, RetryingHttpClient):
+                self.http_client = http_client.with_admission(self.admission)
+            else:
+                self.http_client = self._admitted_http_client(http_client, self.admission)
+
+    def _path(self, path):
+        return self._ca_config.url + path
+
+    def _generate_private_key(self):
+        if self._key_pool is not None:
+            return self._key_pool.generate_private_key()
+        return self._crypto_primitives.generate_private_key()
 
     def generate_auth_token(self, req, cert, private_key):
         """Generate authorization token required for accessing fabric-ca APIs
 
+        The body the CA receives must be serialized as by
+        SigningIdentity.sign_request, which the client methods use.
+
         :param req: request body
         :type req: dict
-        :param registrar: Required. The identity of the registrar
-        (i.e. who is performing the request)
-        :type registrar: Enrollment
+        :param cert: PEM-encoded certificate of the registrar
+        :type cert: bytes
+        :param private_key: private key of the registrar
         :return: auth token
         """
-        b64Cert = base64.b64encode(cert)
+        identity = SigningIdentity.from_credentials(
+            cert, private_key, self._crypto_primitives)
+        return identity.sign_request(req)[1]
+
+    def signing_identity(self, member: EnrolledMember) -> SigningIdentity:
+        """Prepare the credentials of a member for signing many requests
+
+        :param member: CA-certified member of the network
+        :type member: EnrolledMember
+        :return: SigningIdentity to pass instead of the member
+        """
+        return SigningIdentity(member, self._crypto_primitives)
+
+    def _signed(self, req, member):
+        if not isinstance(member, SigningIdentity):
+            member = self.signing_identity(member)
+
+        body, token = member.sign_request(req)
+        return {
+            'data': body,
+            'headers': {
+                'Authorization': token.decode(),
+                'Content-Type': 'application/json'}
+        }
+
+    @staticmethod
+    def _check_attr_reqs(attr_reqs):
+        if attr_reqs:
+            if not isinstance(attr_reqs, list):
+                raise ValueError(
+                    "attr_reqs must be an array of AttributeRequest objects")
+            for attr in attr_reqs:
+                if not attr['name']:
+                    raise ValueError(
+                        "attr_reqs object is missing the name of the attribute")
+
+    def _register_request(self, outsider_member, max_enrollments, attrs):
+        return HttpProtocol.build_http_data({
+            "id": outsider_member.enrollment_id,
+            "affiliation": outsider_member.affiliation,
+            "max_enrollments": max_enrollments,
+            "type": outsider_member.role,
+            "attrs": attrs,
+            "secret": outsider_member.enrollment_secret
+        })
+
+    def _enroll_request(self, network_member, profile, attr_reqs):
+        self._check_attr_reqs(attr_reqs)
+
+        private_key = None
+        csr = network_member.csr
+        if not csr:
+            private_key = self._generate_private_key()
+            csr = self._crypto_primitives.generate_csr(
+                private_key, network_member.enrollment_id)
+            csr = CertTools.decode_csr(csr)
+
+        req = HttpProtocol.build_http_data({
+            'certificate_request':  csr,
+            'caname': self._ca_config.name,
+            'profile': profile,
+            'attr_reqs': attr_reqs
+        })
+        return req, private_key
+
+    def _reenroll_request(self, current_member, attr_reqs):
+        self._check_attr_reqs(attr_reqs)
+
+        subject = CertTools.get_subject(current_member.enrollment_cert)
+
+        private_key = self._generate_private_key()
+        csr = self._crypto_primitives.generate_csr(
+            private_key, subject)
+        csr = CertTools.decode_csr(csr)
+
+        req = HttpProtocol.build_http_data({
+            'certificate_request':  csr,
+            'attr_reqs': attr_reqs
+        })
+        return req, private_key
 
-        if req:
-            reqJson = json.dumps(req, ensure_ascii=False)
-            b64Body = base64.b64encode(reqJson.encode())
+    def _revoke_request(self, request):
+        return HttpProtocol.build_http_data({
+            "id": request.enrollment_id,
+            "aki": request.aki,
+            "serial": request.serial,
+            "reason": request.reason.value[1]
+            if isinstance(request.reason, RevokeReason) else request.reason,
+            "gencrl": request.gen_crl,
+            'caname': self._ca_config.name,
+        })
 
-            # /!\ cannot mix f format and b
-            # https://stackoverflow.com/questions/45360480/is-there-a-
-            # formatted-byte-string-literal-in-python-3-6
-            bodyAndCert = b'%s.%s' % (b64Body, b64Cert)
+    @staticmethod
+    def _without_crl(request: RevokeRequest) -> RevokeRequest:
+        return RevokeRequest(request.reason, request.enrollment_id,
+                             request.aki, request.serial, gen_crl=False)
+
+    @staticmethod
+    def _with_crl(request: RevokeRequest) -> RevokeRequest:
+        return RevokeRequest(request.reason, request.enrollment_id,
+                             request.aki, request.serial, gen_crl=True)
+
+    @staticmethod
+    def _rfc3339(moment):
+        if moment is None or isinstance(moment, str):
+            return moment
+        if moment.tzinfo is None:
+            moment = moment.replace(tzinfo=timezone.utc)
+        return moment.isoformat()
+
+    def _gencrl_request(self, revoked_before, revoked_after, expire_before, expire_after):
+        return HttpProtocol.build_http_data({
+            'caname': self._ca_config.name,
+            'revokedBefore': self._rfc3339(revoked_before),
+            'revokedAfter': self._rfc3339(revoked_after),
+            'expireBefore': self._rfc3339(expire_before),
+            'expireAfter': self._rfc3339(expire_after),
+        })
+
+    @staticmethod
+    def _registered(outsider_member, res) -> UnenrolledMember:
+        if res['success']:
+            return outsider_member.registry(res['result']['secret'])
+        else:
+            raise ValueError("Registering failed with errors {0}"
+                             .format(res['errors']))
+
+    @staticmethod
+    def _enrolled(network_member, res, private_key) -> EnrolledMember:
+        if res['success']:
+            return network_member.enroll(
+                base64.b64decode(res['result']['Cert']),
+                base64.b64decode(res['result']['ServerInfo']['CAChain']),
+                private_key
+            )
         else:
-            bodyAndCert = b'.%s' % b64Cert
+            raise ValueError("Enrollment failed with errors {0}"
+                             .format(res['errors']))
+
+    @staticmethod
+    def _reenrolled(current_member, res, private_key) -> EnrolledMember:
+        if res['success']:
+            return current_member.reenroll(
+                base64.b64decode(res['result']['Cert']),
+                base64.b64decode(res['result']['ServerInfo']['CAChain']),
+                private_key
+            )
+        else:
+            raise ValueError("Enrollment failed with errors {0}"
+                             .format(res['errors']))
+
+    @staticmethod
+    def _revoked(res) -> Tuple[Any, Any]:
+        if res['success']:
+            return res['result']['RevokedCerts'], res['result']['CRL']
+        else:
+            raise ValueError("Revoking failed with errors {0}"
+                             .format(res['errors']))
+
+    @staticmethod
+    def _crl_generated(res) -> bytes:
+        if res['success']:
+            return base64.b64decode(res['result']['CRL'])
+        else:
+            raise ValueError("Generating the CRL failed with errors {0}"
+                             .format(res['errors']))
+
+
+class CAClient(BaseCAClient):
+    def __init__(
+        self,
+        context: ContextClient,
+        ca_name: Union[str, MSPConfig] = None,
+        http_client: HttpProtocol = HttpClient,
+        crypto_algorithm: Crypto = None,
+        warm_up: bool = False,
+        key_pool: EcKeyPool = None
+    ) -> None:
+        """Init new ca's client by context and maybe a ca's name
+
+        :param context: context with network config
+        :type context: ContextClient
+
+        :param ca_name: name of specific ca. Context can has
+                        more that one ca, or the MSPConfig of one of
+                        them
+        :type ca_name: Union[str, MSPConfig]
+
+        :param http_client: Http client to communicate with server,
+                            requests wait for the ``rateLimit`` of the ca
+                            when it has one, or fail with AdmissionRejected
+        :type http_client: HttpProtocol
+
+        :param warm_up: open a connection to the ca right away, only
+                        for http clients that support it (SessionHttpClient)
+        :type warm_up: bool
+
+        :param key_pool: pool of pre-generated keys used by enroll and
+                         reenroll instead of generating them inline
+        :type key_pool: EcKeyPool
+        """
 
-        sig = self._cryptoPrimitives.sign(private_key, bodyAndCert)
-        b64Sign = base64.b64encode(sig)
+        super().__init__(context, ca_name, http_client,
+                         crypto_algorithm, key_pool)
 
-        # /!\ cannot mix f format and b
-        return b'%s.%s' % (b64Cert, b64Sign)
+        if warm_up and hasattr(http_client, 'warm_up'):
+            http_client.warm_up(
+                self._ca_config.url, **self._ca_config.http_options)
 
     def register(
         self,
         outsider_member: UnregisteredMember,
-        network_member: EnrolledMember,
+        network_member: Union[EnrolledMember, SigningIdentity],
         maxEnrollments: int,
         attrs: dict,
     ) -> UnenrolledMember:
@@ -86,8 +302,9 @@ class CAClient:
         :param outsider_member: Member that will attempt to join the network
         :type outsider_member: UnregisteredMember
 
-        :param network_member: CA-certified member of the network
-        :type network_member: EnrolledMember
+        :param network_member: CA-certified member of the network, or its
+                               SigningIdentity when registering many members
+        :type network_member: Union[EnrolledMember, SigningIdentity]
 
         :param maxEnrollments: The maximum number of times the user is
                                permitted to enroll
@@ -101,30 +318,14 @@ class CAClient:
         :raises ValueError: Failed response, json parse error, args missing
         """
 
-        req = HttpProtocol.build_http_data({
-            "id": outsider_member.enrollmentID,
-            "affiliation": outsider_member.affiliation,
-            "max_enrollments": maxEnrollments,
-            "type": outsider_member.role,
-            "attrs": attrs,
-            "secret": outsider_member.enrollment_secret
-        })
-
-        authorization = self.generateAuthToken(
-            req, network_member.enrollment_cert, network_member.private_key)
+        req = self._register_request(outsider_member, maxEnrollments, attrs)
 
         res, st = self.http_client.post(
-            path=self.__path("register"),
-            json=req,
-            headers={
-                'Authorization': authorization},
-            ** self.__ca_config.http_options)
+            path=self._path("register"),
+            **self._signed(req, network_member),
+            ** self._ca_config.http_options)
 
-        if res['success']:
-            return outsider_member.registry(res['result']['secret'])
-        else:
-            raise ValueError("Registering failed with errors {0}"
-                             .format(res['errors']))
+        return self._registered(outsider_member, res)
 
     def enroll(
         self,
@@ -150,47 +351,18 @@ class CAClient:
         :raises ValueError: Failed response, json parse error, args missing
         """
 
-        if attr_reqs:
-            if not isinstance(attr_reqs, list):
-                raise ValueError(
-                    "attr_reqs must be an array of AttributeRequest objects")
-            for attr in attr_reqs:
-                if not attr['name']:
-                    raise ValueError(
-                        "attr_reqs object is missing the name of the attribute")
-
-        private_key = None
-        if not csr:
-            private_key = self._crypto_primitives.generate_private_key()
-            csr = self._crypto_primitives.generate_csr(
-                private_key, network_member.enrollment_id)
-            csr = CertTools.decode_csr(csr)
-
-        req = HttpProtocol.build_http_data({
-            'certificate_request':  csr,
-            'caname': self.__ca_config.name,
-            'profile': profile,
-            'attr_reqs': attr_reqs
-        })
+        req, private_key = self._enroll_request(
+            network_member, profile, attr_reqs)
 
         res, st = self.http_client.post(
-            path=self.__path('enroll'),
+            path=self._path('enroll'),
             json=req,
             auth=(network_member.enrollment_id,
                   network_member.enrollment_secret),
-            ** self.__ca_config.http_options
+            ** self._ca_config.http_options
         )
 
-        if res['success']:
-            return network_member.enroll(
-                base64.b64decode(res['result']['Cert']),
-                base64.b64decode(res['result']['ServerInfo']['CAChain']),
-                private_key
-            )
-
-        else:
-            raise ValueError("Enrollment failed with errors {0}"
-                             .format(res['errors']))
+        return self._enrolled(network_member, res, private_key)
 
     def reenroll(self, current_member: EnrolledMember, attr_reqs: Optional[List[Any]] = None) -> EnrolledMember:
         """Re-enroll the member in cases such as the existing enrollment
@@ -209,51 +381,17 @@ class CAClient:
         :raises ValueError: Failed response, json parse error, args missing
         """
 
-        if attr_reqs:
-            if not isinstance(attr_reqs, list):
-                raise ValueError("attr_reqs must be an array of"
-                                 " AttributeRequest objects")
-            else:
-                for attr in attr_reqs:
-                    if not attr.name:
-                        raise ValueError("attr_reqs object is missing the name"
-                                         " of the attribute")
-
-        subject = CertTools.get_subject(current_member.enrollment_cert)
-
-        private_key = self._crypto_primitives.generate_private_key()
-        csr = self._crypto_primitives.generate_csr(
-            private_key, subject)
-        csr = CertTools.decode_csr(csr)
-
-        req = HttpProtocol.build_http_data({
-            'certificate_request':  csr,
-            'attr_reqs': attr_reqs
-        })
-
-        authorization = self.generateAuthToken(
-            req, current_member.enrollment_cert, current_member.private_key)
+        req, private_key = self._reenroll_request(current_member, attr_reqs)
 
         res, st = self.http_client.post(
-            path=self.__path('reenroll'),
-            json=req,
-            headers={
-                'Authorization': authorization},
-            ** self.__ca_config.http_options
+            path=self._path('reenroll'),
+            **self._signed(req, current_member),
+            ** self._ca_config.http_options
         )
 
-        if res['success']:
-            return current_member.reenroll(
-                base64.b64decode(res['result']['Cert']),
-                base64.b64decode(res['result']['ServerInfo']['CAChain']),
-                private_key
-            )
+        return self._reenrolled(current_member, res, private_key)
 
-        else:
-            raise ValueError("Enrollment failed with errors {0}"
-                             .format(res['errors']))
-
-    def revoke(self, request: RevokeRequest, enroll_member: EnrolledMember) -> tuple[Any, Any]:
+    def revoke(self, request: RevokeRequest, enroll_member: Union[EnrolledMember, SigningIdentity]) -> tuple[Any, Any]:
         """Revoke an existing certificate (enrollment certificate or
            transaction certificate), or revoke all certificates issued to an
            enrollment id. If revoking a particular certificate, then both the
@@ -264,36 +402,122 @@ class CAClient:
         :param request: Specific request to revoke any cert or member 
         :type request: RevokeRequest
 
-        :param registrar: The enroll member that requested to revoke 
-        :type registrar: EnrollMember
+        :param enroll_member: The enroll member that requested to revoke,
+                              or its SigningIdentity
+        :type enroll_member: Union[EnrolledMember, SigningIdentity]
 
         :return: The revocation results
         :raises RequestException: errors in requests.exceptions
         :raises ValueError: Failed response, json parse error, args missing
         """
 
-        req = HttpProtocol.build_http_data({
-            "id": request.enrollment_id,
-            "aki": request.aki,
-            "serial": request.serial,
-            "reason": request.reason,
-            "gencrl": request.gen_crl,
-            'caname': self.__ca_config.name,
-        })
+        req = self._revoke_request(request)
+
+        res, st = self.http_client.post(
+            path=self._path('revoke'),
+            **self._signed(req, enroll_member),
+            ** self._ca_config.http_options
+        )
+
+        return self._revoked(res)
 
-        authorization = self.generateAuthToken(
-            req, enroll_member.enrollment_cert, enroll_member.private_key)
+    def revoke_many(
+        self,
+        requests: Iterable[RevokeRequest],
+        enroll_member: Union[EnrolledMember, SigningIdentity],
+        max_workers: int = DEFAULT_REVOKE_WORKERS
+    ) -> Tuple[List[Any], Any, List[Tuple[RevokeRequest, Exception]]]:
+        """Revoke many certificates or enrollment ids, generating the CRL once
+
+        Every request but the last is sent without ``gen_crl``, by
+        ``max_workers`` threads. The last one is sent once the others are
+        done and asks for the CRL, which then covers the whole batch. When
+        it fails, the CRL is fetched with generate_crl. A failed request
+        does not stop the others.
+
+        :param requests: the revocations, their gen_crl is ignored
+        :type requests: Iterable[RevokeRequest]
+
+        :param enroll_member: The enroll member that requested to revoke,
+                              or its SigningIdentity
+        :type enroll_member: Union[EnrolledMember, SigningIdentity]
+
+        :param max_workers: number of requests sent in parallel
+        :type max_workers: int
+
+        :return: RevokedCerts of all the requests, the CRL, not verified,
+                 and the failed requests with their exception
+        :raises RequestException: errors in requests.exceptions, when
+                                  the CRL can't be generated
+        :raises ValueError: Failed response, when the CRL can't be
+                            generated
+        """
+        requests = list(requests)
+        if not isinstance(enroll_member, SigningIdentity):
+            enroll_member = self.signing_identity(enroll_member)
+
+        revoked_certs = []
+        failed = []
+
+        def revoke(request, sent):
+            try:
+                certs, crl = self.revoke(sent, enroll_member)
+            except Exception as e:
+                failed.append((request, e))
+                return None
+            revoked_certs.extend(certs or ())
+            return crl
+
+        if len(requests) > 1:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                list(executor.map(
+                    lambda request: revoke(request, self._without_crl(request)),
+                    requests[:-1]))
+
+        crl = None
+        if requests:
+            crl = revoke(requests[-1], self._with_crl(requests[-1]))
+        if not crl:
+            crl = base64.b64encode(self.generate_crl(enroll_member)).decode()
+
+        return revoked_certs, crl, failed
+
+    def generate_crl(
+        self,
+        registrar: Union[EnrolledMember, SigningIdentity],
+        revoked_before: datetime = None,
+        revoked_after: datetime = None,
+        expire_before: datetime = None,
+        expire_after: datetime = None
+    ) -> bytes:
+        """Generate a CRL with the certificates revoked by the CA, to load
+           into a RevocationIndex
+
+        The CRL is not verified here: RevocationIndex.ingest_crl checks its
+        signature against the CA certificate, e.g. the ca_cert_chain of the
+        registrar.
+
+        :param registrar: member allowed to generate the CRL, or its
+                          SigningIdentity
+        :type registrar: Union[EnrolledMember, SigningIdentity]
+
+        :param revoked_before: only certificates revoked before this time
+        :param revoked_after: only certificates revoked after this time
+        :param expire_before: only certificates expiring before this time
+        :param expire_after: only certificates expiring after this time
+
+        :return: PEM-encoded CRL
+        :raises RequestException: errors in requests.exceptions
+        :raises ValueError: Failed response, json parse error, args missing
+        """
+
+        req = self._gencrl_request(
+            revoked_before, revoked_after, expire_before, expire_after)
 
         res, st = self.http_client.post(
-            path=self.__path('revoke'),
-            json=req,
-            headers={
-                'Authorization': authorization},
-            ** self.__ca_config.http_options
+            path=self._path('gencrl'),
+            **self._signed(req, registrar),
+            ** self._ca_config.http_options
         )
 
-        if res['success']:
-            return res['result']['RevokedCerts'], res['result']['CRL']
-        else:
-            raise ValueError("Revoking failed with errors {0}"
-                             .format(res['errors']))
+        return self._crl_generated(res)
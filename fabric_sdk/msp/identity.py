@@ -0,0 +1,78 @@
+import base64
+import json
+from typing import Tuple
+
+from cryptography.hazmat.backends import default_backend
+from cryptography.hazmat.primitives.serialization import load_pem_private_key
+
+from fabric_sdk.common import Crypto, Ecies
+from fabric_sdk.domain.network_members import EnrolledMember
+
+
+class SigningIdentity:
+    """
+    Credentials of an EnrolledMember prepared once for signing many
+    fabric-ca requests. The base64 of the certificate and the loaded private
+    key are kept, so each request only costs one body serialization and
+    one signature.
+    """
+
+    def __init__(self, member: EnrolledMember, crypto: Crypto = None) -> None:
+        """
+        :param member: CA-certified member that signs the requests
+        :type member: EnrolledMember
+
+        :param crypto: crypto suite used to sign, Ecies by default
+        :type crypto: Crypto
+        """
+        self.member = member
+        self._load(member.enrollment_cert, member.private_key, crypto)
+
+    @classmethod
+    def from_credentials(cls, cert, private_key, crypto: Crypto = None) -> 'SigningIdentity':
+        """Prepare a certificate and its private key without a member
+
+        :param cert: PEM-encoded certificate
+        :param private_key: private key, loaded or PEM-encoded
+        :param crypto: crypto suite used to sign, Ecies by default
+        :return: SigningIdentity whose ``member`` is None
+        """
+        identity = cls.__new__(cls)
+        identity.member = None
+        identity._load(cert, private_key, crypto)
+        return identity
+
+    def _load(self, cert, private_key, crypto):
+        self._crypto = Ecies() if crypto is None else crypto
+
+        if isinstance(cert, str):
+            cert = cert.encode()
+        self.b64_cert = base64.b64encode(cert)
+        self._cert_suffix = b'.' + self.b64_cert
+
+        if isinstance(private_key, str):
+            private_key = private_key.encode()
+        if isinstance(private_key, bytes):
+            private_key = load_pem_private_key(
+                private_key, None, default_backend())
+        self.private_key = private_key
+
+    def sign_request(self, req) -> Tuple[bytes, bytes]:
+        """Serialize a request body and build its authorization token
+
+        The token is computed over the returned bytes, which must be sent
+        as they are for the CA to accept the token.
+
+        :param req: request body
+        :type req: dict
+        :return: body bytes and auth token
+        """
+        if req:
+            body = json.dumps(req, ensure_ascii=False).encode()
+            body_and_cert = base64.b64encode(body) + self._cert_suffix
+        else:
+            body = b''
+            body_and_cert = self._cert_suffix
+
+        sig = self._crypto.sign(self.private_key, body_and_cert)
+        return body, self.b64_cert + b'.' + base64.b64encode(sig)
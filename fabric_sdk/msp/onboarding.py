@@ -0,0 +1,235 @@
+import asyncio
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import AsyncIterator, Collection, Iterable, Iterator, Optional
+
+from fabric_sdk.domain.network_members import EnrolledMember, NetworkMember, UnenrolledMember
+
+DEFAULT_MAX_WORKERS = 8
+DEFAULT_MAX_CONCURRENCY = 64
+
+
+class OnboardingResult:
+    """Outcome of onboarding one member.
+
+    ``registered`` is kept even when the enrollment fails, so a failed item
+    can be fed back to ``onboard`` as an UnenrolledMember and only the
+    enroll step is retried.
+    """
+
+    def __init__(
+        self,
+        index: int,
+        member: NetworkMember,
+        registered: Optional[UnenrolledMember] = None,
+        enrolled: Optional[EnrolledMember] = None,
+        error: Optional[Exception] = None
+    ) -> None:
+        """
+        :param index: position of the member in the input iterable
+        :type index: int
+
+        :param member: the member as it was given
+        :type member: NetworkMember
+
+        :param registered: the member after register, if it got that far
+        :type registered: UnenrolledMember
+
+        :param enrolled: the member after enroll
+        :type enrolled: EnrolledMember
+
+        :param error: the exception that stopped the onboarding
+        :type error: Exception
+        """
+        self.index = index
+        self.member = member
+        self.registered = registered
+        self.enrolled = enrolled
+        self.error = error
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+    @property
+    def enrollment_id(self) -> str:
+        return self.member.enrollment_id
+
+
+def _pending_members(members, skip):
+    for index, member in enumerate(members):
+        if member.enrollment_id not in skip:
+            yield index, member
+
+
+def _onboard_one(ca_client, registrar, index, member, max_enrollments, attrs, profile):
+    registered = None
+    try:
+        if isinstance(member, UnenrolledMember):
+            registered = member
+        else:
+            registered = ca_client.register(
+                member, registrar, max_enrollments, attrs)
+        enrolled = ca_client.enroll(registered, profile)
+        return OnboardingResult(index, member, registered, enrolled)
+    except Exception as e:
+        return OnboardingResult(index, member, registered, error=e)
+
+
+def onboard(
+    ca_client,
+    registrar: EnrolledMember,
+    members: Iterable[NetworkMember],
+    max_enrollments: int = 1,
+    attrs: dict = None,
+    profile: str = '',
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    ordered: bool = False,
+    skip: Collection[str] = ()
+) -> Iterator[OnboardingResult]:
+    """Register and enroll many members, streaming results as they finish
+
+    Members are processed by ``max_workers`` threads, so the key generation
+    and CSR signing of one member overlap the HTTP round-trips of the
+    others. The input is consumed lazily, at most two items per worker are
+    in flight at any time. Errors never stop the pipeline, they are
+    reported in the result of the member that failed.
+
+    :param ca_client: client of the CA that registers and enrolls
+    :type ca_client: CAClient
+
+    :param registrar: CA-certified member allowed to register others,
+                      its SigningIdentity is prepared once for the batch
+    :type registrar: Union[EnrolledMember, SigningIdentity]
+
+    :param members: UnregisteredMembers to register and enroll, or
+                    UnenrolledMembers to only enroll (resume after a
+                    failed enrollment)
+    :type members: Iterable[NetworkMember]
+
+    :param max_enrollments: The maximum number of times each member is
+                            permitted to enroll
+    :type max_enrollments: int
+
+    :param attrs: key/value attributes to assign to every member
+    :type attrs: dict
+
+    :param profile: enrollment profile, 'tls' for TLS certificates
+    :type profile: str
+
+    :param max_workers: number of members onboarded in parallel
+    :type max_workers: int
+
+    :param ordered: yield results in input order instead of
+                    completion order
+    :type ordered: bool
+
+    :param skip: enrollment ids already onboarded by a previous run
+    :type skip: Collection[str]
+
+    :return: one OnboardingResult per member not skipped
+    """
+    if isinstance(registrar, EnrolledMember):
+        registrar = ca_client.signing_identity(registrar)
+
+    source = _pending_members(members, frozenset(skip))
+    window = max_workers * 2
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+
+    def submit(index, member):
+        return executor.submit(
+            _onboard_one, ca_client, registrar, index, member,
+            max_enrollments, attrs, profile)
+
+    try:
+        if ordered:
+            queue = deque()
+            for index, member in source:
+                queue.append(submit(index, member))
+                if len(queue) >= window:
+                    yield queue.popleft().result()
+            while queue:
+                yield queue.popleft().result()
+        else:
+            pending = set()
+            for index, member in source:
+                pending.add(submit(index, member))
+                if len(pending) >= window:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        yield future.result()
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+async def _aonboard_one(ca_client, registrar, index, member, max_enrollments, attrs, profile):
+    registered = None
+    try:
+        if isinstance(member, UnenrolledMember):
+            registered = member
+        else:
+            registered = await ca_client.register(
+                member, registrar, max_enrollments, attrs)
+        enrolled = await ca_client.enroll(registered, profile)
+        return OnboardingResult(index, member, registered, enrolled)
+    except Exception as e:
+        return OnboardingResult(index, member, registered, error=e)
+
+
+async def aonboard(
+    ca_client,
+    registrar: EnrolledMember,
+    members: Iterable[NetworkMember],
+    max_enrollments: int = 1,
+    attrs: dict = None,
+    profile: str = '',
+    max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+    ordered: bool = False,
+    skip: Collection[str] = ()
+) -> AsyncIterator[OnboardingResult]:
+    """asyncio flavour of ``onboard`` for an AsyncCAClient
+
+    Same arguments and guarantees as ``onboard``, with ``max_concurrency``
+    members in flight on the running event loop instead of worker threads.
+    """
+    if isinstance(registrar, EnrolledMember):
+        registrar = ca_client.signing_identity(registrar)
+
+    source = _pending_members(members, frozenset(skip))
+
+    def submit(index, member):
+        return asyncio.ensure_future(_aonboard_one(
+            ca_client, registrar, index, member,
+            max_enrollments, attrs, profile))
+
+    pending = deque() if ordered else set()
+    try:
+        for index, member in source:
+            if ordered:
+                pending.append(submit(index, member))
+                if len(pending) >= max_concurrency:
+                    yield await pending.popleft()
+            else:
+                pending.add(submit(index, member))
+                if len(pending) >= max_concurrency:
+                    done, pending = await asyncio.wait(
+                        pending, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        yield task.result()
+
+        if ordered:
+            while pending:
+                yield await pending.popleft()
+        else:
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    yield task.result()
+    finally:
+        for task in pending:
+            task.cancel()
@@ -0,0 +1,325 @@
+import heapq
+import itertools
+import random
+import threading
+import time
+from datetime import timezone
+from typing import Callable, Dict, List, Optional, Tuple
+
+from fabric_sdk.common.admission import AdmissionController
+from fabric_sdk.domain.network_members import EnrolledMember
+
+DEFAULT_LEAD_TIME = 7 * 24 * 3600
+DEFAULT_RETRY_INTERVAL = 60
+DEFAULT_MAX_WAIT = 60
+
+
+def certificate_expiry(member: EnrolledMember) -> float:
+    """Expiry of the enrollment certificate of a member, as a timestamp"""
+    from fabric_sdk.common.crypto_tools import CertTools
+    expiry = CertTools.get_expiry(member.enrollment_cert)
+    if expiry.tzinfo is None:
+        expiry = expiry.replace(tzinfo=timezone.utc)
+    return expiry.timestamp()
+
+
+class ReenrollmentScheduler:
+    """
+    Re-enrolls tracked members before their certificate expires.
+
+    Members are kept in a heap ordered by due time. A member is due
+    ``lead_time`` seconds before expiry, plus a random delay of at most
+    ``spread`` seconds, so members enrolled together are not all renewed
+    at once. Reenrollments sent to a CA with a ``rateLimit`` are paced by
+    the admission controller of the CA, shared with all the other requests
+    of the process, and are also limited to ``max_per_second`` per CA.
+    A renewed member replaces the old one in a single assignment, is saved
+    to the wallet if one is given, and is tracked for its next renewal.
+
+    ``run_pending`` processes the due members, ``start`` runs it on a
+    daemon thread. The clock is injectable for tests.
+    """
+
+    def __init__(
+        self,
+        ca_clients,
+        lead_time: float = DEFAULT_LEAD_TIME,
+        spread: float = None,
+        max_per_second: float = None,
+        burst: int = 1,
+        retry_interval: float = DEFAULT_RETRY_INTERVAL,
+        wallet=None,
+        on_renewed: Callable[[EnrolledMember, EnrolledMember], None] = None,
+        on_error: Callable[[EnrolledMember, Exception], None] = None,
+        clock: Callable[[], float] = time.time,
+        expiry: Callable[[EnrolledMember], float] = certificate_expiry,
+        rng: random.Random = None
+    ) -> None:
+        """
+        :param ca_clients: CAClient re-enrolling the members, or a dict of
+                           them by CA name
+        :type ca_clients: Union[CAClient, Dict[str, CAClient]]
+
+        :param lead_time: seconds before expiry a member becomes due
+        :type lead_time: float
+
+        :param spread: maximum random delay added to the due time,
+                       half of lead_time by default, at most lead_time
+                       so a member is never due after its expiry
+        :type spread: float
+
+        :param max_per_second: reenrollments sent per second to each CA,
+                               unlimited by default
+        :type max_per_second: float
+
+        :param burst: reenrollments a CA may receive at once
+        :type burst: int
+
+        :param retry_interval: seconds before retrying a failed
+                               reenrollment
+        :type retry_interval: float
+
+        :param wallet: Wallet where renewed members are saved
+        :type wallet: Wallet
+
+        :param on_renewed: called with the old and the new member
+        :param on_error: called with the member and the exception
+        :param clock: current time as a timestamp
+        :param expiry: certificate expiry of a member as a timestamp
+        :param rng: source of the random delays
+        :raises ValueError: spread is negative or larger than lead_time
+        """
+        spread = lead_time / 2 if spread is None else spread
+        if not 0 <= spread <= lead_time:
+            raise ValueError(
+                f"spread must be between 0 and lead_time ({lead_time}), got {spread}")
+
+        if not isinstance(ca_clients, dict):
+            ca_clients = {None: ca_clients}
+        self._ca_clients = ca_clients
+        self._default_ca = next(iter(ca_clients))
+
+        self.lead_time = lead_time
+        self.spread = spread
+        self.max_per_second = max_per_second
+        self.burst = burst
+        self.retry_interval = retry_interval
+        self.wallet = wallet
+        self.on_renewed = on_renewed
+        self.on_error = on_error
+        self._clock = clock
+        self._expiry = expiry
+        self._random = rng or random.Random()
+
+        self.renewed = 0
+        self.failed = 0
+        self._heap = []
+        self._counter = itertools.count()
+        self._tracked: Dict[str, tuple] = {}
+        self._limits: Dict[str, AdmissionController] = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __len__(self):
+        return len(self._tracked)
+
+    def track(self, member: EnrolledMember, ca_name: str = None) -> float:
+        """Schedule the renewal of a member, replacing its previous schedule
+
+        :param member: the enrolled member
+        :param ca_name: CA that enrolled it, the first CA by default
+        :return: due time of the renewal
+        """
+        if ca_name is None:
+            ca_name = self._default_ca
+        if ca_name not in self._ca_clients:
+            raise KeyError(ca_name)
+
+        due = self._expiry(member) - self.lead_time + self._random.uniform(0, self.spread)
+        with self._lock:
+            self._schedule(member, ca_name, due)
+        self._wake.set()
+        return due
+
+    def _schedule(self, member, ca_name, due):
+        version = next(self._counter)
+        self._tracked[member.enrollment_id] = (member, ca_name, version)
+        heapq.heappush(self._heap, (due, version, member.enrollment_id))
+
+    def untrack(self, enrollment_id: str) -> bool:
+        """Stop renewing a member
+
+        :return: the member was tracked
+        """
+        with self._lock:
+            return self._tracked.pop(enrollment_id, None) is not None
+
+    def current(self, enrollment_id: str) -> Optional[EnrolledMember]:
+        """Latest published identity of a tracked member"""
+        entry = self._tracked.get(enrollment_id)
+        return None if entry is None else entry[0]
+
+    def next_due(self) -> Optional[float]:
+        """Due time of the next renewal, None when nothing is tracked"""
+        with self._lock:
+            self._drop_stale()
+            return self._heap[0][0] if self._heap else None
+
+    def _drop_stale(self):
+        heap = self._heap
+        while heap:
+            _, version, enrollment_id = heap[0]
+            entry = self._tracked.get(enrollment_id)
+            if entry is not None and entry[2] == version:
+                return
+            heapq.heappop(heap)
+
+    def _acquire(self, ca_name) -> float:
+        """0 when the CA can take a reenrollment now, else seconds to wait"""
+        # the token of the CA is taken by the reenrollment itself, a busy
+        # CA queues it like any other request
+        admission = getattr(self._ca_clients[ca_name], 'admission', None)
+        if admission is not None:
+            wait = admission.delay()
+            if wait:
+                return wait
+
+        if self.max_per_second is None:
+            return 0
+        try:
+            limit = self._limits[ca_name]
+        except KeyError:
+            limit = self._limits[ca_name] = AdmissionController(
+                rate=self.max_per_second, burst=self.burst, clock=self._clock)
+        wait = limit.try_acquire()
+        if wait == 0:
+            # only the rate is limited, nothing waits for the release
+            limit.release()
+        return wait
+
+    def _pop_due(self, now) -> Tuple[List[tuple], bool]:
+        """Take the due members whose CA has capacity, postpone the others
+
+        At most one member per CA with an admission controller is taken,
+        its capacity is only known again once that one was sent.
+
+        :return: the members to renew, and whether due members were left
+                 for the next call
+        """
+        due = []
+        postponed = []
+        admitted = set()
+        left = False
+        with self._lock:
+            while True:
+                self._drop_stale()
+                if not self._heap or self._heap[0][0] > now:
+                    break
+                item = heapq.heappop(self._heap)
+                _, version, enrollment_id = item
+                member, ca_name, _ = self._tracked[enrollment_id]
+                if ca_name in admitted:
+                    postponed.append(item)
+                    left = True
+                    continue
+                wait = self._acquire(ca_name)
+                if wait:
+                    postponed.append((now + wait, version, enrollment_id))
+                    continue
+                due.append((member, ca_name, version))
+                if getattr(self._ca_clients[ca_name], 'admission', None) is not None:
+                    admitted.add(ca_name)
+            for item in postponed:
+                heapq.heappush(self._heap, item)
+        return due, left
+
+    def run_pending(self) -> int:
+        """Re-enroll every member that is due now
+
+        :return: number of renewed members published, members untracked
+                 or tracked again while renewing are not counted
+        """
+        renewed = 0
+        left = True
+        while left:
+            due, left = self._pop_due(self._clock())
+            renewed += self._renew(due)
+        return renewed
+
+    def _renew(self, due) -> int:
+        renewed = 0
+        for member, ca_name, version in due:
+            try:
+                new_member = self._ca_clients[ca_name].reenroll(member)
+            except Exception as e:
+                with self._lock:
+                    self.failed += 1
+                    if self._tracked.get(member.enrollment_id, (None, None, None))[2] == version:
+                        heapq.heappush(self._heap, (
+                            self._clock() + self.retry_interval, version, member.enrollment_id))
+                if self.on_error is not None:
+                    self.on_error(member, e)
+                continue
+
+            if self._publish(member, new_member, ca_name, version):
+                renewed += 1
+        return renewed
+
+    def _publish(self, old, new, ca_name, version) -> bool:
+        due = self._expiry(new) - self.lead_time + self._random.uniform(0, self.spread)
+        with self._lock:
+            entry = self._tracked.get(old.enrollment_id)
+            if entry is None or entry[2] != version:
+                # untracked or tracked again while renewing
+                return False
+            self._schedule(new, ca_name, due)
+            self.renewed += 1
+
+        if self.wallet is not None:
+            try:
+                self.wallet.put(new)
+            except Exception as e:
+                if self.on_error is not None:
+                    self.on_error(new, e)
+        if self.on_renewed is not None:
+            self.on_renewed(old, new)
+        return True
+
+    def _run(self, max_wait):
+        while not self._stop.is_set():
+            self.run_pending()
+            next_due = self.next_due()
+            timeout = max_wait if next_due is None else \
+                min(max_wait, max(0, next_due - self._clock()))
+            self._wake.wait(timeout)
+            self._wake.clear()
+
+    def start(self, max_wait: float = DEFAULT_MAX_WAIT) -> 'ReenrollmentScheduler':
+        """Run the renewals on a daemon thread
+
+        :param max_wait: longest sleep between two checks, bounds the
+                         drift when the clock jumps
+        :return: the scheduler
+        """
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._run, args=(max_wait,),
+                name='ReenrollmentScheduler', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
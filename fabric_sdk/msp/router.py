@@ -0,0 +1,361 @@
+import threading
+import time
+from typing import Any, Callable, List, Optional, Tuple, Union
+
+from fabric_sdk.common import Crypto
+from fabric_sdk.common.admission import AdmissionRejected
+from fabric_sdk.common.http_client import HttpRetryableError
+from fabric_sdk.common.retry import NOT_PROCESSED_STATUS, NOT_SENT_ERRORS, TRANSPORT_ERRORS, was_not_sent
+from fabric_sdk.common.crypto_tools import EcKeyPool
+from fabric_sdk.context import ContextClient
+from fabric_sdk.domain.network_members import EnrolledMember, RevokeRequest, UnenrolledMember, UnregisteredMember
+from .client import CAClient
+from .identity import SigningIdentity
+
+LEAST_OUTSTANDING = 'least_outstanding'
+EWMA = 'ewma'
+
+DEFAULT_FAILURE_THRESHOLD = 3
+DEFAULT_EJECTION_TIME = 10.0
+DEFAULT_MAX_EJECTION_TIME = 300.0
+DEFAULT_EWMA_DECAY = 0.3
+
+# calls that can be sent again to another CA whatever happened to the
+# first attempt, the others only when the connection was never made
+IDEMPOTENT_OPERATIONS = frozenset(('enroll', 'reenroll', 'generate_crl'))
+
+
+class Endpoint:
+    """A CA of the router, with the health seen from this client"""
+
+    def __init__(self, client) -> None:
+        """
+        :param client: CAClient or AsyncCAClient of the CA
+        """
+        self.client = client
+        self.name = client._ca_config.name
+        self.url = client._ca_config.url
+        self.outstanding = 0
+        self.latency = None
+        self.failures = 0
+        self.ejections = 0
+        self.ejected_until = None
+        self.requests = 0
+        self.errors = 0
+
+    def stats(self) -> dict:
+        return {
+            'name': self.name,
+            'url': self.url,
+            'outstanding': self.outstanding,
+            'latency': self.latency,
+            'failures': self.failures,
+            'ejected_until': self.ejected_until,
+            'requests': self.requests,
+            'errors': self.errors,
+        }
+
+
+class BaseCARouter:
+    """
+    Endpoint selection and passive health tracking shared by the sync and
+    the async routers.
+
+    Each call goes to the healthy CA with the fewest requests in flight
+    (``least_outstanding``) or with the best latency EWMA weighted by its
+    requests in flight (``ewma``). Transport errors count as failures, a
+    CA failing ``failure_threshold`` times in a row is ejected, for a
+    time doubling at each ejection up to ``max_ejection_time``. Once that
+    time is over the CA gets traffic again, and a single failure ejects
+    it anew. When every CA is ejected, the one re-admitted first is used.
+
+    Responses of the CA, even errors, prove it is alive: they reset its
+    failures and are returned as they are. Requests shed by the
+    ``rateLimit`` of a CA were never sent, they go to the next CA and do
+    not count as failures. So do requests the CA refused before
+    processing them, with a 429 or a 503; the other transient statuses
+    of HttpRetryableError are raised like any other response.
+    """
+
+    _transport_errors = TRANSPORT_ERRORS
+    _not_sent_errors = NOT_SENT_ERRORS
+
+    def __init__(
+        self,
+        clients: List[Any],
+        strategy: str = LEAST_OUTSTANDING,
+        failure_threshold: int = DEFAULT_FAILURE_THRESHOLD,
+        ejection_time: float = DEFAULT_EJECTION_TIME,
+        max_ejection_time: float = DEFAULT_MAX_EJECTION_TIME,
+        ewma_decay: float = DEFAULT_EWMA_DECAY,
+        clock: Callable[[], float] = time.monotonic
+    ) -> None:
+        if not clients:
+            raise ValueError("The router needs at least one CA")
+        if strategy not in (LEAST_OUTSTANDING, EWMA):
+            raise ValueError(f"Unknown strategy {strategy}")
+
+        self.endpoints = [Endpoint(client) for client in clients]
+        self.strategy = strategy
+        self.failure_threshold = failure_threshold
+        self.ejection_time = ejection_time
+        self.max_ejection_time = max_ejection_time
+        self.ewma_decay = ewma_decay
+        self._clock = clock
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _clients(context, ca_names, factory):
+        # replicas of a CA may share its name, so clients are built from
+        # the MSPConfigs and not from the names
+        return [factory(ca) for ca in context.ca_list
+                if ca_names is None or ca.name in ca_names]
+
+    def stats(self) -> List[dict]:
+        """Health and load of every CA"""
+        with self._lock:
+            return [endpoint.stats() for endpoint in self.endpoints]
+
+    def _available(self, endpoint, now):
+        if endpoint.ejected_until is None:
+            return True
+        if endpoint.ejected_until <= now:
+            # re-admitted, a single failure ejects it again
+            endpoint.ejected_until = None
+            endpoint.failures = self.failure_threshold - 1
+            return True
+        return False
+
+    def _cost(self, endpoint):
+        if self.strategy == LEAST_OUTSTANDING:
+            return endpoint.outstanding, endpoint.latency or 0
+        return (endpoint.latency or 0) * (endpoint.outstanding + 1), endpoint.outstanding
+
+    def _acquire(self, tried) -> Endpoint:
+        with self._lock:
+            now = self._clock()
+            candidates = [endpoint for endpoint in self.endpoints
+                          if endpoint not in tried and self._available(endpoint, now)]
+            if candidates:
+                endpoint = min(candidates, key=self._cost)
+            else:
+                remaining = [endpoint for endpoint in self.endpoints if endpoint not in tried]
+                if not remaining:
+                    return None
+                endpoint = min(remaining, key=lambda e: e.ejected_until or now)
+            endpoint.outstanding += 1
+            endpoint.requests += 1
+            return endpoint
+
+    def _release(self, endpoint, started, failed, sent=True):
+        with self._lock:
+            now = self._clock()
+            endpoint.outstanding -= 1
+            if not sent:
+                return
+            if failed:
+                endpoint.errors += 1
+                endpoint.failures += 1
+                if endpoint.failures >= self.failure_threshold:
+                    endpoint.ejected_until = now + min(
+                        self.max_ejection_time,
+                        self.ejection_time * 2 ** endpoint.ejections)
+                    endpoint.ejections += 1
+                    endpoint.failures = 0
+                return
+
+            latency = now - started
+            if endpoint.latency is None:
+                endpoint.latency = latency
+            else:
+                endpoint.latency += self.ewma_decay * (latency - endpoint.latency)
+            endpoint.failures = 0
+            endpoint.ejections = 0
+
+    def _can_fail_over(self, operation, error):
+        return operation in IDEMPOTENT_OPERATIONS or was_not_sent(error, self._not_sent_errors)
+
+    @staticmethod
+    def _not_processed(error):
+        return error.status in NOT_PROCESSED_STATUS
+
+    def signing_identity(self, member: EnrolledMember) -> SigningIdentity:
+        """Prepare the credentials of a member for signing many requests"""
+        return self.endpoints[0].client.signing_identity(member)
+
+
+class CARouter(BaseCARouter):
+    """Spread register, enroll, reenroll and revoke over every CA of the
+    context, see BaseCARouter. Same methods as CAClient, so it can be given
+    to ``onboard``."""
+
+    def __init__(
+        self,
+        context: ContextClient,
+        ca_names: List[str] = None,
+        http_client=None,
+        crypto_algorithm: Crypto = None,
+        key_pool: EcKeyPool = None,
+        **options
+    ) -> None:
+        """
+        :param context: context with network config
+        :type context: ContextClient
+
+        :param ca_names: names of the CAs to use, every CA of the
+                         context by default
+        :type ca_names: List[str]
+
+        :param http_client: Http client shared by the CAs
+        :type http_client: HttpProtocol
+
+        :param **options: strategy, failure_threshold, ejection_time,
+                          max_ejection_time, ewma_decay and clock of
+                          BaseCARouter
+        """
+        client_options = {'crypto_algorithm': crypto_algorithm, 'key_pool': key_pool}
+        if http_client is not None:
+            client_options['http_client'] = http_client
+
+        super().__init__(self._clients(
+            context, ca_names,
+            lambda ca: CAClient(context, ca, **client_options)), **options)
+
+    def _call(self, operation, *args):
+        tried = []
+        while True:
+            endpoint = self._acquire(tried)
+            tried.append(endpoint)
+            started = self._clock()
+            try:
+                result = getattr(endpoint.client, operation)(*args)
+            except AdmissionRejected:
+                self._release(endpoint, started, failed=False, sent=False)
+                if len(tried) == len(self.endpoints):
+                    raise
+                continue
+            except HttpRetryableError as e:
+                # an answer of the CA, not a transport failure
+                self._release(endpoint, started, failed=False)
+                if len(tried) == len(self.endpoints) or not self._not_processed(e):
+                    raise
+                continue
+            except self._transport_errors as e:
+                self._release(endpoint, started, failed=True)
+                if len(tried) == len(self.endpoints) or not self._can_fail_over(operation, e):
+                    raise
+                continue
+            except Exception:
+                self._release(endpoint, started, failed=False)
+                raise
+            self._release(endpoint, started, failed=False)
+            return result
+
+    def register(
+        self,
+        outsider_member: UnregisteredMember,
+        network_member: Union[EnrolledMember, SigningIdentity],
+        maxEnrollments: int,
+        attrs: dict,
+    ) -> UnenrolledMember:
+        """CAClient.register on the selected CA"""
+        return self._call('register', outsider_member, network_member, maxEnrollments, attrs)
+
+    def enroll(
+        self,
+        network_member: UnenrolledMember,
+        profile: str = '',
+        attr_reqs: Optional[List[Any]] = None
+    ) -> EnrolledMember:
+        """CAClient.enroll on the selected CA"""
+        return self._call('enroll', network_member, profile, attr_reqs)
+
+    def reenroll(self, current_member: EnrolledMember, attr_reqs: Optional[List[Any]] = None) -> EnrolledMember:
+        """CAClient.reenroll on the selected CA"""
+        return self._call('reenroll', current_member, attr_reqs)
+
+    def revoke(self, request: RevokeRequest, enroll_member: Union[EnrolledMember, SigningIdentity]) -> Tuple[Any, Any]:
+        """CAClient.revoke on the selected CA"""
+        return self._call('revoke', request, enroll_member)
+
+    def generate_crl(self, registrar: Union[EnrolledMember, SigningIdentity], *args) -> bytes:
+        """CAClient.generate_crl on the selected CA"""
+        return self._call('generate_crl', registrar, *args)
+
+
+class AsyncCARouter(BaseCARouter):
+    """asyncio flavour of CARouter over AsyncCAClients"""
+
+    def __init__(
+        self,
+        context: ContextClient,
+        ca_names: List[str] = None,
+        http_client=None,
+        crypto_algorithm: Crypto = None,
+        key_pool: EcKeyPool = None,
+        executor=None,
+        **options
+    ) -> None:
+        from fabric_sdk.common.async_http_client import \
+            ASYNC_NOT_SENT_ERRORS, ASYNC_TRANSPORT_ERRORS, AsyncHttpClient
+        from .async_client import AsyncCAClient
+
+        self._transport_errors = ASYNC_TRANSPORT_ERRORS
+        self._not_sent_errors = ASYNC_NOT_SENT_ERRORS
+        if http_client is None:
+            http_client = AsyncHttpClient()
+
+        super().__init__(self._clients(
+            context, ca_names,
+            lambda ca: AsyncCAClient(context, ca, http_client, crypto_algorithm,
+                                     executor, key_pool)), **options)
+
+    async def _call(self, operation, *args):
+        tried = []
+        while True:
+            endpoint = self._acquire(tried)
+            tried.append(endpoint)
+            started = self._clock()
+            try:
+                result = await getattr(endpoint.client, operation)(*args)
+            except AdmissionRejected:
+                self._release(endpoint, started, failed=False, sent=False)
+                if len(tried) == len(self.endpoints):
+                    raise
+                continue
+            except HttpRetryableError as e:
+                # an answer of the CA, not a transport failure
+                self._release(endpoint, started, failed=False)
+                if len(tried) == len(self.endpoints) or not self._not_processed(e):
+                    raise
+                continue
+            except self._transport_errors as e:
+                self._release(endpoint, started, failed=True)
+                if len(tried) == len(self.endpoints) or not self._can_fail_over(operation, e):
+                    raise
+                continue
+            except Exception:
+                self._release(endpoint, started, failed=False)
+                raise
+            self._release(endpoint, started, failed=False)
+            return result
+
+    async def register(self, outsider_member, network_member, maxEnrollments, attrs) -> UnenrolledMember:
+        """AsyncCAClient.register on the selected CA"""
+        return await self._call('register', outsider_member, network_member, maxEnrollments, attrs)
+
+    async def enroll(self, network_member, profile='', attr_reqs=None) -> EnrolledMember:
+        """AsyncCAClient.enroll on the selected CA"""
+        return await self._call('enroll', network_member, profile, attr_reqs)
+
+    async def reenroll(self, current_member, attr_reqs=None) -> EnrolledMember:
+        """AsyncCAClient.reenroll on the selected CA"""
+        return await self._call('reenroll', current_member, attr_reqs)
+
+    async def revoke(self, request, enroll_member) -> Tuple[Any, Any]:
+        """AsyncCAClient.revoke on the selected CA"""
+        return await self._call('revoke', request, enroll_member)
+
+    async def generate_crl(self, registrar, *args) -> bytes:
+        """AsyncCAClient.generate_crl on the selected CA"""
+        return await self._call('generate_crl', registrar, *args)
@@ -0,0 +1,362 @@
+import hashlib
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, Iterator, Optional
+
+from cryptography.exceptions import InvalidTag
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from cryptography.hazmat.primitives.kdf.scrypt import Scrypt
+
+from fabric_sdk.context.context import ClientConfig
+from fabric_sdk.domain.network_members import EnrolledMember
+
+DEFAULT_WALLET_NAME = 'wallet'
+DEFAULT_IDENTITY_CACHE_SIZE = 1024
+DEFAULT_IMPORT_BATCH_SIZE = 1000
+
+_SALT_SIZE = 16
+_NONCE_SIZE = 12
+_CHECK = b'fabric-sdk-wallet'
+_SECRET = b'/enrollment_secret'
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS meta (
+    name TEXT PRIMARY KEY,
+    value BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS chains (
+    id INTEGER PRIMARY KEY,
+    digest BLOB NOT NULL UNIQUE,
+    pem BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS identities (
+    enrollment_id TEXT PRIMARY KEY,
+    enrollment_secret BLOB,
+    role TEXT,
+    affiliation TEXT,
+    cert BLOB NOT NULL,
+    chain_id INTEGER REFERENCES chains (id),
+    private_key BLOB
+) WITHOUT ROWID;
+'''
+
+
+def _as_bytes(value):
+    return value.encode() if isinstance(value, str) else value
+
+
+class Wallet:
+    """
+    Persistent store of enrolled identities in a single SQLite file.
+
+    Identities are looked up by enrollment id through the primary key, CA
+    chains are stored once and shared by all the identities they signed.
+    Private keys and enrollment secrets are kept encrypted with AES-GCM
+    under a key derived once from the passphrase. Decoded members are kept in a bounded LRU, and
+    nothing is parsed on load: private keys come back as PEM bytes, ready
+    for a SigningIdentity.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        passphrase: bytes,
+        cache_size: int = DEFAULT_IDENTITY_CACHE_SIZE
+    ) -> None:
+        """
+        :param path: file of the wallet, created if missing
+        :type path: str
+
+        :param passphrase: secret protecting the private keys
+        :type passphrase: bytes
+
+        :param cache_size: maximum number of decoded members kept
+        :type cache_size: int
+
+        :raises ValueError: wrong passphrase for an existing wallet
+        """
+        self.path = path
+        self.cache_size = cache_size
+        self.hits = 0
+        self.misses = 0
+        self._cache = OrderedDict()
+        self._chains: Dict[int, bytes] = {}
+        self._lock = threading.RLock()
+
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        self._db.executescript(_SCHEMA)
+        self._aead = self._open(_as_bytes(passphrase))
+
+    @staticmethod
+    def from_config(
+        client: ClientConfig,
+        passphrase: bytes,
+        cache_size: int = DEFAULT_IDENTITY_CACHE_SIZE
+    ) -> 'Wallet':
+        """Open the wallet of a client's ``credentialStore``
+
+        The file is ``<path>/<wallet>.db``, ``wallet`` defaults to
+        DEFAULT_WALLET_NAME and ``path`` may use ${VAR}.
+
+        :param client: config of the client
+        :param passphrase: secret protecting the private keys
+        :param cache_size: maximum number of decoded members kept
+        :return: Wallet
+        :raises ValueError: the credentialStore has no path
+        """
+        store = client.credential_store or {}
+        try:
+            directory = os.path.expanduser(os.path.expandvars(store['path']))
+        except KeyError:
+            raise ValueError("credentialStore has no path") from None
+
+        os.makedirs(directory, exist_ok=True)
+        name = store.get('wallet') or DEFAULT_WALLET_NAME
+        return Wallet(os.path.join(directory, f'{name}.db'), passphrase, cache_size)
+
+    def _open(self, passphrase) -> AESGCM:
+        meta = dict(self._db.execute('SELECT name, value FROM meta'))
+        salt = meta.get('salt')
+        if salt is None:
+            salt = os.urandom(_SALT_SIZE)
+
+        key = Scrypt(salt=salt, length=32, n=2 ** 14, r=8, p=1).derive(passphrase)
+        aead = AESGCM(key)
+
+        if 'check' in meta:
+            try:
+                aead.decrypt(meta['check'][:_NONCE_SIZE], meta['check'][_NONCE_SIZE:], _CHECK)
+            except InvalidTag:
+                raise ValueError("Wrong wallet passphrase") from None
+        else:
+            nonce = os.urandom(_NONCE_SIZE)
+            with self._db:
+                self._db.execute('BEGIN')
+                self._db.executemany('INSERT INTO meta VALUES (?, ?)', [
+                    ('salt', salt),
+                    ('check', nonce + aead.encrypt(nonce, _CHECK, _CHECK))])
+        return aead
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute('SELECT COUNT(*) FROM identities').fetchone()[0]
+
+    def __contains__(self, enrollment_id):
+        with self._lock:
+            if enrollment_id in self._cache:
+                return True
+            return self._db.execute(
+                'SELECT 1 FROM identities WHERE enrollment_id = ?',
+                (enrollment_id,)).fetchone() is not None
+
+    def ids(self) -> Iterator[str]:
+        """Enrollment ids of the stored identities, sorted"""
+        with self._lock:
+            rows = self._db.execute(
+                'SELECT enrollment_id FROM identities ORDER BY enrollment_id').fetchall()
+        return (row[0] for row in rows)
+
+    def get(self, enrollment_id: str) -> Optional[EnrolledMember]:
+        """Get an identity by enrollment id
+
+        :param enrollment_id: enrollment id of the member
+        :return: EnrolledMember, None if the wallet does not have it
+        """
+        with self._lock:
+            try:
+                member = self._cache[enrollment_id]
+                self._cache.move_to_end(enrollment_id)
+                self.hits += 1
+                return member
+            except KeyError:
+                self.misses += 1
+
+            row = self._db.execute(
+                'SELECT * FROM identities WHERE enrollment_id = ?',
+                (enrollment_id,)).fetchone()
+            if row is None:
+                return None
+            member = self._decode(row)
+            self._cached(member)
+            return member
+
+    def put(self, member: EnrolledMember) -> None:
+        """Store an identity, replacing the one with the same enrollment id
+
+        :param member: the enrolled member
+        """
+        self.put_many((member,))
+
+    def put_many(
+        self,
+        members: Iterable[EnrolledMember],
+        batch_size: int = DEFAULT_IMPORT_BATCH_SIZE
+    ) -> int:
+        """Bulk import identities, one transaction per batch
+
+        :param members: the enrolled members
+        :param batch_size: identities written per transaction
+        :return: number of identities stored
+        """
+        count = 0
+        batch = []
+        for member in members:
+            batch.append(member)
+            if len(batch) >= batch_size:
+                count += self._write(batch)
+                batch = []
+        if batch:
+            count += self._write(batch)
+        return count
+
+    def _write(self, members):
+        with self._lock, self._db:
+            self._db.execute('BEGIN')
+            chain_ids = {}
+            rows = []
+            for member in members:
+                chain = _as_bytes(member.ca_cert_chain)
+                chain_id = None
+                if chain:
+                    chain_id = chain_ids.get(chain)
+                    if chain_id is None:
+                        chain_id = chain_ids[chain] = self._chain_id(chain)
+                rows.append((
+                    member.enrollment_id,
+                    self._encrypt_secret(member.enrollment_id, member.enrollment_secret),
+                    member.role,
+                    member.affiliation,
+                    _as_bytes(member.enrollment_cert),
+                    chain_id,
+                    self._encrypt_key(member.enrollment_id, member.private_key)))
+                self._cache.pop(member.enrollment_id, None)
+
+            self._db.executemany(
+                'INSERT OR REPLACE INTO identities VALUES (?, ?, ?, ?, ?, ?, ?)', rows)
+        return len(rows)
+
+    def _chain_id(self, chain):
+        digest = hashlib.sha256(chain).digest()
+        row = self._db.execute('SELECT id FROM chains WHERE digest = ?', (digest,)).fetchone()
+        if row is not None:
+            return row[0]
+        return self._db.execute(
+            'INSERT INTO chains (digest, pem) VALUES (?, ?)', (digest, chain)).lastrowid
+
+    def _chain(self, chain_id):
+        if chain_id is None:
+            return None
+        try:
+            return self._chains[chain_id]
+        except KeyError:
+            chain = self._db.execute(
+                'SELECT pem FROM chains WHERE id = ?', (chain_id,)).fetchone()[0]
+            self._chains[chain_id] = chain
+            return chain
+
+    def _encrypt_key(self, enrollment_id, private_key):
+        if private_key is None:
+            return None
+        if not isinstance(private_key, (bytes, str)):
+            private_key = private_key.private_bytes(
+                serialization.Encoding.PEM,
+                serialization.PrivateFormat.PKCS8,
+                serialization.NoEncryption())
+        nonce = os.urandom(_NONCE_SIZE)
+        return nonce + self._aead.encrypt(
+            nonce, _as_bytes(private_key), enrollment_id.encode())
+
+    def _decrypt_key(self, enrollment_id, sealed):
+        if sealed is None:
+            return None
+        return self._aead.decrypt(
+            sealed[:_NONCE_SIZE], sealed[_NONCE_SIZE:], enrollment_id.encode())
+
+    def _encrypt_secret(self, enrollment_id, secret):
+        if secret is None:
+            return None
+        nonce = os.urandom(_NONCE_SIZE)
+        return nonce + self._aead.encrypt(
+            nonce, _as_bytes(secret), enrollment_id.encode() + _SECRET)
+
+    def _decrypt_secret(self, enrollment_id, sealed):
+        # wallets written before secrets were sealed hold them as TEXT
+        if sealed is None or isinstance(sealed, str):
+            return sealed
+        return self._aead.decrypt(
+            sealed[:_NONCE_SIZE], sealed[_NONCE_SIZE:],
+            enrollment_id.encode() + _SECRET).decode()
+
+    def _decode(self, row) -> EnrolledMember:
+        enrollment_id, secret, role, affiliation, cert, chain_id, sealed = row
+        return EnrolledMember(
+            enrollment_id=enrollment_id,
+            enrollment_secret=self._decrypt_secret(enrollment_id, secret),
+            role=role,
+            affiliation=affiliation,
+            enrollment_cert=cert,
+            ca_cert_chain=self._chain(chain_id),
+            private_key=self._decrypt_key(enrollment_id, sealed))
+
+    def _cached(self, member):
+        self._cache[member.enrollment_id] = member
+        self._cache.move_to_end(member.enrollment_id)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def export(self, ids: Iterable[str] = None) -> Iterator[EnrolledMember]:
+        """Bulk export identities, e.g. to ``put_many`` of another wallet
+
+        Rows are read and decoded by batches, in enrollment id order,
+        without filling the cache.
+
+        :param ids: enrollment ids to export, every identity by default
+        :return: iterator of EnrolledMember
+        """
+        if ids is not None:
+            for enrollment_id in ids:
+                member = self.get(enrollment_id)
+                if member is not None:
+                    yield member
+            return
+
+        last = ''
+        while True:
+            with self._lock:
+                rows = self._db.execute(
+                    'SELECT * FROM identities WHERE enrollment_id > ? '
+                    'ORDER BY enrollment_id LIMIT ?',
+                    (last, DEFAULT_IMPORT_BATCH_SIZE)).fetchall()
+                members = [self._decode(row) for row in rows]
+            if not members:
+                return
+            yield from members
+            last = members[-1].enrollment_id
+
+    def delete(self, enrollment_id: str) -> bool:
+        """Remove an identity
+
+        :param enrollment_id: enrollment id of the member
+        :return: the wallet had the identity
+        """
+        with self._lock, self._db:
+            self._cache.pop(enrollment_id, None)
+            return self._db.execute(
+                'DELETE FROM identities WHERE enrollment_id = ?',
+                (enrollment_id,)).rowcount > 0
+
+    def close(self):
+        with self._lock:
+            self._cache.clear()
+            self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -0,0 +1,162 @@
+import asyncio
+import base64
+import threading
+import time
+
+import pytest
+
+from fabric_sdk.common import admission
+from fabric_sdk.common.admission import AdmissionController, AdmissionRejected, AdmittedHttpClient
+from fabric_sdk.context.context import ClientConfig, ContextClient, MSPConfig, OrgConfig
+from fabric_sdk.domain.network_members import UnenrolledMember
+from fabric_sdk.msp.client import CAClient
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_token_bucket_sheds_after_deadline():
+    clock = Clock()
+    controller = AdmissionController(rate=10, burst=2, clock=clock)
+
+    controller.acquire(timeout=0)
+    controller.acquire(timeout=0)
+    with pytest.raises(AdmissionRejected):
+        controller.acquire(timeout=0)
+
+    clock.now += 0.1
+    controller.acquire(timeout=0)
+
+    assert controller.stats() == {
+        'admitted': 3, 'queued': 1, 'rejected': 1, 'in_flight': 3, 'waiting': 0}
+
+
+def test_try_acquire_never_waits():
+    clock = Clock()
+    controller = AdmissionController(rate=2, burst=1, max_in_flight=1, clock=clock)
+
+    assert controller.try_acquire() == 0
+    clock.now += 0.5
+    assert controller.try_acquire() is None
+    controller.release()
+    assert controller.try_acquire() == 0
+    controller.release()
+    assert controller.try_acquire() == 0.5
+    assert controller.stats()['admitted'] == 2
+
+
+def test_delay_takes_nothing():
+    clock = Clock()
+    controller = AdmissionController(rate=2, burst=1, max_in_flight=1, clock=clock)
+
+    assert controller.delay() == 0 and controller.delay() == 0
+    assert controller.try_acquire() == 0
+    assert controller.delay() is None
+    controller.release()
+    assert controller.delay() == 0.5
+    clock.now += 0.5
+    assert controller.delay() == 0
+    assert controller.stats()['admitted'] == 1
+
+
+def test_in_flight_limit_queues_then_sheds():
+    controller = AdmissionController(max_in_flight=2, max_queue=1)
+    controller.acquire()
+    controller.acquire()
+
+    admitted = threading.Event()
+
+    def queued():
+        with controller.admit(timeout=5):
+            admitted.set()
+
+    thread = threading.Thread(target=queued)
+    thread.start()
+    while controller.waiting == 0:
+        time.sleep(0.001)
+
+    with pytest.raises(AdmissionRejected, match='full'):
+        controller.acquire()
+    assert not admitted.is_set()
+
+    controller.release()
+    thread.join()
+
+    assert admitted.is_set()
+    assert controller.stats() == {
+        'admitted': 3, 'queued': 1, 'rejected': 1, 'in_flight': 1, 'waiting': 0}
+
+
+def test_sync_and_async_callers_share_the_limits():
+    controller = AdmissionController(max_in_flight=2)
+    running = []
+    peak = []
+
+    async def call():
+        async with controller.aadmit(timeout=5):
+            running.append(1)
+            peak.append(len(running))
+            await asyncio.sleep(0.005)
+            running.pop()
+
+    async def main():
+        # a sync caller holds a slot and gives it back from another thread
+        controller.acquire()
+        threading.Timer(0.02, controller.release).start()
+        await asyncio.gather(*(call() for _ in range(10)))
+
+    asyncio.run(main())
+
+    assert max(peak) <= 2
+    assert controller.admitted == 11
+    assert controller.in_flight == 0
+
+
+def test_ca_client_paced_by_rate_limit():
+    calls = []
+
+    class Http:
+        @staticmethod
+        def post(path, **param):
+            calls.append(path)
+            return {'success': True, 'result': {
+                'Cert': base64.b64encode(b'cert').decode(),
+                'ServerInfo': {'CAChain': ''}}}, 201
+
+    ca = MSPConfig('ca1', 'https://paced-ca:7054/', {}, {}, {},
+                   rate_limit={'requestsPerSecond': 1, 'burst': 1, 'queueTimeout': 0})
+    context = ContextClient(ClientConfig('org1', {}, {}), OrgConfig('Org1MSP', {}, {}), [ca])
+    client = CAClient(context, http_client=Http)
+
+    assert isinstance(client.http_client, AdmittedHttpClient)
+    assert CAClient(context, http_client=Http).admission is client.admission
+
+    client.enroll(UnenrolledMember('user0', 'secret', 'client', 'org1'))
+    with pytest.raises(AdmissionRejected):
+        client.enroll(UnenrolledMember('user1', 'secret', 'client', 'org1'))
+
+    assert len(calls) == 1
+    assert client.admission.rejected == 1
+
+
+def test_reload_replaces_the_controller_of_a_ca():
+    url = 'https://reloaded-ca:7054/'
+    controller = admission.admission_controller(url, {'requestsPerSecond': 1})
+    assert admission.admission_controller(url, {'requestsPerSecond': 1}) is controller
+
+    for rate in range(2, 50):
+        reloaded = admission.admission_controller(url, {'requestsPerSecond': rate})
+    assert reloaded is not controller and reloaded.rate == 49
+    assert sum(key == url for key in admission._controllers) == 1
+
+    # a profile of the same CA without rateLimit does not drop the shared one
+    assert admission.admission_controller(url, {}) is None
+    assert admission.admission_controller(url, {'requestsPerSecond': 49}) is reloaded
+
+    admission.reset_admission_controllers(url)
+    assert url not in admission._controllers
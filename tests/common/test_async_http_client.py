@@ -0,0 +1,142 @@
+import asyncio
+import base64
+import datetime
+import json
+import ssl
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import aiohttp
+import pytest
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+from cryptography.x509.oid import NameOID
+
+from fabric_sdk.common.async_http_client import AsyncHttpClient
+from fabric_sdk.common.http_client import HttpRetryableError
+
+
+class SlowCA:
+    """Local CA stand-in answering after ``delay``, records the requests
+    in flight at once and the Authorization headers"""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.status = 201
+        self.running = 0
+        self.max_running = 0
+        self.auth = []
+        self.lock = threading.Lock()
+        ca = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                with ca.lock:
+                    ca.running += 1
+                    ca.max_running = max(ca.max_running, ca.running)
+                    ca.auth.append(self.headers.get('Authorization'))
+                time.sleep(ca.delay)
+                with ca.lock:
+                    ca.running -= 1
+                body = json.dumps({'success': True}).encode()
+                self.send_response(ca.status)
+                if ca.status == 503:
+                    self.send_header('Retry-After', '3')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f'http://127.0.0.1:{self.server.server_port}/'
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def _self_signed_pem():
+    key = ec.generate_private_key(ec.SECP256R1())
+    subject = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, 'ca.example.com')])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    cert = (x509.CertificateBuilder()
+            .subject_name(subject).issuer_name(subject)
+            .public_key(key.public_key())
+            .serial_number(x509.random_serial_number())
+            .not_valid_before(now)
+            .not_valid_after(now + datetime.timedelta(days=1))
+            .sign(key, hashes.SHA256()))
+    return cert.public_bytes(serialization.Encoding.PEM)
+
+
+@pytest.fixture
+def slow_ca():
+    ca = SlowCA(delay=0.05)
+    yield ca
+    ca.close()
+
+
+def test_requests_params_are_translated(tmp_path):
+    http = AsyncHttpClient()
+    cafile = tmp_path / 'ca.pem'
+    cafile.write_bytes(_self_signed_pem())
+
+    param = http._translate({'verify': True, 'auth': ('admin', 'pw'), 'timeout': 5})
+    assert param['ssl'] is True
+    assert param['auth'] == aiohttp.BasicAuth('admin', 'pw')
+    assert param['timeout'] == aiohttp.ClientTimeout(total=5)
+
+    assert http._translate({'verify': False})['ssl'] is False
+    context = http._translate({'verify': str(cafile)})['ssl']
+    assert isinstance(context, ssl.SSLContext)
+    assert http._translate({'verify': str(cafile)})['ssl'] is context
+
+
+def test_requests_reach_the_ca(slow_ca):
+    async def run():
+        async with AsyncHttpClient() as http:
+            return await http.post(slow_ca.url + 'enroll', json={}, auth=('admin', 'pw'), timeout=5)
+
+    assert asyncio.run(run()) == ({'success': True}, 201)
+    assert slow_ca.auth == ['Basic ' + base64.b64encode(b'admin:pw').decode()]
+
+
+def test_retryable_status_raises(slow_ca):
+    slow_ca.status = 503
+
+    async def run():
+        async with AsyncHttpClient() as http:
+            await http.post(slow_ca.url + 'enroll', json={})
+
+    with pytest.raises(HttpRetryableError) as e:
+        asyncio.run(run())
+    assert e.value.status == 503 and e.value.retry_after == 3
+
+
+def test_in_flight_limit_holds_across_sessions(slow_ca):
+    http = AsyncHttpClient(max_in_flight=2)
+
+    async def burst():
+        return await asyncio.gather(*(http.post(slow_ca.url + 'enroll', json={}) for _ in range(6)))
+
+    async def run():
+        await burst()
+        semaphore = http._semaphore
+        # the session is replaced while requests of the first one are pending
+        pending = asyncio.gather(burst(), http.close(), burst())
+        await pending
+        await http.close()
+        return semaphore
+
+    assert asyncio.run(run()) is http._semaphore
+    assert slow_ca.max_running == 2
+    # a client can be used again from another event loop
+    asyncio.run(run())
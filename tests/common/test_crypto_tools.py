@@ -0,0 +1,187 @@
+import datetime
+import io
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+from cryptography.hazmat.primitives.asymmetric.utils import decode_dss_signature, encode_dss_signature
+
+from fabric_sdk.common.crypto_tools import CURVE_P_384_Size, CertCache, CertTools, Ecies, EcKeyPool
+from fabric_sdk.context.context import ClientConfig, ContextClient, MSPConfig, OrgConfig
+from fabric_sdk.msp.client import CAClient
+
+
+@pytest.fixture(scope='module')
+def ecies():
+    return Ecies()
+
+
+@pytest.fixture(scope='module')
+def private_key(ecies):
+    return ecies.generate_private_key()
+
+
+def test_sign_many_matches_verify(ecies, private_key):
+    messages = [os.urandom(64) for _ in range(600)]
+
+    signatures = ecies.sign_many(private_key, messages, chunk_size=100)
+    items = [(private_key.public_key(), m, s) for m, s in zip(messages, signatures)]
+    items[7] = (private_key.public_key(), b'tampered', signatures[7])
+
+    results = ecies.verify_many(items, chunk_size=100)
+
+    assert results == [i != 7 for i in range(600)]
+    assert all(ecies._check_malleability(s) for s in signatures)
+
+
+def test_sign_many_normalizes_to_low_s():
+    ecies = Ecies(CURVE_P_384_Size)
+    key = ecies.generate_private_key()
+    messages = [os.urandom(32) for _ in range(300)]
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        signatures = ecies.sign_many(key, messages, executor=executor, chunk_size=64)
+        assert len(signatures) == 300
+        assert all(decode_dss_signature(s)[1] <= ecies.half_order for s in signatures)
+        assert all(ecies.verify(key.public_key(), m, s) for m, s in zip(messages, signatures))
+
+        # the high-S twin of a valid signature is rejected like in verify
+        r, s = decode_dss_signature(signatures[0])
+        high_s = encode_dss_signature(r, ecies.order - s)
+        assert ecies.verify_many(
+            [(key.public_key(), messages[0], high_s)], executor=executor) == [False]
+
+
+def test_stream_round_trip(ecies, private_key):
+    plain_text = os.urandom(200_000)
+
+    cipher_text = b''.join(ecies.encrypt_stream(
+        private_key.public_key(), io.BytesIO(plain_text), chunk_size=4096))
+    chunks = [cipher_text[i:i + 999] for i in range(0, len(cipher_text), 999)]
+
+    assert ecies.decrypt(private_key, cipher_text) == plain_text
+    assert b''.join(ecies.decrypt_stream(private_key, chunks)) == plain_text
+
+
+def test_decrypt_stream_rejects_tampered_cipher_text(ecies, private_key):
+    cipher_text = bytearray(ecies.encrypt(private_key.public_key(), b'secret'))
+    cipher_text[-1] ^= 1
+
+    with pytest.raises(ValueError):
+        b''.join(ecies.decrypt_stream(
+            private_key, io.BytesIO(bytes(cipher_text)), verify_first=True))
+
+
+def test_encrypt_multi(ecies):
+    recipients = [ecies.generate_private_key() for _ in range(40)]
+
+    wrapped_keys, payload = ecies.encrypt_multi(
+        [key.public_key() for key in recipients], b'shared secret', max_workers=4)
+
+    assert len(wrapped_keys) == 40
+    assert all(ecies.decrypt_multi(key, wrapped, payload) == b'shared secret'
+               for key, wrapped in zip(recipients, wrapped_keys))
+    with pytest.raises(ValueError):
+        ecies.decrypt_multi(recipients[0], wrapped_keys[1], payload)
+
+
+def test_key_pool_hands_out_each_key_once():
+    with EcKeyPool(Ecies(CURVE_P_384_Size), size=8, low_watermark=2) as pool:
+        deadline = time.monotonic() + 10
+        while len(pool) < 8 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert len(pool) == 8
+
+        keys = []
+        lock = threading.Lock()
+
+        def take():
+            for _ in range(25):
+                key = pool.generate_private_key()
+                with lock:
+                    keys.append(key)
+
+        threads = [threading.Thread(target=take) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert pool.hits + pool.misses == 100
+        assert pool.hits >= 8
+        assert len({key.private_numbers().private_value for key in keys}) == 100
+        assert all(isinstance(key.curve, ec.SECP384R1) for key in keys)
+
+    assert not pool._thread.is_alive()
+    assert len(pool) == 0
+
+
+def test_ca_client_checks_the_key_pool_curve():
+    context = ContextClient(
+        ClientConfig('org1', {}, {}), OrgConfig('Org1MSP', {}, {}),
+        [MSPConfig('ca1', 'https://ca1:7054/', {}, {}, {})])
+
+    class Suite:
+        """A Crypto without a curve attribute"""
+
+        def generate_private_key(self):
+            return ec.generate_private_key(ec.SECP256R1())
+
+    with EcKeyPool(Ecies(CURVE_P_384_Size), size=1) as pool:
+        with pytest.raises(ValueError):
+            CAClient(context, key_pool=pool)
+        assert CAClient(context, crypto_algorithm=Ecies(CURVE_P_384_Size), key_pool=pool)
+        assert CAClient(context, crypto_algorithm=Suite(), key_pool=pool)
+
+
+def _cert_pem(serial):
+    key = ec.generate_private_key(ec.SECP256R1())
+    subject = x509.Name([x509.NameAttribute(x509.NameOID.COMMON_NAME, f'user{serial}')])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    return (x509.CertificateBuilder()
+            .subject_name(subject).issuer_name(subject)
+            .public_key(key.public_key())
+            .serial_number(serial)
+            .not_valid_before(now)
+            .not_valid_after(now + datetime.timedelta(days=1))
+            .add_extension(x509.SubjectKeyIdentifier.from_public_key(key.public_key()), False)
+            .sign(key, hashes.SHA256())
+            .public_bytes(serialization.Encoding.PEM))
+
+
+def test_cert_cache_is_a_bounded_lru():
+    pems = [_cert_pem(serial) for serial in range(1, 4)]
+    cache = CertCache(maxsize=2)
+
+    first = cache.get(pems[0])
+    assert cache.get(pems[0].decode()) is first
+    assert first.serial == 1 and first.aki is None and first.ski is not None
+    assert first.subject.rfc4514_string() == 'CN=user1'
+
+    cache.get(pems[1])
+    cache.get(pems[0])
+    cache.get(pems[2])
+    assert len(cache) == 2
+    assert cache.get(pems[0]) is first
+    assert (cache.hits, cache.misses) == (3, 3)
+
+    cache.get(pems[1])
+    assert cache.misses == 4
+
+    cache.clear()
+    assert len(cache) == 0 and (cache.hits, cache.misses) == (0, 0)
+
+
+def test_cert_tools_share_one_parse(monkeypatch):
+    monkeypatch.setattr(CertTools, 'cache', CertCache())
+    pem = _cert_pem(7)
+
+    assert CertTools.get_serial(pem) == 7
+    assert CertTools.get_expiry(pem) == CertTools.load(pem).not_valid_after
+    assert CertTools.get_subject(pem) is CertTools.load(pem).subject
+    assert CertTools.cache.misses == 1
@@ -0,0 +1,101 @@
+import json
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from fabric_sdk.common.http_client import SessionHttpClient
+
+
+class KeepAliveCA:
+    """Local CA stand-in answering HTTP/1.1, records the client port of
+    every request to tell the connections apart"""
+
+    def __init__(self):
+        self.ports = []
+        self.head_ports = []
+        ca = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_HEAD(self):
+                ca.head_ports.append(self.client_address[1])
+                self.send_response(200)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                ca.ports.append(self.client_address[1])
+                body = json.dumps({'success': True}).encode()
+                self.send_response(201)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f'http://127.0.0.1:{self.server.server_port}/'
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def cas():
+    cas = [KeepAliveCA(), KeepAliveCA()]
+    yield cas
+    for ca in cas:
+        ca.close()
+
+
+def test_connections_are_reused_per_origin(cas):
+    with SessionHttpClient() as http:
+        for _ in range(5):
+            for ca in cas:
+                assert http.post(ca.url + 'enroll', json={}) == ({'success': True}, 201)
+
+        assert len(http._sessions) == 2
+        assert all(len(set(ca.ports)) == 1 for ca in cas)
+        assert cas[0].ports[0] != cas[1].ports[0]
+
+
+def test_keep_alive_disabled_opens_a_connection_per_request(cas):
+    with SessionHttpClient(keep_alive=False) as http:
+        for _ in range(3):
+            http.post(cas[0].url + 'enroll', json={})
+
+    assert len(set(cas[0].ports)) == 3
+
+
+def test_warm_up_opens_connections_ahead(cas):
+    with SessionHttpClient(pool_maxsize=2) as http:
+        assert http.warm_up(cas[0].url, connections=5) == 2
+        assert len(set(cas[0].head_ports)) == 2
+
+        http.post(cas[0].url + 'enroll', json={})
+        assert cas[0].ports[0] in cas[0].head_ports
+
+    # nothing listens on a port just released, warm up is best effort
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        url = f'http://127.0.0.1:{s.getsockname()[1]}/'
+    assert SessionHttpClient().warm_up(url) == 0
+
+
+def test_close_drops_the_pooled_connections(cas):
+    http = SessionHttpClient()
+    http.post(cas[0].url + 'enroll', json={})
+    http.close()
+
+    assert http._sessions == {}
+    http.post(cas[0].url + 'enroll', json={})
+    assert len(set(cas[0].ports)) == 2
+    http.close()
+
@@ -0,0 +1,129 @@
+import datetime
+import os
+
+import pytest
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+from cryptography.x509.oid import NameOID
+
+from fabric_sdk.common import key_material
+from fabric_sdk.common.key_material import KeyMaterialResolver
+from fabric_sdk.context import context
+from fabric_sdk.context.context import MSPConfig, OrgConfig
+from fabric_sdk.context.load_yaml import load_config_manager
+
+NETWORK_WITH_RELATIVE_PATHS = """
+certificateAuthorities:
+  ca1:
+    url: https://ca1:7054
+    tlsCACerts:
+      path: keys/tlsca.pem
+client:
+  organization: org1
+organizations:
+  org1:
+    mspid: Org1MSP
+    adminPrivateKey:
+      path: keys/admin.key
+    certificateAuthorities:
+      - ca1
+"""
+
+
+def _self_signed(name):
+    key = ec.generate_private_key(ec.SECP256R1())
+    subject = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, name)])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    cert = (x509.CertificateBuilder()
+            .subject_name(subject).issuer_name(subject)
+            .public_key(key.public_key())
+            .serial_number(x509.random_serial_number())
+            .not_valid_before(now)
+            .not_valid_after(now + datetime.timedelta(days=1))
+            .sign(key, hashes.SHA256()))
+    key_pem = key.private_bytes(serialization.Encoding.PEM,
+                                serialization.PrivateFormat.PKCS8,
+                                serialization.NoEncryption())
+    return key_pem, cert.public_bytes(serialization.Encoding.PEM)
+
+
+@pytest.fixture(scope='module')
+def pems():
+    return [_self_signed(f'ca{i}.example.com') for i in range(3)]
+
+
+def test_org_material_is_loaded_lazily(tmp_path, pems, monkeypatch):
+    key_pem, cert_pem = pems[0]
+    (tmp_path / 'admin.key').write_bytes(key_pem)
+    monkeypatch.setenv('KEY_MATERIAL_DIR', str(tmp_path))
+    resolver = KeyMaterialResolver()
+    monkeypatch.setattr(context, 'key_material', resolver)
+
+    org = OrgConfig('Org1MSP', {'path': '${KEY_MATERIAL_DIR}/admin.key'},
+                    {'pem': cert_pem.decode()})
+    assert len(resolver) == 0
+
+    assert org.admin_private_key is org.admin_private_key
+    assert org.admin_cert.subject.rfc4514_string() == 'CN=ca0.example.com'
+    assert (resolver.misses, resolver.hits) == (2, 1)
+
+
+def test_file_change_is_reloaded(tmp_path, pems):
+    resolver = KeyMaterialResolver()
+    path = tmp_path / 'cert.pem'
+    path.write_bytes(pems[0][1])
+    first = resolver.certificate({'path': str(path)})
+
+    path.write_bytes(pems[1][1])
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+
+    assert resolver.certificate({'path': str(path)}) != first
+
+
+def test_identical_bundles_are_shared(tmp_path, pems, monkeypatch):
+    monkeypatch.setattr(key_material, 'MMAP_THRESHOLD', 0)
+    bundle = b''.join(cert for _, cert in pems)
+    for name in ('a.pem', 'b.pem', 'extra.pem'):
+        (tmp_path / name).write_bytes(bundle if name != 'extra.pem' else pems[0][1])
+
+    resolver = KeyMaterialResolver()
+    a = resolver.certificates({'path': str(tmp_path / 'a.pem')})
+    b = resolver.certificates({'path': str(tmp_path / 'b.pem')})
+    both = resolver.certificates(
+        {'path': f"{tmp_path / 'a.pem'}, {tmp_path / 'extra.pem'}"})
+
+    assert len(a) == 3 and a is b
+    assert both == a + (a[0],)
+    assert resolver.misses == 2
+
+
+def test_msp_without_tls_certs():
+    msp = MSPConfig('ca', 'https://localhost:7054', {}, {}, {})
+    assert msp.tls_ca_bundle == ()
+
+
+def test_ambiguous_reference_is_rejected(tmp_path, pems):
+    for name in ('a.pem', 'b.pem'):
+        (tmp_path / name).write_bytes(pems[0][1])
+
+    with pytest.raises(ValueError):
+        KeyMaterialResolver().certificate({'path': f"{tmp_path / 'a.pem'},{tmp_path / 'b.pem'}"})
+
+
+def test_relative_paths_start_at_the_config_file(tmp_path, pems, monkeypatch):
+    key_pem, cert_pem = pems[0]
+    config_dir = tmp_path / 'config'
+    (config_dir / 'keys').mkdir(parents=True)
+    (config_dir / 'keys' / 'admin.key').write_bytes(key_pem)
+    (config_dir / 'keys' / 'tlsca.pem').write_bytes(cert_pem)
+    (config_dir / 'network.yaml').write_text(NETWORK_WITH_RELATIVE_PATHS)
+    monkeypatch.setattr(context, 'key_material', KeyMaterialResolver())
+    monkeypatch.chdir(tmp_path)
+
+    manager = load_config_manager(str(config_dir))
+
+    org = manager.get_org('org1')
+    assert org.admin_private_key.private_numbers().private_value > 0
+    assert manager.get_ca('ca1').tls_ca_bundle[0].subject.rfc4514_string() == 'CN=ca0.example.com'
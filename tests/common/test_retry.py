@@ -0,0 +1,192 @@
+import asyncio
+import base64
+import json
+import random
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from requests import ConnectionError
+
+from fabric_sdk.common.http_client import HttpClient, HttpRetryableError, parse_retry_after
+from fabric_sdk.common.retry import AsyncRetryingHttpClient, RetryBudget, RetryingHttpClient
+from fabric_sdk.context.context import ClientConfig, ContextClient, MSPConfig, OrgConfig
+from fabric_sdk.domain.network_members import UnenrolledMember
+from fabric_sdk.msp.client import CAClient
+
+CERT = base64.b64encode(b'cert').decode()
+
+
+class FaultyCA:
+    """Local CA stand-in, each request takes the next fault of the script:
+    a status with an optional Retry-After, ``drop`` to close the
+    connection without answering, or ``ok``"""
+
+    def __init__(self):
+        self.faults = []
+        self.calls = []
+        ca = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                ca.calls.append(self.path)
+                fault = ca.faults.pop(0) if ca.faults else 'ok'
+                if fault == 'drop':
+                    self.close_connection = True
+                    return
+                status, retry_after = (201, None) if fault == 'ok' else fault
+                body = json.dumps({'success': True, 'result': {
+                    'Cert': CERT, 'ServerInfo': {'CAChain': ''}}}).encode()
+                self.send_response(status)
+                if retry_after is not None:
+                    self.send_header('Retry-After', retry_after)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f'http://127.0.0.1:{self.server.server_port}/'
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def faulty_ca():
+    ca = FaultyCA()
+    yield ca
+    ca.close()
+
+
+def ca_client(url, http, rate_limit=None):
+    context = ContextClient(
+        ClientConfig('org1', {}, {}), OrgConfig('Org1MSP', {}, {}),
+        [MSPConfig('ca1', url, {}, {}, {}, rate_limit=rate_limit)])
+    return CAClient(context, http_client=http)
+
+
+def retrying(sleeps, **kwargs):
+    return RetryingHttpClient(HttpClient, sleep=sleeps.append, rng=random.Random(1), **kwargs)
+
+
+def test_enroll_survives_transient_failures(faulty_ca):
+    sleeps = []
+    http = retrying(sleeps)
+    faulty_ca.faults = [(503, '2'), 'drop', (429, None)]
+
+    member = ca_client(faulty_ca.url, http).enroll(UnenrolledMember('user0', 'secret', 'client', 'org1'))
+
+    assert member.enrollment_cert == b'cert'
+    assert len(faulty_ca.calls) == 4
+    assert sleeps[0] == 2
+    assert all(0 <= delay <= 0.4 for delay in sleeps[1:])
+    stats = http.stats()['enroll']
+    assert stats['requests'] == 1 and stats['retries'] == 3 and stats['failures'] == 0
+    assert stats['latency_mean'] > 0
+
+
+def test_revoke_is_not_sent_twice(faulty_ca):
+    http = retrying([])
+
+    faulty_ca.faults = ['drop']
+    with pytest.raises(ConnectionError):
+        http.post(faulty_ca.url + 'revoke', json={})
+    assert len(faulty_ca.calls) == 1
+
+    # the CA did not process a 503, so it is retried
+    faulty_ca.faults = [(503, None)]
+    assert http.post(faulty_ca.url + 'revoke', json={})[1] == 201
+    assert len(faulty_ca.calls) == 3
+
+
+def test_register_retried_only_when_not_processed(faulty_ca):
+    http = retrying([])
+
+    faulty_ca.faults = [(502, None)]
+    with pytest.raises(HttpRetryableError):
+        http.post(faulty_ca.url + 'register', json={})
+    assert len(faulty_ca.calls) == 1
+
+    faulty_ca.faults = [(429, None)]
+    assert http.post(faulty_ca.url + 'register', json={})[1] == 201
+    assert len(faulty_ca.calls) == 3
+
+
+def test_each_attempt_is_admitted(faulty_ca):
+    in_flight = []
+    http = RetryingHttpClient(
+        HttpClient, sleep=lambda delay: in_flight.append(client.admission.in_flight))
+    client = ca_client(faulty_ca.url, http, rate_limit={'maxInFlight': 1, 'maxQueue': 0})
+    faulty_ca.faults = [(503, None), (503, None)]
+
+    client.enroll(UnenrolledMember('user0', 'secret', 'client', 'org1'))
+
+    assert len(faulty_ca.calls) == 3
+    # no admission held while backing off, each attempt admitted
+    assert in_flight == [0, 0]
+    assert client.admission.admitted == 3
+    assert client.http_client.http_client.controller is client.admission
+    assert http.stats() == client.http_client.stats()
+
+
+def test_revoke_retried_when_never_sent():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        url = f'http://127.0.0.1:{s.getsockname()[1]}/revoke'
+
+    http = retrying([])
+    with pytest.raises(ConnectionError):
+        http.post(url, json={})
+
+    assert http.stats()['revoke']['retries'] == 3
+
+
+def test_budget_stops_retry_storms(faulty_ca):
+    sleeps = []
+    http = retrying(sleeps, budget=RetryBudget(ratio=0.5, min_per_second=0, max_balance=2))
+    faulty_ca.faults = [(503, None)] * 20
+
+    for _ in range(4):
+        with pytest.raises(HttpRetryableError):
+            http.post(faulty_ca.url + 'enroll', json={})
+
+    # 4 requests and the 2 saved retries, then each request earns half a retry
+    assert len(faulty_ca.calls) == 4 + 2 + 1
+    assert http.stats()['enroll']['budget_exhausted'] == 4
+
+
+def test_long_retry_after_gives_up(faulty_ca):
+    http = retrying([], max_retry_after=10)
+    faulty_ca.faults = [(503, '60')]
+
+    with pytest.raises(HttpRetryableError) as e:
+        http.post(faulty_ca.url + 'enroll', json={})
+
+    assert e.value.retry_after == 60
+    assert len(faulty_ca.calls) == 1
+    assert parse_retry_after('Wed, 21 Oct 2015 07:28:00 GMT') == 0
+
+
+def test_async_retries():
+    calls = []
+
+    class Http:
+        async def post(self, path, **param):
+            calls.append(path)
+            if len(calls) < 3:
+                raise HttpRetryableError(502)
+            return {'success': True}, 200
+
+    async def no_wait(delay):
+        pass
+
+    http = AsyncRetryingHttpClient(Http(), sleep=no_wait)
+    assert asyncio.run(http.post('https://ca:7054/api/v1/enroll')) == ({'success': True}, 200)
+    assert http.stats()['enroll']['retries'] == 2
@@ -0,0 +1,51 @@
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+
+from fabric_sdk.context import load_yaml
+
+MSP_CONFIG = Path(__file__).resolve().parent / 'replicas' / 'msp.yaml'
+
+
+def test_parallel_load_reports_loader_and_timings(tmp_path):
+    for i in range(6):
+        shutil.copy(MSP_CONFIG, tmp_path / f'msp{i}.yaml')
+    paths = load_yaml.config_files(str(tmp_path))
+
+    threaded, report = load_yaml.load_config_files(paths, max_workers=3)
+    forked, _ = load_yaml.load_config_files(paths, max_workers=2, processes=True)
+
+    assert [f for f, _ in threaded] == [f for f, _ in forked]
+    assert [c for _, c in threaded] == [c for _, c in forked]
+    assert report.loader == load_yaml.LOADER_NAME
+    assert sorted(report.timings) == paths
+
+
+def test_threads_unless_processes_are_asked_for(tmp_path, monkeypatch):
+    for i in range(40):
+        shutil.copy(MSP_CONFIG, tmp_path / f'msp{i}.yaml')
+    pools = []
+
+    class ThreadPool(ThreadPoolExecutor):
+        def __init__(self, *args, **kwargs):
+            pools.append(self)
+            super().__init__(*args, **kwargs)
+
+    monkeypatch.setattr(load_yaml, 'ThreadPoolExecutor', ThreadPool)
+    load_yaml.load_config_manager(str(tmp_path))
+
+    assert len(pools) == 1
+
+
+def test_strict_mode_requires_c_loader(tmp_path, monkeypatch):
+    monkeypatch.setattr(load_yaml, 'LOADER_NAME', 'Loader')
+
+    with pytest.raises(ImportError):
+        load_yaml.load_config_files([], strict=True)
+    load_yaml.load_config_files([], strict=False)
+    with pytest.raises(ImportError):
+        load_yaml.load_config_manager(str(tmp_path), strict=True)
+    with pytest.raises(ImportError):
+        load_yaml.Context(strict=True)
@@ -0,0 +1,88 @@
+import os
+import shutil
+from pathlib import Path
+
+from fabric_sdk.__env__ import FABRIC_PYTHON_SDK_CONFIG_CACHE
+from fabric_sdk.context import ConfigWatcher, ContextRegistry, load_yaml
+from fabric_sdk.context.load_yaml import config_files, load_config_file, load_config_manager
+
+# org1 lists the three CAs of the network
+MSP_CONFIG = Path(__file__).resolve().parent / 'replicas' / 'msp.yaml'
+
+OTHER_NETWORK = """
+name: other
+client:
+  organization: org9
+organizations:
+  org9:
+    mspid: Org9MSP
+"""
+
+
+def test_watcher_reloads_only_changed_files(tmp_path):
+    shutil.copy(MSP_CONFIG, tmp_path / 'msp.yaml')
+    (tmp_path / 'other.yaml').write_text(OTHER_NETWORK)
+    config_path = str(tmp_path)
+
+    parsed = []
+
+    def reload(paths):
+        parsed.extend(paths)
+        registry.reload(config_path, {path: load_config_file(path) if os.path.exists(path) else None
+                                      for path in paths})
+
+    registry = ContextRegistry(load_config_manager)
+    live = registry.live(config_path, network_name='default')
+    other = registry.context(config_path, network_name='other')
+    before = live.current
+    watcher = ConfigWatcher(config_path, lambda: config_files(config_path), reload)
+
+    assert watcher.poll_once() == []
+
+    config = (tmp_path / 'msp.yaml').read_text()
+    config = config.replace('      - ca.org2.example.com\n', '')
+    (tmp_path / 'msp.yaml').write_text(config)
+    os.utime(tmp_path / 'msp.yaml', ns=(0, 0))
+
+    assert watcher.poll_once() == [f'{config_path}/msp.yaml']
+    assert parsed == [f'{config_path}/msp.yaml']
+    assert len(before.ca_list) == 3
+    assert len(live.current.ca_list) == 2
+    assert live.current.ca_list[0] is before.ca_list[0]
+    assert registry.context(config_path, network_name='other').orgs is other.orgs
+
+
+def test_reload_rewrites_the_snapshot(tmp_path, monkeypatch):
+    config_dir = tmp_path / 'config'
+    config_dir.mkdir()
+    shutil.copy(MSP_CONFIG, config_dir / 'msp.yaml')
+    config_path = str(config_dir)
+    monkeypatch.setenv(FABRIC_PYTHON_SDK_CONFIG_CACHE, str(tmp_path / 'cache'))
+    monkeypatch.setattr(load_yaml, 'registry', ContextRegistry(load_config_manager))
+    assert len(load_yaml.registry.context(config_path).ca_list) == 3
+
+    config = (config_dir / 'msp.yaml').read_text()
+    (config_dir / 'msp.yaml').write_text(config.replace('      - ca.org2.example.com\n', ''))
+    load_yaml.reload_config_files(config_path, [f'{config_path}/msp.yaml'])
+
+    manager = load_config_manager(config_path)
+    assert manager.load_report.from_snapshot
+    assert len(manager.client_compile().ca_list) == 2
+
+
+def test_reload_of_a_manager_from_a_snapshot(tmp_path, monkeypatch):
+    config_dir = tmp_path / 'config'
+    config_dir.mkdir()
+    shutil.copy(MSP_CONFIG, config_dir / 'msp.yaml')
+    (config_dir / 'other.yaml').write_text(OTHER_NETWORK)
+    config_path = str(config_dir)
+    monkeypatch.setenv(FABRIC_PYTHON_SDK_CONFIG_CACHE, str(tmp_path / 'cache'))
+    load_config_manager(config_path)
+    monkeypatch.setattr(load_yaml, 'registry', ContextRegistry(load_config_manager))
+    assert load_yaml.registry.manager(config_path).load_report.from_snapshot
+
+    (config_dir / 'other.yaml').write_text(OTHER_NETWORK.replace('Org9MSP', 'Org8MSP'))
+    load_yaml.reload_config_files(config_path, [f'{config_path}/other.yaml'])
+
+    assert load_yaml.registry.context(config_path, network_name='other').orgs.msp_id == 'Org8MSP'
+    assert len(load_yaml.registry.context(config_path, network_name='default').ca_list) == 3
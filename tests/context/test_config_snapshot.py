@@ -0,0 +1,81 @@
+import os
+import pickle
+import shutil
+from pathlib import Path
+
+from fabric_sdk.__env__ import FABRIC_PYTHON_SDK_CONFIG_CACHE
+from fabric_sdk.context import load_yaml
+
+# org1 lists the three CAs of the network
+MSP_CONFIG = Path(__file__).resolve().parent / 'replicas' / 'msp.yaml'
+
+
+def test_snapshot_reused_until_config_changes(tmp_path, monkeypatch):
+    config_dir = tmp_path / 'config'
+    config_dir.mkdir()
+    shutil.copy(MSP_CONFIG, config_dir / 'msp.yaml')
+    monkeypatch.setenv(FABRIC_PYTHON_SDK_CONFIG_CACHE, str(tmp_path / 'cache'))
+
+    assert len(load_yaml.load_config_manager(str(config_dir)).client_compile().ca_list) == 3
+    assert len(os.listdir(tmp_path / 'cache')) == 1
+
+    parsed = []
+    real_load = load_yaml.load
+    monkeypatch.setattr(load_yaml, 'load', lambda *a, **k: parsed.append(a) or real_load(*a, **k))
+
+    assert len(load_yaml.load_config_manager(str(config_dir)).client_compile().ca_list) == 3
+    assert parsed == []
+
+    config = (config_dir / 'msp.yaml').read_text()
+    (config_dir / 'msp.yaml').write_text(config.replace('adminpw2', 'adminpw3'))
+    os.utime(config_dir / 'msp.yaml', ns=(0, 0))
+
+    assert len(load_yaml.load_config_manager(str(config_dir)).client_compile().ca_list) == 3
+    assert len(parsed) == 1
+
+
+def test_touched_file_fingerprint_is_refreshed(tmp_path, monkeypatch):
+    config_dir = tmp_path / 'config'
+    config_dir.mkdir()
+    shutil.copy(MSP_CONFIG, config_dir / 'msp.yaml')
+    monkeypatch.setenv(FABRIC_PYTHON_SDK_CONFIG_CACHE, str(tmp_path / 'cache'))
+    load_yaml.load_config_manager(str(config_dir))
+
+    os.utime(config_dir / 'msp.yaml', ns=(0, 0))
+    assert load_yaml.load_config_manager(str(config_dir)).load_report.from_snapshot
+
+    cache_file, = (tmp_path / 'cache').iterdir()
+    with open(cache_file, 'rb') as snapshot_file:
+        _, fingerprints, _ = pickle.load(snapshot_file)
+    assert fingerprints[0][1] == 0
+
+
+def test_snapshot_keeps_no_raw_config(tmp_path, monkeypatch):
+    config_dir = tmp_path / 'config'
+    config_dir.mkdir()
+    shutil.copy(MSP_CONFIG, config_dir / 'msp.yaml')
+    monkeypatch.setenv(FABRIC_PYTHON_SDK_CONFIG_CACHE, str(tmp_path / 'cache'))
+    load_yaml.load_config_manager(str(config_dir))
+
+    cache_file, = (tmp_path / 'cache').iterdir()
+    with open(cache_file, 'rb') as snapshot_file:
+        _, _, manager = pickle.load(snapshot_file)
+    assert manager.description_list is None
+    assert all(network._sources is None for network in manager._networks.values())
+    assert len(manager.client_compile().ca_list) == 3
+
+
+def test_writable_snapshot_is_not_loaded(tmp_path, monkeypatch):
+    config_dir = tmp_path / 'config'
+    config_dir.mkdir()
+    shutil.copy(MSP_CONFIG, config_dir / 'msp.yaml')
+    monkeypatch.setenv(FABRIC_PYTHON_SDK_CONFIG_CACHE, str(tmp_path / 'cache'))
+    load_yaml.load_config_manager(str(config_dir))
+
+    cache_file, = (tmp_path / 'cache').iterdir()
+    assert oct(os.stat(tmp_path / 'cache').st_mode & 0o777) == '0o700'
+    os.chmod(cache_file, 0o666)
+    assert not load_yaml.load_config_manager(str(config_dir)).load_report.from_snapshot
+
+    # the snapshot written again by that load is trusted
+    assert load_yaml.load_config_manager(str(config_dir)).load_report.from_snapshot
@@ -1,7 +1,12 @@
 import os
 from pathlib import Path
+
+import pytest
+
 from fabric_sdk.__env__ import FABRIC_PYTHON_SDK_NETWORK_CONFIG
 import fabric_sdk as sdk
+from fabric_sdk.context import ChannelConfig, PeerRole
+from fabric_sdk.context.load_yaml import load_config_manager
 
 
 def test_load_msp():
@@ -10,4 +15,49 @@ def test_load_msp():
 
     context = sdk.Context()
 
-    assert len(context.ca_list) == 3
+    # org1 only lists ca.org1.example.com, see replicas/ for three CAs
+    assert [ca.name for ca in context.ca_list] == ['ca.org1.example.com']
+
+
+def test_indexed_lookups():
+    manager = load_config_manager(str(Path(__file__).resolve().parent / 'replicas'))
+
+    assert manager.get_org_by_msp_id('Org1MSP') is manager.get_org('org1')
+    assert manager.get_ca_by_url('https://ca.org1.example.com:7154').name == 'tlsca.org1.example.com'
+    assert manager.get_client('org1').organization == 'org1'
+    assert manager.get_peers('org1') == ('peer1.org1.com',)
+
+    context = manager.client_compile()
+    assert context.get_ca('ca.org2.example.com') is manager.get_ca('ca.org2.example.com')
+
+
+def test_channel_roles():
+    example = Path(__file__).resolve().parents[2] / 'example' / 'ex1'
+    channel = load_config_manager(str(example)).get_channel('mychannel2')
+
+    assert channel.orderers == ('orderer.example.com',)
+    assert channel.peers_with(PeerRole.ENDORSING_PEER) == (
+        'peer0.org1.example.com', 'peer0.org2.example.com')
+    assert channel.peers_with(PeerRole.CHAINCODE_QUERY) == ('peer0.org1.example.com',)
+    assert channel.any_peer(PeerRole.LEDGER_QUERY, org='Org2') == 'peer0.org2.example.com'
+    assert channel.any_peer(PeerRole.CHAINCODE_QUERY, org='Org2') is None
+    assert channel.peers_with(
+        PeerRole.ENDORSING_PEER | PeerRole.CHAINCODE_QUERY) == ('peer0.org1.example.com',)
+
+
+def test_channel_rejects_empty_roles():
+    channel = ChannelConfig('ch', [], {'p0': PeerRole.ENDORSING_PEER})
+
+    with pytest.raises(ValueError):
+        channel.peers_with(PeerRole(0))
+    with pytest.raises(ValueError):
+        channel.peers_with(PeerRole.ENDORSING_PEER | 16)
+    assert channel.any_peer(PeerRole.ENDORSING_PEER) == 'p0'
+
+
+def test_ca_rate_limit():
+    example = Path(__file__).resolve().parents[2] / 'example' / 'ex1'
+    manager = load_config_manager(str(example))
+
+    assert manager.get_ca('ca-org1').rate_limit['requestsPerSecond'] == 50
+    assert manager.get_ca('ca-org2').rate_limit == {}
@@ -0,0 +1,27 @@
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+
+from fabric_sdk.context import ContextRegistry
+from fabric_sdk.context.load_yaml import load_config_manager
+
+CONFIG_PATH = str(Path(__file__).resolve().parent)
+
+
+def test_registry_parses_once_and_shares_contexts():
+    loads = []
+    registry = ContextRegistry(lambda path: loads.append(path) or load_config_manager(path))
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        contexts = list(executor.map(lambda _: registry.context(CONFIG_PATH), range(32)))
+
+    assert loads == [CONFIG_PATH]
+    assert all(context is contexts[0] for context in contexts)
+    with pytest.raises(AttributeError):
+        contexts[0].ca_list = []
+
+    registry.invalidate(CONFIG_PATH)
+
+    assert registry.context(CONFIG_PATH) is not contexts[0]
+    assert loads == [CONFIG_PATH, CONFIG_PATH]
@@ -0,0 +1,95 @@
+import base64
+import pickle
+import tracemalloc
+
+import pytest
+
+from fabric_sdk.context.context import ClientConfig, MSPConfig, OrgConfig
+from fabric_sdk.domain.network_members import EnrolledMember, User
+
+CA_CHAIN = b'-----BEGIN CERTIFICATE-----\n' + b'A' * 1200 + b'\n-----END CERTIFICATE-----\n'
+B64_CA_CHAIN = base64.b64encode(CA_CHAIN)
+
+
+class DictEnrolledMember:
+    """EnrolledMember as it was before, with a __dict__ per instance"""
+
+    def __init__(self, enrollment_id, enrollment_secret, role, affiliation,
+                 enrollment_cert, ca_cert_chain, private_key=None):
+        self.enrollment_id = enrollment_id
+        self.enrollment_secret = enrollment_secret
+        self.role = role
+        self.affiliation = affiliation
+        self.enrollment_cert = enrollment_cert
+        self.ca_cert_chain = ca_cert_chain
+        self.private_key = private_key
+
+
+def test_member_lifecycle_shares_fields():
+    user = User('user1', None, 'org1')
+    registered = user.registry('secret')
+    enrolled = registered.enroll(b'cert', base64.b64decode(B64_CA_CHAIN), b'key')
+    other = User('user2', None, 'org1').registry('s').enroll(b'cert2', base64.b64decode(B64_CA_CHAIN))
+
+    assert (registered.enrollment_secret, registered.role) == ('secret', 'client')
+    assert (enrolled.enrollment_id, enrolled.affiliation) == ('user1', 'org1')
+    assert enrolled.ca_cert_chain is other.ca_cert_chain
+
+    reenrolled = enrolled.reenroll(b'cert3', CA_CHAIN)
+    assert reenrolled.enrollment_cert == b'cert3'
+    assert reenrolled.private_key == b'key'
+    assert enrolled.enrollment_cert == b'cert'
+
+
+def test_member_is_immutable():
+    member = User('user1', None, 'org1')
+
+    with pytest.raises(AttributeError):
+        member.role = 'admin'
+    with pytest.raises(AttributeError):
+        member.extra = 1
+
+    copy = pickle.loads(pickle.dumps(member.replace(role='admin')))
+    assert type(copy) is User
+    assert (copy.enrollment_id, copy.role) == ('user1', 'admin')
+
+
+def _footprint(factory, n):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    members = [factory(i) for i in range(n)]
+    size = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del members
+    return size / n
+
+
+@pytest.mark.slow
+@pytest.mark.time
+def test_member_footprint(record_property):
+    n = 20000
+    certs = [b'cert%d' % i for i in range(n)]
+
+    def fields(i):
+        # the chain is decoded from each enroll response, as CAClient does
+        return (f'user{i}', 'secret', 'client', 'org1', certs[i],
+                base64.b64decode(B64_CA_CHAIN), b'key')
+
+    slotted = _footprint(lambda i: EnrolledMember(*fields(i)), n)
+    with_dict = _footprint(lambda i: DictEnrolledMember(*fields(i)), n)
+
+    record_property('bytes_per_member', round(slotted))
+    record_property('bytes_per_member_with_dict', round(with_dict))
+    # about 150 against 1500 bytes here, the shared chain and no __dict__
+    assert slotted * 2 < with_dict, f'__slots__ {slotted:.0f} vs __dict__ {with_dict:.0f} bytes per member'
+
+
+def test_config_replace_keeps_the_class():
+    org = OrgConfig('Org1MSP', {}, {}, peers=('peer0',), ca_list=('ca1',))
+    msp = MSPConfig('ca1', 'https://ca1:7054', {}, {}, {})
+
+    moved = msp.replace(url='https://ca1:8054')
+    assert type(moved) is MSPConfig
+    assert (moved.name, moved.url, msp.url) == ('ca1', 'https://ca1:8054', 'https://ca1:7054')
+    assert org.replace(msp_id='Org2MSP').peers is org.peers
+    assert ClientConfig('org1', {}, {}).replace(organization='org2').organization == 'org2'
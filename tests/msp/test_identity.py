@@ -0,0 +1,62 @@
+import base64
+import json
+
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+
+from fabric_sdk.common.crypto_tools import Ecies
+from fabric_sdk.context.context import ClientConfig, ContextClient, MSPConfig, OrgConfig
+from fabric_sdk.domain.network_members import EnrolledMember
+from fabric_sdk.msp.client import CAClient
+from fabric_sdk.msp.identity import SigningIdentity
+
+
+@pytest.fixture(scope='module')
+def private_key():
+    return ec.generate_private_key(ec.SECP256R1())
+
+
+def verify(token, body, public_key):
+    b64_cert, b64_sig = token.split(b'.')
+    signed = (base64.b64encode(body) if body else b'') + b'.' + b64_cert
+    return Ecies().verify(public_key, signed, base64.b64decode(b64_sig))
+
+
+def test_token_signs_the_sent_body(private_key):
+    member = EnrolledMember('admin', None, 'admin', 'org1', b'cert', b'', private_key)
+    identity = SigningIdentity(member)
+    req = {'id': 'user1', 'affiliation': 'org1.département'}
+
+    body, token = identity.sign_request(req)
+
+    assert json.loads(body) == req
+    assert token.startswith(base64.b64encode(b'cert') + b'.')
+    assert verify(token, body, private_key.public_key())
+    assert not verify(token, body + b' ', private_key.public_key())
+
+    body, token = identity.sign_request(None)
+    assert body == b'' and verify(token, body, private_key.public_key())
+
+
+def test_pem_private_key_is_loaded_once(private_key):
+    pem = private_key.private_bytes(serialization.Encoding.PEM,
+                                    serialization.PrivateFormat.PKCS8,
+                                    serialization.NoEncryption())
+
+    identity = SigningIdentity.from_credentials('cert', pem.decode())
+
+    assert identity.member is None
+    assert identity.private_key.private_numbers() == private_key.private_numbers()
+    assert verify(identity.sign_request({'id': 'x'})[1], b'{"id": "x"}', private_key.public_key())
+
+
+def test_generate_auth_token_uses_the_signing_identity(private_key):
+    context = ContextClient(
+        ClientConfig('org1', {}, {}), OrgConfig('Org1MSP', {}, {}),
+        [MSPConfig('ca1', 'https://ca1:7054/', {}, {}, {})])
+    req = {'id': 'user1'}
+
+    token = CAClient(context).generate_auth_token(req, b'cert', private_key)
+
+    assert verify(token, json.dumps(req).encode(), private_key.public_key())
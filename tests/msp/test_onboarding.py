@@ -0,0 +1,115 @@
+import asyncio
+import base64
+import json
+import threading
+
+from cryptography.hazmat.primitives.asymmetric import ec
+
+from fabric_sdk.context.context import ClientConfig, ContextClient, MSPConfig, OrgConfig
+from fabric_sdk.domain.network_members import EnrolledMember, UnenrolledMember, User
+from fabric_sdk.msp.client import CAClient
+from fabric_sdk.msp.onboarding import aonboard, onboard
+
+
+class FakeCA:
+    def __init__(self, failing=()):
+        self.failing = set(failing)
+        self.registered = []
+        self.lock = threading.Lock()
+
+    def register(self, member, registrar, max_enrollments, attrs):
+        with self.lock:
+            self.registered.append(member.enrollment_id)
+        return UnenrolledMember(member.enrollment_id, 'secret', 'client', 'org1')
+
+    def enroll(self, member, profile=''):
+        if member.enrollment_id in self.failing:
+            raise ValueError('Enrollment failed')
+        return ('enrolled', member.enrollment_id)
+
+
+class AsyncFakeCA(FakeCA):
+    async def register(self, *args):
+        return super().register(*args)
+
+    async def enroll(self, *args):
+        await asyncio.sleep(0)
+        return super().enroll(*args)
+
+
+class CAServer:
+    """Answers register and enroll as fabric-ca does, records the bodies"""
+
+    def __init__(self):
+        self.requests = []
+        self.lock = threading.Lock()
+
+    def post(self, path, **param):
+        operation = path.rsplit('/', 1)[-1]
+        with self.lock:
+            self.requests.append((operation, param))
+        if operation == 'register':
+            body = json.loads(param['data'])
+            return {'success': True, 'result': {'secret': body['id'] + '-secret'}}, 201
+        return {'success': True, 'result': {
+            'Cert': base64.b64encode(b'cert').decode(),
+            'ServerInfo': {'CAChain': ''}}}, 201
+
+
+def users(n):
+    return [User(f'user{i}', None, 'org1') for i in range(n)]
+
+
+def test_onboard_keeps_input_order():
+    results = list(onboard(FakeCA(), None, users(50), max_workers=4, ordered=True))
+
+    assert [r.index for r in results] == list(range(50))
+    assert all(r.ok for r in results)
+
+
+def test_onboard_reports_errors_and_resumes():
+    ca = FakeCA(failing={'user3'})
+    results = list(onboard(ca, None, users(10), max_workers=3))
+
+    failed = [r for r in results if not r.ok]
+    assert len(results) == 10
+    assert [r.enrollment_id for r in failed] == ['user3']
+    assert failed[0].registered is not None
+
+    ca.failing.clear()
+    done = {r.enrollment_id for r in results if r.ok}
+    retry = [r.registered if not r.ok else r.member for r in results]
+    resumed = list(onboard(ca, None, retry, skip=done))
+
+    assert [r.enrollment_id for r in resumed] == ['user3']
+    assert ca.registered.count('user3') == 1
+
+
+def test_aonboard():
+    async def collect():
+        return [r async for r in aonboard(AsyncFakeCA(), None, users(20),
+                                          max_concurrency=5, ordered=True)]
+
+    results = asyncio.run(collect())
+
+    assert [r.index for r in results] == list(range(20))
+
+
+def test_onboard_through_ca_client():
+    http = CAServer()
+    context = ContextClient(
+        ClientConfig('org1', {}, {}), OrgConfig('Org1MSP', {}, {}),
+        [MSPConfig('ca1', 'https://ca1:7054/', {}, {}, {})])
+    registrar = EnrolledMember('admin', None, 'admin', 'org1', b'cert', b'',
+                               ec.generate_private_key(ec.SECP256R1()))
+
+    results = list(onboard(CAClient(context, http_client=http), registrar, users(5),
+                           max_workers=2, ordered=True))
+
+    assert all(r.ok for r in results)
+    assert [r.registered.enrollment_secret for r in results] == [f'user{i}-secret' for i in range(5)]
+    assert all(r.enrolled.enrollment_cert == b'cert' for r in results)
+    registers = [param for operation, param in http.requests if operation == 'register']
+    assert len(registers) == 5
+    assert all(param['headers']['Authorization'].startswith(base64.b64encode(b'cert').decode() + '.')
+               for param in registers)
@@ -0,0 +1,169 @@
+import random
+
+import pytest
+
+from fabric_sdk.common.admission import AdmissionController
+from fabric_sdk.domain.network_members import EnrolledMember
+from fabric_sdk.msp.renewal import ReenrollmentScheduler
+
+LIFETIME = 1000
+
+
+class Clock:
+    def __init__(self, now=0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class StandInCA:
+    """Issues certificates whose content is their expiry"""
+
+    def __init__(self, clock, failing=()):
+        self.clock = clock
+        self.failing = set(failing)
+        self.calls = []
+
+    def reenroll(self, member):
+        self.calls.append((self.clock(), member.enrollment_id))
+        if member.enrollment_id in self.failing:
+            self.failing.discard(member.enrollment_id)
+            raise ValueError('Enrollment failed')
+        return member.reenroll(b'%d' % (self.clock() + LIFETIME), b'chain')
+
+
+def expiry(member):
+    return float(member.enrollment_cert)
+
+
+def member(i, expires):
+    return EnrolledMember(f'user{i}', None, 'client', 'org1', b'%d' % expires, b'chain')
+
+
+def scheduler(clock, ca, **kwargs):
+    kwargs.setdefault('spread', 0)
+    return ReenrollmentScheduler(ca, lead_time=100, clock=clock, expiry=expiry, **kwargs)
+
+
+def test_renews_within_lead_time_and_publishes():
+    clock = Clock()
+    ca = StandInCA(clock)
+    saved = []
+
+    class Wallet:
+        put = saved.append
+
+    renewals = scheduler(clock, ca, wallet=Wallet())
+    renewals.track(member(1, 1000))
+    renewals.track(member(2, 2000))
+
+    clock.now = 899
+    assert renewals.run_pending() == 0
+    clock.now = 900
+    assert renewals.run_pending() == 1
+
+    renewed = renewals.current('user1')
+    assert renewed.enrollment_cert == b'1900'
+    assert saved == [renewed]
+    assert renewals.next_due() == 1800
+    assert renewals.untrack('user2') and len(renewals) == 1
+
+
+def test_spread_avoids_thundering_herd():
+    renewals = scheduler(Clock(), StandInCA(Clock()), spread=50, rng=random.Random(1))
+    dues = [renewals.track(member(i, 1000)) for i in range(100)]
+
+    assert all(900 <= due <= 950 for due in dues)
+    assert len(set(dues)) == 100
+
+
+def test_rate_limit_per_ca():
+    clock = Clock(900)
+    ca = StandInCA(clock)
+    other = StandInCA(clock)
+    renewals = scheduler(clock, {'ca1': ca, 'ca2': other}, max_per_second=2, burst=2)
+    for i in range(5):
+        renewals.track(member(i, 1000), 'ca1')
+    renewals.track(member(5, 1000), 'ca2')
+
+    assert renewals.run_pending() == 3
+    clock.now = 901
+    assert renewals.run_pending() == 2
+    clock.now = 901.5
+    assert renewals.run_pending() == 1
+    assert [t for t, _ in ca.calls] == [900, 900, 901, 901, 901.5]
+    assert len(other.calls) == 1
+    assert renewals._limits['ca1'].stats()['admitted'] == 5
+
+
+def test_ca_rate_limit_is_shared_with_other_requests():
+    clock = Clock(900)
+
+    class AdmittedCA(StandInCA):
+        admission = AdmissionController(rate=2, burst=1, max_queue=0, clock=clock)
+
+        def reenroll(self, member):
+            with self.admission.admit(timeout=0):
+                return super().reenroll(member)
+
+    ca = AdmittedCA(clock)
+    renewals = scheduler(clock, ca)
+    for i in range(3):
+        renewals.track(member(i, 1000))
+
+    # a bulk job of the process took the token of the CA
+    with ca.admission.admit():
+        pass
+    assert renewals.run_pending() == 0
+    assert renewals.next_due() == 900.5
+
+    clock.now = 900.5
+    assert renewals.run_pending() == 1
+    clock.now = 901
+    assert renewals.run_pending() == 1
+    assert [t for t, _ in ca.calls] == [900.5, 901]
+    assert ca.admission.rejected == 0 and renewals.failed == 0
+
+
+def test_failed_renewal_is_retried():
+    clock = Clock(900)
+    ca = StandInCA(clock, failing={'user1'})
+    errors = []
+    renewals = scheduler(clock, ca, retry_interval=30,
+                         on_error=lambda m, e: errors.append(m.enrollment_id))
+    renewals.track(member(1, 1000))
+
+    assert renewals.run_pending() == 0
+    assert errors == ['user1'] and renewals.next_due() == 930
+
+    clock.now = 930
+    assert renewals.run_pending() == 1
+    assert renewals.current('user1').enrollment_cert == b'1930'
+
+
+def test_spread_is_at_most_lead_time():
+    with pytest.raises(ValueError):
+        scheduler(Clock(), StandInCA(Clock()), spread=101)
+    with pytest.raises(ValueError):
+        scheduler(Clock(), StandInCA(Clock()), spread=-1)
+    assert scheduler(Clock(), StandInCA(Clock()), spread=100).spread == 100
+
+
+def test_renewal_untracked_meanwhile_is_not_counted():
+    clock = Clock(900)
+    renewed = []
+    renewals = None
+
+    class UntrackingCA(StandInCA):
+        def reenroll(self, member):
+            renewals.untrack(member.enrollment_id)
+            return super().reenroll(member)
+
+    renewals = scheduler(clock, UntrackingCA(clock),
+                         on_renewed=lambda old, new: renewed.append(new))
+    renewals.track(member(1, 1000))
+
+    assert renewals.run_pending() == 0
+    assert renewals.renewed == 0 and renewed == []
+    assert renewals.current('user1') is None
@@ -0,0 +1,191 @@
+import asyncio
+import base64
+import datetime
+import json
+import threading
+
+import pytest
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+from cryptography.x509.oid import NameOID
+
+from fabric_sdk.context.context import ClientConfig, ContextClient, MSPConfig, OrgConfig
+from fabric_sdk.domain.network_members import EnrolledMember, RevokeReason, RevokeRequest
+from fabric_sdk.msp.async_client import AsyncCAClient
+from fabric_sdk.msp.client import CAClient
+from fabric_sdk.msp.revocation import RevocationIndex
+
+CA_KEY = ec.generate_private_key(ec.SECP256R1())
+AKI = x509.SubjectKeyIdentifier.from_public_key(CA_KEY.public_key()).digest
+NOW = datetime.datetime.now(datetime.timezone.utc)
+CA_NAME = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, 'ca')])
+CA_CERT = (x509.CertificateBuilder()
+           .subject_name(CA_NAME).issuer_name(CA_NAME)
+           .public_key(CA_KEY.public_key())
+           .serial_number(1).not_valid_before(NOW)
+           .not_valid_after(NOW + datetime.timedelta(days=1))
+           .add_extension(x509.SubjectKeyIdentifier(AKI), critical=False)
+           .sign(CA_KEY, hashes.SHA256()).public_bytes(serialization.Encoding.PEM))
+
+
+def crl(number, serials, removed=(), delta=False, key=CA_KEY, base=None):
+    builder = (x509.CertificateRevocationListBuilder()
+               .issuer_name(CA_NAME)
+               .last_update(NOW)
+               .next_update(NOW + datetime.timedelta(days=1))
+               .add_extension(x509.AuthorityKeyIdentifier.from_issuer_public_key(
+                   CA_KEY.public_key()), critical=False)
+               .add_extension(x509.CRLNumber(number), critical=False))
+    if delta:
+        builder = builder.add_extension(
+            x509.DeltaCRLIndicator(number - 1 if base is None else base), critical=True)
+
+    for serial in serials:
+        builder = builder.add_revoked_certificate(
+            x509.RevokedCertificateBuilder().serial_number(serial).revocation_date(NOW).build())
+    for serial in removed:
+        builder = builder.add_revoked_certificate(
+            x509.RevokedCertificateBuilder().serial_number(serial).revocation_date(NOW)
+            .add_extension(x509.CRLReason(x509.ReasonFlags.remove_from_crl), critical=False)
+            .build())
+    return builder.sign(key, hashes.SHA256()).public_bytes(serialization.Encoding.PEM)
+
+
+def test_full_and_delta_crls():
+    index = RevocationIndex(issuers=CA_CERT)
+
+    assert index.ingest_crl(base64.b64encode(crl(1, [1, 2, 3])))
+    assert index.is_revoked(AKI, 2) and not index.is_revoked(AKI, 4)
+    assert index.is_revoked(AKI.hex(), '02')
+
+    assert index.ingest_crl(crl(2, [4], removed=[1], delta=True))
+    assert [index.is_revoked(AKI, s) for s in (1, 2, 3, 4)] == [False, True, True, True]
+
+    assert not index.ingest_crl(crl(2, []))
+    assert index.ingest_crl(crl(3, [5]))
+    assert len(index) == 1 and index.is_revoked(AKI, 5)
+
+
+def test_delta_crl_needs_its_base():
+    index = RevocationIndex(issuers=CA_CERT)
+    assert not index.ingest_crl(crl(2, [4], delta=True))
+
+    assert index.ingest_crl(crl(1, [1, 2]))
+    assert not index.ingest_crl(crl(5, [4], removed=[1], delta=True, base=3))
+    assert [index.is_revoked(AKI, s) for s in (1, 2, 4)] == [True, True, False]
+
+    # a delta on an older base covers every change since, it applies
+    assert index.ingest_crl(crl(4, [4], removed=[1], delta=True, base=0))
+    assert [index.is_revoked(AKI, s) for s in (1, 2, 4)] == [False, True, True]
+
+
+def test_crl_signature_is_verified():
+    forged = crl(2, [1, 2], key=ec.generate_private_key(ec.SECP256R1()))
+    index = RevocationIndex()
+
+    with pytest.raises(ValueError, match='Unknown CRL issuer'):
+        index.ingest_crl(crl(1, [1]))
+    with pytest.raises(ValueError, match='signature'):
+        index.ingest_crl(forged, CA_CERT)
+
+    assert index.ingest_crl(crl(1, [3]), CA_KEY.public_key())
+    index.add_issuers([CA_CERT])
+    with pytest.raises(ValueError, match='signature'):
+        index.ingest_crl(forged)
+    assert len(index) == 1 and index.is_revoked(AKI, 3)
+
+
+def test_bloom_front_keeps_every_revoked_entry():
+    index = RevocationIndex(bloom_capacity=10)
+    index.update(AKI, added=range(1000))
+    index.add_revoked_certs([{'AKI': AKI.hex(), 'Serial': 'ffff'}])
+
+    assert all(index.is_revoked(AKI, serial) for serial in range(1000))
+    assert index.is_revoked(AKI, 0xffff)
+    assert sum(index.is_revoked(AKI, serial) for serial in range(1000, 11000)) == 0
+
+
+def admin():
+    registrar = ec.generate_private_key(ec.SECP256R1())
+    cert = (x509.CertificateBuilder()
+            .subject_name(x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, 'admin')]))
+            .issuer_name(CA_NAME)
+            .public_key(registrar.public_key())
+            .serial_number(1).not_valid_before(NOW)
+            .not_valid_after(NOW + datetime.timedelta(days=1))
+            .sign(CA_KEY, hashes.SHA256()).public_bytes(serialization.Encoding.PEM))
+    return EnrolledMember('admin', None, 'admin', 'org1', cert, CA_CERT, registrar)
+
+
+def context():
+    ca = MSPConfig('ca1', 'https://ca1:7054/', {}, {}, {})
+    return ContextClient(ClientConfig('org1', {}, {}), OrgConfig('Org1MSP', {}, {}), [ca])
+
+
+class FakeCA:
+    """Answers revoke and gencrl, serial 13 can't be revoked"""
+
+    def __init__(self):
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def post(self, path, data, **param):
+        req = json.loads(data) if data else {}
+        with self.lock:
+            self.calls.append((path.rsplit('/', 1)[-1], req))
+        if path.endswith('gencrl'):
+            return {'success': True, 'result': {'CRL': base64.b64encode(crl(7, [9]))}}, 200
+
+        serial = int(req['serial'], 16)
+        if serial == 13:
+            return {'success': False, 'errors': ['unknown certificate']}, 404
+        gen_crl = req.get('gencrl')
+        return {'success': True, 'result': {
+            'RevokedCerts': [{'Serial': req['serial'], 'AKI': req['aki']}],
+            'CRL': base64.b64encode(crl(8, [9])).decode() if gen_crl else ''}}, 200
+
+
+def test_generate_crl():
+    ca = FakeCA()
+
+    registrar = admin()
+    pem = CAClient(context(), http_client=ca).generate_crl(
+        registrar, revoked_after=datetime.datetime(2026, 1, 1))
+
+    assert ca.calls == [('gencrl', {'caname': 'ca1', 'revokedAfter': '2026-01-01T00:00:00+00:00'})]
+    index = RevocationIndex(issuers=registrar.ca_cert_chain)
+    index.ingest_crl(pem)
+    assert index.is_revoked(AKI, 9)
+
+
+def revoke_requests(serials):
+    return [RevokeRequest(RevokeReason.KEY_COMPROMISE, aki=AKI.hex(), serial=f'{serial:x}', gen_crl=True)
+            for serial in serials]
+
+
+def test_revoke_many_generates_crl_once():
+    ca = FakeCA()
+    certs, pem, failed = CAClient(context(), http_client=ca).revoke_many(
+        revoke_requests(range(10, 30)), admin(), max_workers=4)
+
+    assert len(certs) == 19
+    assert [request.serial for request, _ in failed] == ['d']
+    assert [req['gencrl'] for _, req in ca.calls] == [False] * 19 + [True]
+    assert RevocationIndex().ingest_crl(pem, CA_CERT)
+
+
+def test_async_revoke_many_falls_back_to_gencrl():
+    ca = FakeCA()
+
+    class AsyncHttp:
+        @staticmethod
+        async def post(path, **param):
+            return ca.post(path, **param)
+
+    client = AsyncCAClient(context(), http_client=AsyncHttp)
+    certs, pem, failed = asyncio.run(client.revoke_many(revoke_requests([11, 12, 13]), admin()))
+
+    assert len(certs) == 2 and len(failed) == 1
+    assert [path for path, _ in ca.calls][-1] == 'gencrl'
+    assert pem
@@ -0,0 +1,197 @@
+import asyncio
+import base64
+import socket
+import threading
+import time
+
+import pytest
+import requests
+from aiohttp import ServerDisconnectedError
+from cryptography.hazmat.primitives.asymmetric import ec
+from requests import ConnectionError, ConnectTimeout
+
+from fabric_sdk.common.http_client import HttpRetryableError
+from fabric_sdk.context.context import ClientConfig, ContextClient, MSPConfig, OrgConfig
+from fabric_sdk.domain.network_members import EnrolledMember, UnenrolledMember, User
+from fabric_sdk.msp.router import AsyncCARouter, CARouter, EWMA
+
+URLS = ['https://ca1:7054/', 'https://ca2:7054/', 'https://ca3:7054/']
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class Replicas:
+    """Stand-in for CA replicas, ``down`` maps a url to the error it raises"""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.down = {}
+        self.calls = {url: 0 for url in URLS}
+        self.lock = threading.Lock()
+
+    def post(self, path, **param):
+        url = path.rsplit('/', 1)[0] + '/'
+        with self.lock:
+            self.calls[url] += 1
+        if url in self.down:
+            raise self.down[url]
+        time.sleep(self.delay)
+        if path.endswith('register'):
+            return {'success': True, 'result': {'secret': 'secret'}}, 201
+        return {'success': True, 'result': {
+            'Cert': base64.b64encode(url.encode()).decode(),
+            'ServerInfo': {'CAChain': ''}}}, 201
+
+
+class AsyncReplicas(Replicas):
+    async def post(self, path, **param):
+        return super().post(path, **param)
+
+
+def context(rate_limits=None):
+    rate_limits = rate_limits or {}
+    replicas = [MSPConfig('ca1', url, {}, {}, {}, rate_limit=rate_limits.get(url)) for url in URLS]
+    return ContextClient(ClientConfig('org1', {}, {}), OrgConfig('Org1MSP', {}, {}), replicas)
+
+
+def router(http, **options):
+    return CARouter(context(), http_client=http, **options)
+
+
+def registrar():
+    return EnrolledMember('admin', None, 'admin', 'org1', b'cert', b'',
+                          ec.generate_private_key(ec.SECP256R1()))
+
+
+def refused_connection():
+    # the error requests raises for a port nothing listens on
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        url = f'http://127.0.0.1:{s.getsockname()[1]}/'
+    try:
+        requests.post(url, timeout=5)
+    except ConnectionError as e:
+        return e
+
+
+def member(i=0):
+    return UnenrolledMember(f'user{i}', 'secret', 'client', 'org1')
+
+
+def test_requests_are_spread_over_replicas():
+    http = Replicas(delay=0.01)
+    ca = router(http)
+
+    threads = [threading.Thread(target=ca.enroll, args=(member(i),)) for i in range(30)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sum(http.calls.values()) == 30
+    assert all(calls >= 5 for calls in http.calls.values())
+    assert all(stats['outstanding'] == 0 for stats in ca.stats())
+
+
+def test_failing_replica_is_ejected_and_readmitted():
+    http = Replicas()
+    clock = Clock()
+    ca = router(http, strategy=EWMA, failure_threshold=2, ejection_time=10, clock=clock)
+    http.down[URLS[0]] = ConnectionError('connection reset')
+
+    enrolled = [ca.enroll(member(i)) for i in range(10)]
+
+    assert all(m.enrollment_cert != URLS[0].encode() for m in enrolled)
+    assert http.calls[URLS[0]] == 2
+    assert ca.stats()[0]['ejected_until'] == 10
+
+    clock.now = 10
+    ca.enroll(member())
+    assert http.calls[URLS[0]] == 3
+    assert ca.stats()[0]['ejected_until'] == 30
+
+    del http.down[URLS[0]]
+    clock.now = 30
+    assert ca.enroll(member()).enrollment_cert == URLS[0].encode()
+
+
+def test_register_fails_over_only_when_not_sent():
+    http = Replicas()
+    ca = router(http)
+    admin = registrar()
+
+    http.down[URLS[0]] = ConnectionError('connection reset')
+    with pytest.raises(ConnectionError):
+        ca.register(User('user1', None, 'org1'), admin, 1, None)
+
+    http.down[URLS[0]] = ConnectTimeout('connect timeout')
+    registered = ca.register(User('user1', None, 'org1'), admin, 1, None)
+
+    assert registered.enrollment_secret == 'secret'
+    assert http.calls == {URLS[0]: 2, URLS[1]: 1, URLS[2]: 0}
+
+
+def test_register_fails_over_on_refused_connection():
+    http = Replicas()
+    ca = router(http)
+    http.down[URLS[0]] = refused_connection()
+
+    registered = ca.register(User('user1', None, 'org1'), registrar(), 1, None)
+
+    assert registered.enrollment_secret == 'secret'
+    assert http.calls == {URLS[0]: 1, URLS[1]: 1, URLS[2]: 0}
+    assert ca.stats()[0]['errors'] == 1
+
+
+def test_overloaded_ca_is_alive():
+    http = Replicas()
+    ca = router(http, failure_threshold=1, clock=Clock())
+
+    http.down[URLS[0]] = HttpRetryableError(503)
+    registered = ca.register(User('user1', None, 'org1'), registrar(), 1, None)
+    assert registered.enrollment_secret == 'secret'
+
+    http.down[URLS[0]] = HttpRetryableError(502)
+    with pytest.raises(HttpRetryableError):
+        ca.register(User('user2', None, 'org1'), registrar(), 1, None)
+
+    assert http.calls == {URLS[0]: 2, URLS[1]: 1, URLS[2]: 0}
+    assert [(s['errors'], s['ejected_until']) for s in ca.stats()] == [(0, None)] * 3
+
+
+def test_async_router_fails_over_and_skips_shed_requests():
+    http = AsyncReplicas()
+    clock = Clock()
+    # nothing is ever admitted by the third CA, requests to it are shed
+    shed = {URLS[2]: {'maxInFlight': 0, 'maxQueue': 0}}
+    ca = AsyncCARouter(context(shed), http_client=http, failure_threshold=2, clock=clock)
+    http.down[URLS[0]] = ServerDisconnectedError()
+
+    async def run():
+        enrolled = [await ca.enroll(member(i)) for i in range(4)]
+        registered = await ca.register(User('user1', None, 'org1'), registrar(), 1, None)
+        return enrolled, registered
+
+    enrolled, registered = asyncio.run(run())
+
+    assert all(m.enrollment_cert == URLS[1].encode() for m in enrolled)
+    assert registered.enrollment_secret == 'secret'
+    assert http.calls == {URLS[0]: 2, URLS[1]: 5, URLS[2]: 0}
+    stats = ca.stats()
+    assert stats[0]['ejected_until'] == 10 and stats[0]['errors'] == 2
+    assert stats[2]['errors'] == 0 and stats[2]['ejected_until'] is None
+
+    # every CA fails: the shed one is skipped, the ejected one tried last
+    http.down[URLS[1]] = ServerDisconnectedError()
+    with pytest.raises(ServerDisconnectedError):
+        asyncio.run(ca.enroll(member()))
+    assert http.calls == {URLS[0]: 3, URLS[1]: 6, URLS[2]: 0}
+    stats = ca.stats()
+    assert stats[2]['requests'] == 1 and stats[2]['errors'] == 0
+    assert [s['outstanding'] for s in stats] == [0, 0, 0]
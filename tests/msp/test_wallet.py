@@ -0,0 +1,66 @@
+import pytest
+from cryptography.hazmat.primitives.asymmetric import ec
+from cryptography.hazmat.primitives.serialization import load_pem_private_key
+
+from fabric_sdk.context.context import ClientConfig
+from fabric_sdk.domain.network_members import EnrolledMember
+from fabric_sdk.msp.wallet import Wallet
+
+CA_CHAIN = b'-----BEGIN CERTIFICATE-----\nchain\n-----END CERTIFICATE-----\n'
+
+
+def member(i, private_key=None, chain=CA_CHAIN, secret=None):
+    return EnrolledMember(f'user{i}', secret, 'client', 'org1',
+                          b'cert%d' % i, chain, private_key)
+
+
+def test_round_trip_encrypts_private_key(tmp_path):
+    key = ec.generate_private_key(ec.SECP256R1())
+    path = str(tmp_path / 'wallet.db')
+
+    with Wallet(path, b'secret') as wallet:
+        wallet.put(member(1, key, secret='user1-enrollment-pw'))
+
+    with open(path, 'rb') as db:
+        content = db.read()
+    assert b'PRIVATE KEY' not in content
+    assert b'user1-enrollment-pw' not in content
+
+    with Wallet(path, b'secret') as wallet:
+        stored = wallet.get('user1')
+        assert (stored.enrollment_cert, stored.ca_cert_chain) == (b'cert1', CA_CHAIN)
+        assert stored.enrollment_secret == 'user1-enrollment-pw'
+        loaded = load_pem_private_key(stored.private_key, None)
+        assert loaded.private_numbers() == key.private_numbers()
+        assert wallet.get('user2') is None
+
+    with pytest.raises(ValueError):
+        Wallet(path, b'wrong')
+
+
+def test_bulk_import_export(tmp_path):
+    with Wallet(str(tmp_path / 'a.db'), b'secret', cache_size=10) as wallet:
+        assert wallet.put_many((member(i, b'key%d' % i) for i in range(2500)), batch_size=700) == 2500
+        wallet.put(member(7, b'new key'))
+
+        assert len(wallet) == 2500 and 'user7' in wallet
+        assert wallet._db.execute('SELECT COUNT(*) FROM chains').fetchone()[0] == 1
+
+        members = [wallet.get(f'user{i}') for i in range(20)]
+        assert wallet.get('user19') is members[19]
+        assert wallet.get('user0') is not members[0]
+        assert members[7].private_key == b'new key'
+
+        with Wallet(str(tmp_path / 'b.db'), b'other') as copy:
+            copy.put_many(wallet.export())
+            assert list(copy.ids()) == list(wallet.ids())
+            assert copy.get('user2499').private_key == b'key2499'
+            assert copy.delete('user1') and 'user1' not in copy
+
+
+def test_from_config(tmp_path, monkeypatch):
+    monkeypatch.setenv('WALLET_DIR', str(tmp_path))
+    client = ClientConfig('org1', {}, {'path': '${WALLET_DIR}/org1', 'wallet': 'org1'})
+
+    with Wallet.from_config(client, b'secret') as wallet:
+        assert wallet.path == str(tmp_path / 'org1' / 'org1.db')
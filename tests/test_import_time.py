@@ -0,0 +1,67 @@
+import json
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+HEAVY_MODULES = ('requests', 'cryptography', 'Cryptodome', 'hkdf', 'six')
+
+# Append each measurement as a json line to this file, to follow the
+# cold-import cost from one run to the next
+IMPORT_TIME_LOG = 'FABRIC_PYTHON_SDK_IMPORT_TIME_LOG'
+
+
+def _cold_import(statement):
+    """Run ``statement`` in a fresh interpreter
+
+    :return: cumulative import time of each top-level module in
+             microseconds, and the loaded heavy modules
+    """
+    probe = (f'{statement}\nimport json, sys\n'
+             f'print(json.dumps([m for m in {HEAVY_MODULES!r} if m in sys.modules]))')
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', probe],
+        capture_output=True, text=True, check=True,
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+    timings = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        if not name.startswith('  '):
+            timings[name.strip()] = int(cumulative)
+    return timings, json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def test_config_only_import_is_light():
+    _, loaded = _cold_import(
+        'import fabric_sdk\nfrom fabric_sdk.context.load_yaml import load_config_manager')
+    assert loaded == []
+
+
+def test_sync_ca_client_does_not_load_aiohttp():
+    _, loaded = _cold_import(
+        'import sys\nimport fabric_sdk.msp.client, fabric_sdk.msp.router\n'
+        'assert "aiohttp" not in sys.modules, "aiohttp was imported"')
+    assert 'requests' in loaded
+
+
+def test_crypto_is_loaded_on_first_use():
+    _, loaded = _cold_import('from fabric_sdk.common import Ecies')
+    assert 'cryptography' in loaded
+    assert 'requests' not in loaded
+
+
+@pytest.mark.time
+def test_cold_import_time(record_property):
+    runs = [_cold_import('import fabric_sdk')[0]['fabric_sdk'] for _ in range(5)]
+    best = min(runs)
+    record_property('cold_import_ms', round(best / 1000, 1))
+
+    log = os.getenv(IMPORT_TIME_LOG)
+    if log:
+        with open(log, 'a') as log_file:
+            log_file.write(json.dumps({'time': time.time(), 'import_us': best}) + '\n')